@@ -0,0 +1,81 @@
+"""
+Encode/decode cost per message, dataclasses_json against hearts_textual.codec
+
+    python -m benchmarks.codec
+"""
+
+import timeit
+
+from hearts_textual import codec
+from hearts_textual.data import Game, Message
+
+
+def typical_update() -> Message:
+    """
+    An update from the middle of a trick, with a full round dealt
+    """
+    game = Game().reset().new_game().next_round().next_turn()
+    for _ in range(6):
+        player = game._current_player()
+        for card in list(player.hand):
+            if type(game.play_card(card, player)) is Game:
+                break
+
+    return Message(command="update", args={"state": game, "messages": []})
+
+
+def per_message(func, number: int) -> float:
+    """
+    Best of 5, in microseconds per call
+    """
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def run(number: int = 2000) -> dict:
+    message = typical_update()
+    frame = message.to_json()
+    compact_frame = codec.encode_message(message, compact=True)
+
+    def legacy_decode():
+        decoded = Message.from_json(frame)  # type: ignore[attr-defined]
+        Game.from_dict(decoded.args["state"])  # type: ignore[attr-defined]
+
+    def codec_decode():
+        decoded = codec.decode_message(frame)
+        codec.decode_game(decoded.args["state"])  # type: ignore[arg-type]
+
+    def codec_decode_compact():
+        decoded = codec.decode_message(compact_frame)
+        codec.decode_game(decoded.args["state"])  # type: ignore[arg-type]
+
+    return {
+        "bytes": {
+            "dataclasses_json": len(frame),
+            "codec": len(codec.encode_message(message)),
+            "codec_compact": len(compact_frame),
+        },
+        "encode_us": {
+            "dataclasses_json": per_message(message.to_json, number),  # type: ignore[attr-defined]
+            "codec": per_message(lambda: codec.encode_message(message), number),
+            "codec_compact": per_message(
+                lambda: codec.encode_message(message, compact=True), number
+            ),
+        },
+        "decode_us": {
+            "dataclasses_json": per_message(legacy_decode, number),
+            "codec": per_message(codec_decode, number),
+            "codec_compact": per_message(codec_decode_compact, number),
+        },
+    }
+
+
+def main():
+    results = run()
+    for section, numbers in results.items():
+        print(section)
+        for name, value in numbers.items():
+            print(f"  {name:<18} {value:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python
+"""
+Benchmark suite for the engine, the wire codecs, command dispatch and
+server fan-out.  Results are microseconds per operation, best of a few
+repeats, written to a JSON file and compared against a stored baseline.
+
+    python -m benchmarks.run                      # run and compare
+    python -m benchmarks.run --save_baseline      # make this run the baseline
+    python -m benchmarks.run --only engine        # names starting with engine
+"""
+
+import asyncio
+from dataclasses import dataclass
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import simple_parsing
+import websockets
+
+from benchmarks.codec import typical_update
+from hearts_textual import codec, commands
+from hearts_textual.data import Game, Message
+
+
+BENCHMARKS: Dict[str, Callable[[int], float]] = {}
+
+# Next to this file, wherever it's run from
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+RESULTS_PATH = os.path.join(HERE, "results.json")
+
+
+def benchmark(name: str):
+    """
+    @benchmark decorator, the function runs the operation number times
+    and returns the seconds spent on the part being measured
+    """
+
+    def register(func: Callable[[int], float]) -> Callable[[int], float]:
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+def dealt_game() -> Game:
+    return Game().reset().new_game().next_round().next_turn()
+
+
+def legal_play(game: Game) -> Game:
+    """
+    Plays the lowest card the engine accepts for whoever's turn it is
+    """
+    player = game._current_player()
+    for card in list(player.hand):
+        if type(game.play_card(card, player)) is Game:
+            return game
+
+    raise Exception(f"{player.name} has no legal card")
+
+
+def timed(func: Callable[[], object], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return time.perf_counter() - start
+
+
+@benchmark("engine.deal")
+def bench_deal(number: int) -> float:
+    total = 0.0
+    for _ in range(number):
+        game = Game().reset().new_game()
+        game.new_deck().shuffle()
+        start = time.perf_counter()
+        game.deal()
+        total += time.perf_counter() - start
+
+    return total
+
+
+@benchmark("engine.shuffle")
+def bench_shuffle(number: int) -> float:
+    game = Game().reset()
+
+    return timed(game.shuffle, number)
+
+
+@benchmark("engine.play_card")
+def bench_play_card(number: int) -> float:
+    total = 0.0
+    game = dealt_game()
+    for _ in range(number):
+        if game.ended:
+            game = dealt_game()
+        start = time.perf_counter()
+        legal_play(game)
+        total += time.perf_counter() - start
+
+    return total
+
+
+@benchmark("engine.hand_winner")
+def bench_hand_winner(number: int) -> float:
+    game = dealt_game()
+    for _ in range(3):
+        legal_play(game)
+    player = game._current_player()
+    game.played_cards.append(player.hand[-1])
+
+    return timed(game.hand_winner, number)
+
+
+@benchmark("engine.score_round")
+def bench_score_round(number: int) -> float:
+    game = dealt_game()
+    while game.turn < 13:
+        legal_play(game)
+    for player in game.players:
+        player.scores = []
+
+    start = time.perf_counter()
+    for _ in range(number):
+        game.score_round()
+    return time.perf_counter() - start
+
+
+@benchmark("engine.full_round")
+def bench_full_round(number: int) -> float:
+    total = 0.0
+    for _ in range(number):
+        game = dealt_game()
+        start = time.perf_counter()
+        for _ in range(52):
+            legal_play(game)
+        total += time.perf_counter() - start
+
+    return total
+
+
+@benchmark("message.to_json")
+def bench_to_json(number: int) -> float:
+    message = typical_update()
+    return timed(message.to_json, number)  # type: ignore[attr-defined]
+
+
+@benchmark("message.from_json")
+def bench_from_json(number: int) -> float:
+    frame = typical_update().to_json()  # type: ignore[attr-defined]
+    return timed(lambda: Message.from_json(frame), number)  # type: ignore[attr-defined]
+
+
+@benchmark("codec.encode_message")
+def bench_codec_encode(number: int) -> float:
+    message = typical_update()
+    return timed(lambda: codec.encode_message(message), number)
+
+
+@benchmark("codec.decode_message")
+def bench_codec_decode(number: int) -> float:
+    frame = typical_update().to_json()  # type: ignore[attr-defined]
+    return timed(lambda: codec.decode_message(frame), number)
+
+
+class BenchSocket:
+    """
+    Stand-in websocket for dispatch benchmarks, hashable by identity
+    """
+
+    subprotocol = None
+
+
+def seated_table() -> List[BenchSocket]:
+    commands.reset()
+    sockets = [BenchSocket() for _ in range(4)]
+    for i, socket in enumerate(sockets):
+        commands.run_command(
+            json.dumps({"command": "join", "args": {"name": f"Bench{i}"}}), socket
+        )
+    for command in ["new_game", "next_round", "next_turn"]:
+        commands.run_command(json.dumps({"command": command, "args": {}}), sockets[0])
+
+    return sockets
+
+
+@benchmark("commands.run_command.help")
+def bench_run_help(number: int) -> float:
+    frame = json.dumps({"command": "help", "args": {}})
+    socket = BenchSocket()
+    return timed(lambda: commands.run_command(frame, socket), number)
+
+
+@benchmark("commands.run_command.play_card")
+def bench_run_play_card(number: int) -> float:
+    total = 0.0
+    sockets = seated_table()
+    table = commands.TABLES.for_socket(sockets[0])
+    for _ in range(number):
+        game = table.game  # type: ignore[union-attr]
+        if game.ended:
+            sockets = seated_table()
+            table = commands.TABLES.for_socket(sockets[0])
+            game = table.game  # type: ignore[union-attr]
+        player = game._current_player()
+        socket = table.players_to_sockets[player]  # type: ignore[union-attr]
+        frames = []
+        for card in player.hand:
+            frames.append(
+                json.dumps({"command": "play_card", "args": {"card": repr(card)}})
+            )
+        start = time.perf_counter()
+        for frame in frames:
+            if commands.run_command(frame, socket).command == "update":
+                break
+        total += time.perf_counter() - start
+    commands.reset()
+
+    return total
+
+
+FANOUT_SOCKETS = 64
+
+
+@benchmark(f"server.broadcast.{FANOUT_SOCKETS}")
+def bench_broadcast(number: int) -> float:
+    payload = codec.encode_message(typical_update())
+
+    async def run() -> float:
+        server_side: List = []
+        ready = asyncio.Event()
+
+        async def handler(websocket):
+            server_side.append(websocket)
+            if len(server_side) == FANOUT_SOCKETS:
+                ready.set()
+            await websocket.wait_closed()
+
+        async def drain(client):
+            async for _ in client:
+                pass
+
+        async with websockets.serve(handler, "localhost", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            clients = [
+                await websockets.connect(f"ws://localhost:{port}")
+                for _ in range(FANOUT_SOCKETS)
+            ]
+            readers = [asyncio.create_task(drain(client)) for client in clients]
+            await ready.wait()
+
+            total = 0.0
+            for _ in range(number):
+                start = time.perf_counter()
+                websockets.broadcast(server_side, payload)
+                total += time.perf_counter() - start
+                # let the clients catch up so buffers don't grow without bound
+                await asyncio.sleep(0)
+
+            for client in clients:
+                await client.close()
+            await asyncio.gather(*readers, return_exceptions=True)
+
+        return total
+
+    return asyncio.run(run())
+
+
+NUMBERS = {
+    "engine.full_round": 50,
+    "commands.run_command.play_card": 500,
+    f"server.broadcast.{FANOUT_SOCKETS}": 200,
+    "message.to_json": 200,
+    "message.from_json": 200,
+}
+
+
+def run(
+    only: Optional[str] = None, repeat: int = 5, scale: float = 1.0
+) -> Dict[str, float]:
+    results = {}
+    for name, func in BENCHMARKS.items():
+        if only is not None and not name.startswith(only):
+            continue
+        number = max(1, int(NUMBERS.get(name, 1000) * scale))
+        seconds = min(func(number) for _ in range(repeat))
+        results[name] = seconds / number * 1e6
+
+    return results
+
+
+def compare(
+    results: Dict[str, float], baseline: Dict[str, float], threshold: float
+) -> List[str]:
+    """
+    Prints a comparison table and returns the names that regressed
+    """
+    regressions = []
+    print(f"{'benchmark':<34} {'baseline us':>12} {'current us':>12} {'ratio':>7}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<34} {'-':>12} {current:>12.2f} {'new':>7}")
+            continue
+        ratio = current / base
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<34} {base:>12.2f} {current:>12.2f} {ratio:>7.2f}{flag}")
+
+    return regressions
+
+
+@dataclass
+class Options:
+    only: Optional[str] = None
+    repeat: int = 5
+    scale: float = 1.0
+    output: str = RESULTS_PATH
+    baseline: str = BASELINE_PATH
+    save_baseline: bool = False
+    # current / baseline above this counts as a regression
+    threshold: float = 1.25
+    fail_on_regression: bool = False
+
+
+def main():
+    options, _ = simple_parsing.parse_known_args(Options)
+    results = run(options.only, options.repeat, options.scale)
+
+    document = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(options.output, "w") as f:
+        json.dump(document, f, indent=2)
+
+    if options.save_baseline:
+        with open(options.baseline, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"Saved baseline to {options.baseline}")
+
+    try:
+        with open(options.baseline) as f:
+            baseline = json.load(f)["results"]
+    except FileNotFoundError:
+        baseline = {}
+
+    regressions = compare(results, baseline, options.threshold)
+
+    if regressions and options.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Limits on how much work the server takes on, so one busy client can't
+starve every other table on the event loop.
+
+Each connection gets a token bucket, commands over its rate are dropped
+unread and the sender told to back off.  Past max_connections new
+connections are turned away, and past max_tables create_table is.  Either
+way the client hears "busy" with how long to wait, rather than the work
+piling up.
+
+    bucket = ADMISSION.bucket()
+    wait = bucket.take()  # 0.0 if the command may run
+"""
+
+import time
+from typing import Callable, Optional
+
+# Commands a second each connection may send, on average, 0 for no limit
+RATE = 20.0
+# Commands a connection may send at once after a quiet spell
+BURST = 40
+# Seconds a client turned away for capacity is told to wait
+RETRY_AFTER = 5.0
+
+# Close code for connections turned away, 1013 is try again later
+BUSY_CLOSE_CODE = 1013
+
+
+class TokenBucket:
+    def __init__(
+        self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.last = clock()
+
+    def take(self) -> float:
+        """
+        Takes a token if there is one and returns 0.0, otherwise the
+        seconds until there will be
+        """
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+
+        return (1 - self.tokens) / self.rate
+
+
+class Admission:
+    """
+    The server's limits, 0 turns any of them off
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE,
+        burst: int = BURST,
+        max_connections: int = 0,
+        max_tables: int = 0,
+        retry_after: float = RETRY_AFTER,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_connections = max_connections
+        self.max_tables = max_tables
+        self.retry_after = retry_after
+
+    def bucket(self) -> Optional[TokenBucket]:
+        if not self.rate:
+            return None
+
+        return TokenBucket(self.rate, self.burst)
+
+    def connections_full(self, connections: int) -> bool:
+        return bool(self.max_connections) and connections >= self.max_connections
+
+    def tables_full(self, tables: int) -> bool:
+        return bool(self.max_tables) and tables >= self.max_tables
+
+
+ADMISSION = Admission()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+"""
+Plays many rounds of hearts in lockstep with NumPy, for bot research.
+
+Every game in the batch is at the same trick and the same position in it,
+so each step is a handful of array operations over the whole batch.  Cards
+are numbered by their ordinal, the same as Card.ordinal and cardset bits:
+clubs 0-12, diamonds 13-25, spades 26-38, hearts 39-51.
+
+The rules follow Game.play_card:
+
+- the first trick is led with the two of clubs
+- followers must follow suit if they can
+- nobody may throw the queen of spades on the first trick
+- hearts can't be led until broken, unless the hand is only hearts
+
+    python -m hearts_textual.batch --batch 4096 --rounds 10
+"""
+
+from dataclasses import dataclass
+import time
+from typing import Callable, Optional
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover
+    raise ImportError(
+        "The batch engine needs numpy, install it with: poetry install -E batch"
+    ) from e
+
+import simple_parsing
+
+from hearts_textual.data import QUEEN_OF_SPADES, TWO_OF_CLUBS, suit_rank, HEART
+
+
+CARD_COUNT = 52
+SUIT_SIZE = 13
+CARD_SUITS = np.arange(CARD_COUNT) // SUIT_SIZE
+HEART_SUIT = suit_rank[HEART]
+HEART_CARDS = CARD_SUITS == HEART_SUIT
+QUEEN_OF_SPADES_CARD = QUEEN_OF_SPADES.ordinal
+TWO_OF_CLUBS_CARD = TWO_OF_CLUBS.ordinal
+NO_CARD = -1
+
+# Picks one card per game from a (batch, 52) legality mask
+Policy = Callable[[np.ndarray, np.random.Generator], np.ndarray]
+
+
+def random_policy(legal: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    weights = rng.random(legal.shape)
+    weights[~legal] = -1.0
+
+    return weights.argmax(axis=1)
+
+
+def lowest_policy(legal: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    return legal.argmax(axis=1)
+
+
+def highest_policy(legal: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    return CARD_COUNT - 1 - legal[:, ::-1].argmax(axis=1)
+
+
+def shuffled_decks(batch: int, rng: np.random.Generator) -> np.ndarray:
+    return rng.permuted(np.tile(np.arange(CARD_COUNT), (batch, 1)), axis=1)
+
+
+@dataclass
+class BatchRound:
+    """
+    One round of hearts for each of batch games
+    """
+
+    hands: np.ndarray  # (batch, 4, 52) bool
+    leader: np.ndarray  # (batch,) seat leading the current trick
+    trick_cards: np.ndarray  # (batch, 4) card played by each seat, or NO_CARD
+    lead_suit: np.ndarray  # (batch,)
+    hearts_broken: np.ndarray  # (batch,) bool
+    points: np.ndarray  # (batch, 4) hearts and queen taken so far
+    trick: int = 1
+    position: int = 0
+
+    @staticmethod
+    def deal(decks: np.ndarray) -> "BatchRound":
+        """
+        Card i of each deck goes to seat i % 4, same as Game.deal
+        """
+        batch = decks.shape[0]
+        hands = np.zeros((batch, 4, CARD_COUNT), dtype=bool)
+        seats = np.arange(CARD_COUNT) % 4
+        hands[np.arange(batch)[:, None], seats[None, :], decks] = True
+
+        return BatchRound(
+            hands=hands,
+            leader=hands[:, :, TWO_OF_CLUBS_CARD].argmax(axis=1),
+            trick_cards=np.full((batch, 4), NO_CARD),
+            lead_suit=np.zeros(batch, dtype=np.int64),
+            hearts_broken=np.zeros(batch, dtype=bool),
+            points=np.zeros((batch, 4), dtype=np.int64),
+        )
+
+    @property
+    def batch(self) -> int:
+        return int(self.hands.shape[0])
+
+    @property
+    def finished(self) -> bool:
+        return self.trick > 13
+
+    def current_seat(self) -> np.ndarray:
+        return (self.leader + self.position) % 4
+
+    def current_hands(self) -> np.ndarray:
+        return self.hands[np.arange(self.batch), self.current_seat()]
+
+    def legal(self) -> np.ndarray:
+        """
+        (batch, 52) mask of the cards the current seat may play
+        """
+        hand = self.current_hands()
+
+        if self.position == 0:
+            if self.trick == 1:
+                legal = np.zeros_like(hand)
+                legal[:, TWO_OF_CLUBS_CARD] = hand[:, TWO_OF_CLUBS_CARD]
+                return legal
+
+            no_hearts = hand & ~HEART_CARDS
+            may_lead_hearts = self.hearts_broken | ~no_hearts.any(axis=1)
+            return np.where(may_lead_hearts[:, None], hand, no_hearts)
+
+        in_suit = hand & (CARD_SUITS[None, :] == self.lead_suit[:, None])
+        legal = np.where(in_suit.any(axis=1)[:, None], in_suit, hand)
+        if self.trick == 1:
+            legal[:, QUEEN_OF_SPADES_CARD] = False
+
+        return legal
+
+    def play(self, cards: np.ndarray) -> None:
+        rows = np.arange(self.batch)
+        seats = self.current_seat()
+
+        self.hands[rows, seats, cards] = False
+        self.trick_cards[rows, seats] = cards
+        self.hearts_broken |= HEART_CARDS[cards]
+        if self.position == 0:
+            self.lead_suit = CARD_SUITS[cards]
+
+        self.position += 1
+        if self.position == 4:
+            self._finish_trick()
+
+    def trick_winners(self) -> np.ndarray:
+        following = CARD_SUITS[self.trick_cards] == self.lead_suit[:, None]
+
+        return np.where(following, self.trick_cards, -1).argmax(axis=1)
+
+    def _finish_trick(self) -> None:
+        winners = self.trick_winners()
+        taken = HEART_CARDS[self.trick_cards].sum(axis=1) + 13 * (
+            self.trick_cards == QUEEN_OF_SPADES_CARD
+        ).any(axis=1)
+
+        self.points[np.arange(self.batch), winners] += taken
+        self.leader = winners
+        self.trick_cards.fill(NO_CARD)
+        self.position = 0
+        self.trick += 1
+
+    def scores(self) -> np.ndarray:
+        """
+        Same as Game.score_round, shooting the moon gives everyone else 26
+        """
+        moon = (self.points == 26).any(axis=1)
+
+        return np.where(moon[:, None], 26 - self.points, self.points)
+
+
+def play_round(
+    decks: np.ndarray, policy: Policy, rng: Optional[np.random.Generator] = None
+) -> np.ndarray:
+    """
+    Plays a dealt round out and returns the (batch, 4) round scores
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    state = BatchRound.deal(decks)
+
+    while not state.finished:
+        state.play(policy(state.legal(), rng))
+
+    return state.scores()
+
+
+@dataclass
+class Options:
+    batch: int = 4096
+    rounds: int = 10
+    seed: Optional[int] = None
+
+
+def main():
+    options, _ = simple_parsing.parse_known_args(Options)
+    rng = np.random.default_rng(options.seed)
+
+    start = time.perf_counter()
+    totals = np.zeros((options.batch, 4), dtype=np.int64)
+    for _ in range(options.rounds):
+        totals += play_round(shuffled_decks(options.batch, rng), random_policy, rng)
+    seconds = time.perf_counter() - start
+
+    rounds = options.batch * options.rounds
+    print(f"{rounds} rounds in {seconds:.3f}s, {rounds / seconds:.0f} rounds/sec")
+    print(f"mean points per seat: {totals.mean(axis=0) / options.rounds}")
+
+
+if __name__ == "__main__":
+    main()
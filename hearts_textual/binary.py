@@ -0,0 +1,518 @@
+"""
+Compact binary framing, for clients that ask for it through the websocket
+subprotocol handshake.  Everyone else keeps getting JSON, and both kinds of
+client can sit at the same table.
+
+Every frame starts with a format byte and a kind byte.
+
+KIND_UPDATE frames carry a full state in a fixed layout:
+
+    varint version, varint round, u8 turn, u8 flags, u8 lead_player
+    u8 count + u8 each: turn_order
+    u8 count + card each: played_cards, deck
+    u8 player count, then per player:
+        varint length + utf-8 name, u8 flags
+        u8 count + card each: hand, pile
+        card: play
+        varint count + zigzag varint each: scores
+    u8 summary kind, then the summary
+    varint count + (varint length + utf-8) each: messages
+    u8 count + card each: legal, left off by older servers
+    varint length + utf-8: session token, only on a joiner's own update
+
+Cards are one byte, their ordinal, with NO_CARD for None.
+
+KIND_DELTA frames carry the changes since the client's last state:
+
+    varint base, varint version, varint checksum
+    varint count + (varint length + utf-8) each: messages
+    u8 1 + count + card each: legal, or u8 0 for none
+    varint count + (path, value) each: changes, then appends
+    varint count + (path, varint count + varint each) each: removes
+
+Paths are varint length + utf-8.  Values start with a tag byte, cards and
+lists of cards or ints get their own compact tags, anything else is JSON.
+KIND_REPLAY frames are a varint count and that many delta bodies.
+
+KIND_JSON frames carry any other message as its command name and the
+args as compact JSON.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from websockets.typing import Subprotocol
+
+from hearts_textual import codec
+from hearts_textual.data import CARDS, Card, Game, Message
+
+
+SUBPROTOCOL_JSON = Subprotocol("hearts.json")
+SUBPROTOCOL_BINARY = Subprotocol("hearts.bin")
+SUBPROTOCOLS: List[Subprotocol] = [SUBPROTOCOL_BINARY, SUBPROTOCOL_JSON]
+
+FORMAT = 1
+KIND_JSON = 0
+KIND_UPDATE = 1
+KIND_DELTA = 2
+KIND_REPLAY = 3
+
+NO_CARD = 0xFF
+NO_PLAYER = 0xFF
+
+SUMMARY_EMPTY = 0
+SUMMARY_LAST_HAND = 1
+SUMMARY_JSON = 2
+
+GAME_STARTED = 1
+GAME_ENDED = 2
+GAME_BOTS = 4
+GAME_HEARTS_BROKEN = 8
+
+PLAYER_BOT = 1
+PLAYER_CONNECTED = 2
+
+VALUE_JSON = 0
+VALUE_INT = 1
+VALUE_FALSE = 2
+VALUE_TRUE = 3
+# A card, or None
+VALUE_CARD = 4
+VALUE_CARDS = 5
+VALUE_INTS = 6
+
+DELTA_KEYS = {
+    "base",
+    "version",
+    "checksum",
+    "messages",
+    "legal",
+    "changes",
+    "appends",
+    "removes",
+}
+
+
+class BinaryFrameError(codec.FrameError):
+    pass
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def _card_byte(card: Any) -> int:
+    if card is None:
+        return NO_CARD
+
+    return Card.from_dict(card).ordinal
+
+
+def _write_cards(out: bytearray, cards: List[Any]) -> None:
+    out.append(len(cards))
+    out.extend(_card_byte(card) for card in cards)
+
+
+def _write_str(out: bytearray, value: str) -> None:
+    data = value.encode()
+    _write_varint(out, len(data))
+    out.extend(data)
+
+
+def _write_summary(out: bytearray, summary: Dict[str, Any]) -> None:
+    if not summary:
+        out.append(SUMMARY_EMPTY)
+    elif summary.keys() == {"last_hand", "turn_order"}:
+        out.append(SUMMARY_LAST_HAND)
+        _write_cards(out, summary["last_hand"])
+        out.append(len(summary["turn_order"]))
+        out.extend(summary["turn_order"])
+    else:
+        out.append(SUMMARY_JSON)
+        _write_str(out, json.dumps(codec.encode_value(summary, compact=True)))
+
+
+def _write_state(out: bytearray, state: Dict[str, Any]) -> None:
+    flags = (
+        (GAME_STARTED if state["started"] else 0)
+        | (GAME_ENDED if state["ended"] else 0)
+        | (GAME_BOTS if state["bots"] else 0)
+        | (GAME_HEARTS_BROKEN if state["hearts_broken"] else 0)
+    )
+    lead_player = state["lead_player"]
+
+    _write_varint(out, state["version"])
+    _write_varint(out, state["round"])
+    out.append(state["turn"])
+    out.append(flags)
+    out.append(NO_PLAYER if lead_player is None else lead_player)
+    out.append(len(state["turn_order"]))
+    out.extend(state["turn_order"])
+    _write_cards(out, state["played_cards"])
+    _write_cards(out, state["deck"])
+
+    out.append(len(state["players"]))
+    for player in state["players"]:
+        _write_str(out, player["name"])
+        out.append(
+            (PLAYER_BOT if player["bot"] else 0)
+            | (PLAYER_CONNECTED if player["connected"] else 0)
+        )
+        _write_cards(out, player["hand"])
+        _write_cards(out, player["pile"])
+        out.append(_card_byte(player["play"]))
+        _write_varint(out, len(player["scores"]))
+        for score in player["scores"]:
+            _write_varint(out, _zigzag(score))
+
+    _write_summary(out, state["summary"])
+
+
+def _is_card(value: Any) -> bool:
+    return type(value) is dict and value.keys() == {"suit", "value"}
+
+
+def _write_value(out: bytearray, value: Any) -> None:
+    kind = type(value)
+    if kind is int:
+        out.append(VALUE_INT)
+        _write_varint(out, _zigzag(value))
+    elif kind is bool:
+        out.append(VALUE_TRUE if value else VALUE_FALSE)
+    elif value is None or _is_card(value):
+        out.append(VALUE_CARD)
+        out.append(_card_byte(value))
+    elif kind is list and len(value) < 256 and all(map(_is_card, value)):
+        out.append(VALUE_CARDS)
+        _write_cards(out, value)
+    elif kind is list and all(type(item) is int for item in value):
+        out.append(VALUE_INTS)
+        _write_varint(out, len(value))
+        for item in value:
+            _write_varint(out, _zigzag(item))
+    else:
+        out.append(VALUE_JSON)
+        _write_str(out, json.dumps(codec.encode_value(value)))
+
+
+def _write_delta(out: bytearray, args: Dict[str, Any]) -> None:
+    _write_varint(out, args["base"])
+    _write_varint(out, args["version"])
+    _write_varint(out, args["checksum"])
+    _write_varint(out, len(args["messages"]))
+    for text in args["messages"]:
+        _write_str(out, text)
+
+    legal = args.get("legal")
+    if legal is None:
+        out.append(0)
+    else:
+        out.append(1)
+        _write_cards(out, legal)
+
+    for part in ("changes", "appends"):
+        _write_varint(out, len(args[part]))
+        for path, value in args[part].items():
+            _write_str(out, path)
+            _write_value(out, value)
+
+    _write_varint(out, len(args["removes"]))
+    for path, indexes in args["removes"].items():
+        _write_str(out, path)
+        _write_varint(out, len(indexes))
+        for index in indexes:
+            _write_varint(out, index)
+
+
+def encode_message(message: Message) -> bytes:
+    out = bytearray([FORMAT])
+    args: Dict[str, Any] = message.args
+    state = args.get("state")
+
+    if message.command == "update" and state is not None:
+        if type(state) is Game:
+            state = codec.encode_game(state)
+        out.append(KIND_UPDATE)
+        _write_state(out, state)
+        messages = args.get("messages", [])
+        _write_varint(out, len(messages))
+        for text in messages:
+            _write_str(out, text)
+        _write_cards(out, args.get("legal", []))
+        session = args.get("session")
+        if session is not None:
+            _write_str(out, session)
+    elif message.command == "delta" and args.keys() == DELTA_KEYS:
+        out.append(KIND_DELTA)
+        _write_delta(out, args)
+    elif (
+        message.command == "replay"
+        and args.keys() == {"deltas"}
+        and all(
+            type(entry) is dict and entry.keys() == DELTA_KEYS
+            for entry in args["deltas"]
+        )
+    ):
+        out.append(KIND_REPLAY)
+        _write_varint(out, len(args["deltas"]))
+        for entry in args["deltas"]:
+            _write_delta(out, entry)
+    else:
+        out.append(KIND_JSON)
+        _write_str(out, message.command)
+        _write_str(out, json.dumps(codec.encode_value(args)))
+
+    return bytes(out)
+
+
+class _Reader:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.pos = 0
+
+    def u8(self) -> int:
+        try:
+            value = self.data[self.pos]
+        except IndexError:
+            raise BinaryFrameError("Frame ended early")
+        self.pos += 1
+        return value
+
+    def varint(self) -> int:
+        value = 0
+        shift = 0
+        while True:
+            byte = self.u8()
+            value |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return value
+            shift += 7
+
+    def raw(self, length: int) -> bytes:
+        if self.pos + length > len(self.data):
+            raise BinaryFrameError("Frame ended early")
+        value = self.data[self.pos : self.pos + length]
+        self.pos += length
+        return value
+
+    def text(self) -> str:
+        return self.raw(self.varint()).decode()
+
+    def card(self) -> Dict[str, str] | None:
+        ordinal = self.u8()
+        if ordinal == NO_CARD:
+            return None
+        if ordinal >= len(CARDS):
+            raise BinaryFrameError(f"Invalid card byte {ordinal}")
+
+        card: Dict[str, str] = codec.encode_card(CARDS[ordinal])
+        return card
+
+    def cards(self) -> List[Dict[str, str]]:
+        return [self.card() for _ in range(self.u8())]  # type: ignore[misc]
+
+    def at_end(self) -> bool:
+        return self.pos >= len(self.data)
+
+    def u8s(self) -> List[int]:
+        return list(self.raw(self.u8()))
+
+    def legal(self) -> List[str]:
+        cards = self.cards()
+        if None in cards:
+            raise BinaryFrameError("No card among legal cards")
+
+        return [repr(Card.from_dict(card)) for card in cards]
+
+
+def _read_summary(reader: _Reader) -> Dict[str, Any]:
+    kind = reader.u8()
+    if kind == SUMMARY_EMPTY:
+        return {}
+    if kind == SUMMARY_LAST_HAND:
+        return {"last_hand": reader.cards(), "turn_order": reader.u8s()}
+    if kind == SUMMARY_JSON:
+        summary: Dict[str, Any] = json.loads(reader.text())
+        return summary
+
+    raise BinaryFrameError(f"Invalid summary kind {kind}")
+
+
+def _read_value(reader: _Reader) -> Any:
+    tag = reader.u8()
+    if tag == VALUE_INT:
+        return _unzigzag(reader.varint())
+    if tag in (VALUE_FALSE, VALUE_TRUE):
+        return tag == VALUE_TRUE
+    if tag == VALUE_CARD:
+        return reader.card()
+    if tag == VALUE_CARDS:
+        return reader.cards()
+    if tag == VALUE_INTS:
+        return [_unzigzag(reader.varint()) for _ in range(reader.varint())]
+    if tag == VALUE_JSON:
+        return json.loads(reader.text())
+
+    raise BinaryFrameError(f"Invalid value tag {tag}")
+
+
+def _read_delta(reader: _Reader) -> Dict[str, Any]:
+    """
+    Returns the same args the server built the delta from
+    """
+    base = reader.varint()
+    version = reader.varint()
+    checksum = reader.varint()
+    messages = [reader.text() for _ in range(reader.varint())]
+    legal = None
+    if reader.u8():
+        legal = reader.legal()
+
+    changes = {reader.text(): _read_value(reader) for _ in range(reader.varint())}
+    appends = {reader.text(): _read_value(reader) for _ in range(reader.varint())}
+    removes = {
+        reader.text(): [reader.varint() for _ in range(reader.varint())]
+        for _ in range(reader.varint())
+    }
+
+    return {
+        "base": base,
+        "version": version,
+        "checksum": checksum,
+        "messages": messages,
+        "legal": legal,
+        "changes": changes,
+        "appends": appends,
+        "removes": removes,
+    }
+
+
+def _read_state(reader: _Reader) -> Dict[str, Any]:
+    """
+    Returns the same dict codec.encode_game would have
+    """
+    version = reader.varint()
+    round = reader.varint()
+    turn = reader.u8()
+    flags = reader.u8()
+    lead_player = reader.u8()
+    turn_order = reader.u8s()
+    played_cards = reader.cards()
+    deck = reader.cards()
+
+    players = []
+    for _ in range(reader.u8()):
+        name = reader.text()
+        player_flags = reader.u8()
+        hand = reader.cards()
+        pile = reader.cards()
+        play = reader.card()
+        scores = [_unzigzag(reader.varint()) for _ in range(reader.varint())]
+        players.append(
+            {
+                "name": name,
+                "bot": bool(player_flags & PLAYER_BOT),
+                "connected": bool(player_flags & PLAYER_CONNECTED),
+                "hand": hand,
+                "play": play,
+                "pile": pile,
+                "scores": scores,
+            }
+        )
+
+    return {
+        "version": version,
+        "round": round,
+        "turn": turn,
+        "started": bool(flags & GAME_STARTED),
+        "ended": bool(flags & GAME_ENDED),
+        "bots": bool(flags & GAME_BOTS),
+        "hearts_broken": bool(flags & GAME_HEARTS_BROKEN),
+        "deck": deck,
+        "lead_player": None if lead_player == NO_PLAYER else lead_player,
+        "players": players,
+        "turn_order": turn_order,
+        "played_cards": played_cards,
+        "summary": _read_summary(reader),
+    }
+
+
+def decode_message(frame: bytes) -> Message:
+    reader = _Reader(frame)
+
+    version = reader.u8()
+    if version != FORMAT:
+        raise BinaryFrameError(f"Unknown frame format {version}")
+
+    kind = reader.u8()
+    if kind == KIND_UPDATE:
+        state = _read_state(reader)
+        messages = [reader.text() for _ in range(reader.varint())]
+        args: Dict[str, Any] = {"state": state, "messages": messages}
+        if not reader.at_end():
+            args["legal"] = reader.legal()
+        if not reader.at_end():
+            args["session"] = reader.text()
+        return Message(command="update", args=args)
+    if kind == KIND_DELTA:
+        return Message(command="delta", args=_read_delta(reader))
+    if kind == KIND_REPLAY:
+        deltas = [_read_delta(reader) for _ in range(reader.varint())]
+        return Message(command="replay", args={"deltas": deltas})
+    if kind == KIND_JSON:
+        command = reader.text()
+        return codec.envelope({"command": command, "args": json.loads(reader.text())})
+
+    raise BinaryFrameError(f"Unknown frame kind {kind}")
+
+
+def decode_frame(frame: str | bytes) -> Message:
+    """
+    Text frames are JSON, binary frames are ours
+    """
+    if type(frame) is bytes:
+        try:
+            return decode_message(frame)
+        except ValueError as error:
+            # Text or JSON inside that doesn't decode
+            raise BinaryFrameError(f"Bad frame contents: {error}")
+
+    return codec.decode_message(frame)
+
+
+def wants_binary(websocket) -> bool:
+    return getattr(websocket, "subprotocol", None) == SUBPROTOCOL_BINARY
+
+
+def encode_for(
+    recipients: Iterable[Any], message: Message
+) -> List[Tuple[Set[Any], str | bytes]]:
+    """
+    Encodes message once per protocol in use among recipients
+    """
+    json_sockets = set()
+    binary_sockets = set()
+    for websocket in recipients:
+        if wants_binary(websocket):
+            binary_sockets.add(websocket)
+        else:
+            json_sockets.add(websocket)
+
+    frames: List[Tuple[Set[Any], str | bytes]] = []
+    if json_sockets:
+        frames.append((json_sockets, codec.encode_message(message)))
+    if binary_sockets:
+        frames.append((binary_sockets, encode_message(message)))
+
+    return frames
@@ -0,0 +1,50 @@
+"""
+52-bit integer card sets.
+
+Bit n stands for the card at index n of the deck, where a card's index is
+its suit's position in suit_order times 13 plus its value's position in
+value_order.  So clubs are bits 0-12, diamonds 13-25, spades 26-38 and
+hearts 39-51, and within a suit higher bits are higher cards.
+"""
+
+from typing import Iterator
+
+
+CARD_COUNT = 52
+SUIT_SIZE = 13
+FULL = (1 << CARD_COUNT) - 1
+SUIT_MASKS = tuple(((1 << SUIT_SIZE) - 1) << (SUIT_SIZE * i) for i in range(4))
+
+
+def bit(index: int) -> int:
+    return 1 << index
+
+
+def count(mask: int) -> int:
+    return mask.bit_count()
+
+
+def suit_count(mask: int, suit_index: int) -> int:
+    return (mask & SUIT_MASKS[suit_index]).bit_count()
+
+
+def has_suit(mask: int, suit_index: int) -> bool:
+    return mask & SUIT_MASKS[suit_index] != 0
+
+
+def indexes(mask: int) -> Iterator[int]:
+    """
+    Card indexes in the set, lowest first
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def lowest(mask: int) -> int:
+    return (mask & -mask).bit_length() - 1
+
+
+def highest(mask: int) -> int:
+    return mask.bit_length() - 1
@@ -6,13 +6,27 @@ import json
 import asyncio
 import websockets
 
-from hearts_textual.commands import run_command
+from hearts_textual import admission, binary, cluster
+from hearts_textual.commands import (
+    CLIENT_BUSY,
+    CLIENT_REDIRECTS,
+    CLIENT_SESSIONS,
+    CLIENT_STATES,
+    run_command,
+)
+from hearts_textual.data import Message
 from tui.messages import BasicMessage, ToasterMessage
 
+# Seconds to wait before each reconnect attempt, giving up after the last
+RECONNECT_DELAYS = [0.5, 1, 2, 4, 8]
+
 
 async def consumer_handler(websocket, app):
     async for message in websocket:
         response, game = run_command(message, websocket)
+        if websocket in CLIENT_REDIRECTS:
+            # Hang up, the client loop reconnects where it was sent
+            return
         if type(response) is list:
             for resp in response:
                 app.post_message(BasicMessage(resp, game))
@@ -20,28 +34,86 @@ async def consumer_handler(websocket, app):
             app.post_message(BasicMessage(response, game))
 
 
-async def producer_handler(websocket, app, name):
-    await websocket.send(json.dumps({"command": "join", "args": {"name": name}}))
+async def send_command(websocket, command: dict) -> None:
+    if binary.wants_binary(websocket):
+        await websocket.send(binary.encode_message(Message(**command)))
+    else:
+        await websocket.send(json.dumps(command))
+
+
+async def producer_handler(websocket, app, first: dict):
+    await send_command(websocket, first)
     while True:
         command = await app.command_queue.get()
-        await websocket.send(json.dumps(command))
+        await send_command(websocket, command)
         app.command_queue.task_done()
 
 
-async def client(app, name):
+async def client(app, name, table=None, use_binary=False):
     uri = "ws://localhost:8765"
+    subprotocols = binary.SUBPROTOCOLS if use_binary else [binary.SUBPROTOCOL_JSON]
+    args = {"name": name}
+    if table is not None:
+        args["table"] = table
+    first = {"command": "join", "args": args}
+    resuming = False
+    state = None
+    delays = iter(RECONNECT_DELAYS)
+
+    while True:
+        try:
+            websocket = await websockets.connect(uri, subprotocols=subprotocols)
+        except OSError:
+            delay = next(delays, None)
+            if not resuming or delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        delays = iter(RECONNECT_DELAYS)
+
+        async with websocket:
+            if app is not None:
+                app.websocket = websocket
+            if state is not None:
+                # Deltas the server replays apply on top of what we had
+                CLIENT_STATES[websocket] = state
+            consumer_task = asyncio.create_task(consumer_handler(websocket, app))
+            producer_task = asyncio.create_task(producer_handler(websocket, app, first))
+            done, pending = await asyncio.wait(
+                [consumer_task, producer_task],
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in pending:
+                task.cancel()
+            for task in done:
+                error = task.exception()
+                if error is not None and not isinstance(
+                    error, websockets.ConnectionClosed
+                ):
+                    raise error
+
+        moved = CLIENT_REDIRECTS.pop(websocket, None)
+        wait = CLIENT_BUSY.pop(websocket, admission.RETRY_AFTER)
+        token = CLIENT_SESSIONS.pop(websocket, None)
+        state = CLIENT_STATES.pop(websocket, None)
+        if moved is not None:
+            # Another worker has the table, ask it the same thing
+            uri = cluster.redirected(uri, moved["port"])
+            first = {"command": moved["command"], "args": moved["args"]}
+            continue
+        if websocket.close_code == admission.BUSY_CLOSE_CODE:
+            # Turned away at the door, try again when the server said to
+            await asyncio.sleep(wait)
+            continue
+        if token is None:
+            return
 
-    async with websockets.connect(uri) as websocket:
-        if app is not None:
-            app.websocket = websocket
-        consumer_task = asyncio.create_task(consumer_handler(websocket, app))
-        producer_task = asyncio.create_task(producer_handler(websocket, app, name))
-        done, pending = await asyncio.wait(
-            [consumer_task, producer_task],
-            # return_when=asyncio.FIRST_COMPLETED,
-        )
-        for task in pending:
-            task.cancel()
+        # Joins as name instead if the server has forgotten the session
+        resume = {**args, "token": token}
+        if state is not None:
+            resume["version"] = state["version"]
+        first = {"command": "resume", "args": resume}
+        resuming = True
 
 
 if __name__ == "__main__":
@@ -0,0 +1,107 @@
+"""
+Runs the server as several worker processes on one box, so it can use
+more than one core.
+
+Every worker listens on the public port with SO_REUSEPORT, the kernel
+hands each new connection to one of them, and on a port of its own,
+port + 1 + index.  Tables belong to workers by a hash of their id.  A
+worker asked to join, watch or resume a table it doesn't own answers with
+a redirect to the owner's own port, the client reconnects there and sends
+the same command again.  Tables a worker creates always get ids it owns,
+so create_table never needs one.
+
+    python -m hearts_textual.server --workers 8
+"""
+
+from dataclasses import dataclass
+import multiprocessing
+import signal
+from typing import Any, Callable, List, Set
+from urllib.parse import urlsplit, urlunsplit
+import zlib
+
+
+def owner(table_id: str, workers: int) -> int:
+    return zlib.crc32(table_id.encode()) % workers
+
+
+def worker_port(port: int, index: int) -> int:
+    return port + 1 + index
+
+
+@dataclass(frozen=True)
+class Shard:
+    """
+    One worker's place in the cluster
+    """
+
+    index: int
+    workers: int
+    # The public port every worker shares
+    port: int
+
+    @property
+    def own_port(self) -> int:
+        return worker_port(self.port, self.index)
+
+    def owns(self, table_id: str) -> bool:
+        return owner(table_id, self.workers) == self.index
+
+    def port_of(self, table_id: str) -> int:
+        return worker_port(self.port, owner(table_id, self.workers))
+
+
+def redirected(uri: str, port: int) -> str:
+    """
+    uri with its port swapped for the one a redirect named
+    """
+    parts = urlsplit(uri)
+    host = parts.hostname or "localhost"
+
+    return urlunsplit(parts._replace(netloc=f"{host}:{port}"))
+
+
+def run_workers(
+    target: Callable[..., None], workers: int, port: int, *args: Any
+) -> None:
+    """
+    Runs target(shard, *args) in a process per worker, until they all exit
+    or this one is told to stop
+    """
+    context = multiprocessing.get_context("spawn")
+    processes: List[Any] = [
+        context.Process(
+            target=target,
+            args=(Shard(index, workers, port), *args),
+            name=f"hearts-worker-{index}",
+        )
+        for index in range(workers)
+    ]
+
+    stopped: Set[int] = set()
+
+    def stop(signum: int, frame: Any) -> None:
+        # Without this SIGTERM kills only us and leaves the workers serving.
+        # Each worker hears it once, a second SIGTERM would cut its cleanup
+        # short.
+        for index, process in enumerate(processes):
+            if process.is_alive() and index not in stopped:
+                stopped.add(index)
+                process.terminate()
+
+    previous = {
+        signum: signal.signal(signum, stop)
+        for signum in (signal.SIGTERM, signal.SIGINT)
+    }
+    try:
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    finally:
+        stop(0, None)
+        for process in processes:
+            if process.pid is not None:
+                process.join()
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
@@ -0,0 +1,192 @@
+"""
+Hand written encode/decode for Message and Game.
+
+dataclasses_json walks every field of every nested dataclass by reflection,
+which makes it the most expensive thing the server does per frame.  These
+functions know the schema up front and build plain dicts directly.
+
+The output is the same JSON dataclasses_json produces, so older clients
+keep working.  Passing compact=True writes cards in their repr form ("QS")
+instead of {"suit": "S", "value": "Q"}; decoding accepts either.
+"""
+
+import json
+from typing import Any, Dict, List
+
+from hearts_textual.data import Card, CardList, Game, Message, Player, mask_of
+
+
+_encoder = json.JSONEncoder(separators=(",", ":"))
+_decoder = json.JSONDecoder()
+
+
+class FrameError(Exception):
+    """
+    A frame that isn't a message at all
+    """
+
+
+def encode_card(card: Card | None, compact: bool = False) -> Any:
+    if card is None:
+        return None
+    if compact:
+        return repr(card)
+
+    return {"suit": card.suit.value, "value": card.value.value}
+
+
+def encode_cards(cards: List[Card], compact: bool = False) -> List[Any]:
+    if compact:
+        return [repr(card) for card in cards]
+
+    return [{"suit": card.suit.value, "value": card.value.value} for card in cards]
+
+
+def decode_card(card: Any) -> Card | None:
+    if card is None:
+        return None
+
+    return Card.from_dict(card)
+
+
+def decode_cards(cards: List[Any]) -> CardList:
+    return CardList(Card.from_dict(card) for card in cards)
+
+
+def encode_player(player: Player, compact: bool = False) -> Dict[str, Any]:
+    return {
+        "name": player.name,
+        "bot": player.bot,
+        "connected": player.connected,
+        "hand": encode_cards(player.hand, compact),
+        "play": encode_card(player.play, compact),
+        "pile": encode_cards(player.pile, compact),
+        "scores": list(player.scores),
+    }
+
+
+def decode_player(player: Dict[str, Any]) -> Player:
+    return Player(
+        name=player["name"],
+        bot=player.get("bot", False),
+        connected=player.get("connected", False),
+        hand=decode_cards(player.get("hand", [])),
+        play=decode_card(player.get("play")),
+        pile=decode_cards(player.get("pile", [])),
+        scores=list(player.get("scores", [])),
+    )
+
+
+def encode_game(game: Game, compact: bool = False) -> Dict[str, Any]:
+    return {
+        "version": game.version,
+        "round": game.round,
+        "turn": game.turn,
+        "started": game.started,
+        "ended": game.ended,
+        "bots": game.bots,
+        "hearts_broken": game.hearts_broken,
+        "deck": encode_cards(game.deck, compact),
+        "lead_player": game.lead_player,
+        "players": [encode_player(player, compact) for player in game.players],
+        "turn_order": list(game.turn_order),
+        "played_cards": encode_cards(game.played_cards, compact),
+        "summary": encode_value(game.summary, compact),
+    }
+
+
+def decode_game(game: Dict[str, Any]) -> Game:
+    """
+    Like Game.from_dict, summary is left as plain decoded JSON
+    """
+    return Game(
+        version=game.get("version", 0),
+        round=game.get("round", 0),
+        turn=game.get("turn", 0),
+        started=game.get("started", False),
+        ended=game.get("ended", False),
+        bots=game.get("bots", False),
+        hearts_broken=game.get("hearts_broken", False),
+        deck=decode_cards(game.get("deck", [])),
+        lead_player=game.get("lead_player"),
+        players=[decode_player(player) for player in game["players"]],
+        turn_order=list(game.get("turn_order", [])),
+        played_cards=decode_cards(game.get("played_cards", [])),
+        summary=game.get("summary", {}),
+    )
+
+
+def encode_legal(game: Game) -> List[str]:
+    """
+    Cards whoever is on turn may play, for the TUI to highlight
+    """
+    player = game.player_to_play()
+    if player is None:
+        return []
+
+    return [repr(card) for card in game.legal_moves(player)]
+
+
+def decode_legal(game: Game, legal: List[Any]) -> Game:
+    game._cache_legal(mask_of(Card.from_dict(card) for card in legal))
+
+    return game
+
+
+def encode_value(value: Any, compact: bool = False) -> Any:
+    """
+    Turns anything that can appear in Message.args into plain JSON values
+    """
+    if value is None or type(value) in (str, int, bool, float):
+        return value
+    if type(value) is Card:
+        return encode_card(value, compact)
+    if type(value) is Game:
+        return encode_game(value, compact)
+    if type(value) is Player:
+        return encode_player(value, compact)
+    if isinstance(value, dict):
+        return {key: encode_value(item, compact) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [encode_value(item, compact) for item in value]
+    if isinstance(value, str):
+        # StrEnum members
+        return str(value)
+
+    return value
+
+
+def message_to_dict(message: Message, compact: bool = False) -> Dict[str, Any]:
+    return {"command": message.command, "args": encode_value(message.args, compact)}
+
+
+def encode_message(message: Message, compact: bool = False) -> str:
+    return _encoder.encode(message_to_dict(message, compact))
+
+
+def decode_message(frame: str | bytes) -> Message:
+    """
+    args are left as plain decoded JSON, the same as Message.from_json
+    """
+    try:
+        if type(frame) is bytes:
+            frame = frame.decode()
+        data = _decoder.decode(frame)  # type: ignore[arg-type]
+    except ValueError as error:
+        raise FrameError(f"not JSON: {error}")
+
+    return envelope(data)
+
+
+def envelope(data: Any) -> Message:
+    """
+    A Message from decoded {"command": ..., "args": ...}, checked first
+    """
+    if type(data) is not dict or type(data.get("command")) is not str:
+        raise FrameError("a frame needs a command string")
+
+    args = data.get("args") or {}
+    if type(args) is not dict:
+        raise FrameError("args must be an object")
+
+    return Message(command=data["command"], args=args)
@@ -1,50 +1,108 @@
-from typing import Any, Dict
+import functools
+from typing import Any, Dict, Optional
 
+from hearts_textual import binary, codec, delta as deltas, journal, metrics
+from hearts_textual.admission import ADMISSION
 from hearts_textual.data import Card, Game, Player, Message
+from hearts_textual.schema import Schema
+from hearts_textual.tables import DEFAULT_TABLE_ID, Table, TableRegistry, token_table
 
 
 COMMANDS = {}
-GAME = Game()
-GAME.reset()
+TABLES = TableRegistry()
 
-SOCKETS_TO_PLAYERS: Dict[Any, Player] = {}
-PLAYERS_TO_SOCKETS: Dict[Player, Any] = {}
+# Commands a batch may run, the ones that only act on the sender's game
+BATCHABLE = {"new_game", "next_round", "next_turn", "play_card"}
+
+# The default table keeps the single-game names around for older callers
+DEFAULT_TABLE = TABLES.create(DEFAULT_TABLE_ID)
+GAME = DEFAULT_TABLE.game
+
+SOCKETS_TO_PLAYERS: Dict[Any, Player] = DEFAULT_TABLE.sockets_to_players
+PLAYERS_TO_SOCKETS: Dict[Player, Any] = DEFAULT_TABLE.players_to_sockets
+
+# Client side, the last full state received on each connection
+CLIENT_STATES: Dict[Any, Dict[str, Any]] = {}
+# Client side, the token to resume each connection's seat with
+CLIENT_SESSIONS: Dict[Any, str] = {}
+# Client side, the worker each connection was sent on to and what to send it
+CLIENT_REDIRECTS: Dict[Any, Dict[str, Any]] = {}
+# Client side, seconds the server last asked each connection to wait
+CLIENT_BUSY: Dict[Any, float] = {}
 
 
 def reset() -> None:
     """
     Currently only for testing???
     """
-    GAME.reset()
-    SOCKETS_TO_PLAYERS: Dict[Any, Player] = {}
-    PLAYERS_TO_SOCKETS: Dict[Player, Any] = {}
+    TABLES.reset()
+    CLIENT_STATES.clear()
+    CLIENT_SESSIONS.clear()
+    CLIENT_REDIRECTS.clear()
+    CLIENT_BUSY.clear()
+
+
+def require_table(func):
+    """
+    Must come after @command decorator, passes the websocket's table along
+    """
+
+    @functools.wraps(func)
+    def inner(*args, websocket, **kwargs):
+        table = TABLES.for_socket(websocket)
+        if table is None:
+            return create(echo, message="Not at a table!")
+
+        return func(*args, websocket=websocket, table=table, **kwargs)
+
+    # Not for clients to send, see @command
+    setattr(inner, "injected", ("table",))
+
+    return inner
 
 
 def require_start(func):
     """
-    Must come after @command decorator
+    Must come after @require_table decorator
     """
 
-    def inner(*args, **kwargs):
-        if GAME.started:
-            return func(*args, **kwargs)
+    @functools.wraps(func)
+    def inner(*args, table: Table, **kwargs):
+        if table.game.started:
+            return func(*args, table=table, **kwargs)
 
         return create(echo, message="Game not started!")
 
-    inner.__name__ = func.__name__
-
     return inner
 
 
+def client_only(func):
+    """
+    Must come after @command decorator, for commands only servers send,
+    dispatch turns them away when a client sends them
+    """
+    setattr(func, "client_only", True)
+
+    return func
+
+
 def command(func):
     """
-    @command decorator
+    @command decorator, works out which arguments the command takes from
+    its signature, websocket and whatever decorators underneath pass along
+    don't come from the frame
     """
 
     def create(**args) -> Message:
         return Message(command=func.__name__, args=args)
 
+    injected = {"websocket", *getattr(func, "injected", ())}
     setattr(func, "create", create)
+    setattr(
+        func,
+        "schema",
+        Schema(func, injected, client_only=getattr(func, "client_only", False)),
+    )
     COMMANDS[func.__name__] = func
 
     return func
@@ -58,23 +116,47 @@ def create(func, **args) -> Message:
 
 
 @command
+@client_only
 def echo(*, websocket, message: str):
     # return create(echo, messages=[f"toaster('{message}')"])
     return [f"toaster('{message}')"], GAME
 
 
-def run_command(message_str: str, websocket) -> Message:
+def run_command(message_str: str | bytes, websocket) -> Message:
     """
     Primary hook on both server and client to parse and run
-    a json message & command
+    a json (or binary) message & command
     """
-    message = Message.from_json(message_str)  # type: ignore
+    try:
+        message = binary.decode_frame(message_str)
+    except codec.FrameError as error:
+        return create(echo, message=f"Bad frame, {error}")
 
-    if message.command in COMMANDS:
-        message.args["websocket"] = websocket
-        return COMMANDS[message.command](**message.args)  # type: ignore
+    return dispatch(message, websocket)
+
+
+def dispatch(message: Message, websocket, from_client: bool = False) -> Message:
+    """
+    Runs an already decoded message.  from_client is for servers, it keeps
+    clients from running the commands only servers send.
+    """
+    func = COMMANDS.get(message.command)
+    if func is None:
+        return create(echo, message=f"Command {message.command} not found!")
 
-    return create(echo, message=f"Command {message.command} not found!")
+    schema = func.schema  # type: ignore
+    if from_client and schema.client_only:
+        metrics.COMMANDS_REJECTED.inc(message.command)
+        return create(echo, message=f"Command {message.command} is for clients!")
+
+    problem = schema.check(message.args)
+    if problem is not None:
+        metrics.COMMANDS_REJECTED.inc(message.command)
+        return create(echo, message=f"Bad command, {problem}")
+
+    message.args["websocket"] = websocket
+    result: Message = func(**message.args)
+    return result
 
 
 @command
@@ -83,76 +165,365 @@ def help(*, websocket) -> Message:
 
 
 @command
-def join(*, websocket, name: str) -> Message:
-    player = GAME.get_open_seat()
+def schema(*, websocket) -> Message:
+    """
+    The arguments every command takes
+    """
+    return create(
+        schemas,
+        commands={
+            name: func.schema.describe()  # type: ignore
+            for name, func in COMMANDS.items()
+            if not func.schema.client_only  # type: ignore
+        },
+    )
+
+
+@command
+@client_only
+def schemas(*, websocket, commands: dict):
+    """
+    Only should be run on clients
+    """
+    described = []
+    for name, spec in commands.items():
+        args = ", ".join(f"{arg}: {kind['type']}" for arg, kind in spec.items())
+        described.append(f"{name}({args})")
+
+    return [f"toaster('Commands: {'; '.join(described)}')"], None
+
+
+def _seat(table: Table, websocket, name: Optional[str]) -> Message:
+    player = table.game.get_open_seat(name)
 
     if player is None:
         return create(echo, message=f"{name} tried to connect, but no open seats!")
 
-    if name is not None and name != "random":
-        player.name = name
+    table.game.seat_player(player, name)
 
-    player.connected = True
-
-    SOCKETS_TO_PLAYERS[websocket] = player
-    PLAYERS_TO_SOCKETS[player] = websocket
+    session = TABLES.open_session(table, websocket, player)
 
     return create(
-        update, state=GAME, messages=[f"toaster('{player.name} has connected!')"]
+        update,
+        state=table.game,
+        messages=[f"toaster('{player.name} has connected!')"],
+        session=session.token,
     )
 
 
+def _elsewhere(table: str, command: str, args: Dict[str, Any]) -> Optional[Message]:
+    """
+    A redirect to the worker that owns table, None if that's this one
+    """
+    shard = TABLES.shard
+    if shard is None or shard.owns(table):
+        return None
+
+    return create(redirect, port=shard.port_of(table), command=command, args=args)
+
+
 @command
-def draw(*, websocket) -> Message:
-    return create(echo, message=f"{GAME.deck.pop()}")
+@client_only
+def redirect(*, websocket, port: int, command: str, args: dict):
+    """
+    Only should be run on clients, the table is on another worker
+    """
+    CLIENT_REDIRECTS[websocket] = {"port": port, "command": command, "args": args}
+    return [], None
 
 
 @command
-def update(*, websocket, state, messages: list[str]):
+@client_only
+def busy(*, websocket, reason: str, retry_after: float):
+    """
+    Only should be run on clients, the server turned something away
+    """
+    CLIENT_BUSY[websocket] = retry_after
+    return [f"toaster('Server busy ({reason}), retry in {retry_after:.1f}s')"], None
+
+
+@command
+def join(*, websocket, name: str, table: Optional[str] = None) -> Message:
+    if table is None:
+        table = DEFAULT_TABLE_ID
+
+    moved = _elsewhere(table, "join", {"name": name, "table": table})
+    if moved is not None:
+        return moved
+
+    joining = TABLES.get(table)
+
+    if joining is None:
+        return create(echo, message=f"Table {table} not found!")
+
+    return _seat(joining, websocket, name)
+
+
+@command
+def create_table(*, websocket, name: str) -> Message:
+    if ADMISSION.tables_full(len(TABLES)):
+        metrics.SHED.inc("tables")
+        return create(busy, reason="tables", retry_after=ADMISSION.retry_after)
+
+    table = TABLES.create()
+
+    return _seat(table, websocket, name)
+
+
+@command
+def watch(*, websocket, table: Optional[str] = None) -> Message:
+    """
+    Follows a table without a seat, seeing no one's hand
+    """
+    if table is None:
+        table = DEFAULT_TABLE_ID
+
+    moved = _elsewhere(table, "watch", {"table": table})
+    if moved is not None:
+        return moved
+
+    watching = TABLES.get(table)
+
+    if watching is None:
+        return create(echo, message=f"Table {table} not found!")
+
+    TABLES.watch(watching, websocket)
+
+    return create(update, state=watching.game, messages=[])
+
+
+@command
+def resume(
+    *,
+    websocket,
+    token: str,
+    version: Optional[int] = None,
+    name: Optional[str] = None,
+    table: Optional[str] = None,
+) -> Message:
+    """
+    Takes a dropped connection's seat back, sending only the deltas it
+    missed when the table still has them.  Joins as name instead once the
+    session is gone.
+    """
+    moved = _elsewhere(
+        token_table(token),
+        "resume",
+        {"token": token, "version": version, "name": name, "table": table},
+    )
+    if moved is not None:
+        return moved
+
+    session = TABLES.resume(token, websocket)
+    if session is None:
+        if name is not None:
+            joined: Message = join(websocket=websocket, name=name, table=table)
+            return joined
+        return create(echo, message="Session expired, join again!")
+
+    seated = session.table
+    missed = None if version is None else seated.since(version, session.player)
+    if missed is None:
+        seated.synced.discard(websocket)
+        return create(
+            update,
+            state=seated.game,
+            messages=[f"toaster('{session.player.name} is back!')"],
+        )
+
+    seated.synced.add(websocket)
+    return create(replay, deltas=missed)
+
+
+@command
+@client_only
+def replay(*, websocket, deltas: list[dict]):
+    """
+    Only should be run on clients, the deltas missed while disconnected
+    """
+    messages: list[str] = []
+    game = None
+    for args in deltas:
+        received, game = delta(websocket=websocket, **args)
+        if game is None:
+            return received, None
+        messages.extend(m for m in received if m != "update_game()")
+
+    if game is None:
+        return messages, None
+
+    messages.append("update_game()")
+    return messages, game
+
+
+@command
+def list_tables(*, websocket) -> Message:
+    return create(tables, tables=TABLES.listing())
+
+
+@command
+@client_only
+def tables(*, websocket, tables: list[dict]):
     """
     Only should be run on clients
     """
-    GAME = Game.from_dict(state)
+    listing = ", ".join(
+        f"{t['id']} ({t['open_seats']} open)" for t in tables if not t["started"]
+    )
+    return [f"toaster('Open tables: {listing}')"], None
+
+
+@command
+@require_table
+def draw(*, websocket, table: Table) -> Message:
+    return create(echo, message=f"{table.game.deck.pop()}")
+
+
+@command
+@client_only
+def update(
+    *,
+    websocket,
+    state,
+    messages: list[str],
+    legal: Optional[list] = None,
+    session: Optional[str] = None,
+):
+    """
+    Only should be run on clients
+    """
+    CLIENT_STATES[websocket] = state
+    if session is not None:
+        CLIENT_SESSIONS[websocket] = session
+    GAME = codec.decode_game(state)
+    if legal is not None:
+        codec.decode_legal(GAME, legal)
+    messages.append("update_game()")
+    return messages, GAME
+
+
+@command
+@client_only
+def delta(
+    *,
+    websocket,
+    base: int,
+    version: int,
+    checksum: int,
+    messages: list[str],
+    changes: dict,
+    appends: dict,
+    removes: dict,
+    legal: Optional[list] = None,
+):
+    """
+    Only should be run on clients, patches the last full state
+    """
+    state = CLIENT_STATES.get(websocket)
+
+    if state is None or state.get("version") != base:
+        return ["resync()"], None
+
+    deltas.apply(state, {"changes": changes, "appends": appends, "removes": removes})
+
+    if deltas.checksum(state) != checksum:
+        CLIENT_STATES.pop(websocket, None)
+        return ["resync()"], None
+
+    GAME = codec.decode_game(state)
+    if legal is not None:
+        codec.decode_legal(GAME, legal)
     messages.append("update_game()")
     return messages, GAME
 
 
 @command
-def new_game(*, websocket) -> Message:
-    count = GAME.player_connected_count()
-    if count != 4 and not GAME.bots:
+@require_table
+def resync(*, websocket, table: Table) -> Message:
+    """
+    Client lost track of the state, send it a full snapshot
+    """
+    table.synced.discard(websocket)
+    return create(update, state=table.game, messages=[])
+
+
+@command
+@require_table
+def new_game(*, websocket, table: Table) -> Message:
+    game = table.game
+    count = game.player_connected_count()
+    if count != 4 and not game.bots:
         return create(echo, message=f"Must have exactly 4 players!  We have {count}")
 
-    GAME.new_game()
+    game.new_game()
 
     return create(
-        update, state=GAME, messages=["toaster('New game started!')", "new_game()"]
+        update, state=game, messages=["toaster('New game started!')", "new_game()"]
     )
 
 
 @command
+@require_table
 @require_start
-def next_round(*, websocket) -> Message:
-    GAME.next_round()
-    return create(update, state=GAME, messages=[])
+def next_round(*, websocket, table: Table) -> Message:
+    table.game.next_round()
+    return create(update, state=table.game, messages=[])
 
 
 @command
+@require_table
 @require_start
-def next_turn(*, websocket) -> Message:
-    GAME.next_turn()
-    return create(update, state=GAME, messages=[])
+def next_turn(*, websocket, table: Table) -> Message:
+    table.game.next_turn()
+    return create(update, state=table.game, messages=[])
 
 
 @command
+@require_table
 @require_start
-def play_card(*, websocket, card) -> Message:
-    c = Card.from_dict(card)  # type: ignore
-    player = SOCKETS_TO_PLAYERS[websocket]
+def play_card(*, websocket, table: Table, card: Card) -> Message:
+    player = table.sockets_to_players.get(websocket)
+    if player is None:
+        return create(echo, message="Spectators can't play!")
 
-    result = GAME.play_card(c, player)
+    result = table.game.play_card(card, player)
 
     if type(result) is not Game:
         return create(echo, message=result)
 
-    return create(update, state=GAME, messages=[])
+    return create(update, state=table.game, messages=[])
+
+
+@command
+@require_table
+def batch(*, websocket, table: Table, commands: list[dict]) -> Message:
+    """
+    Runs commands in order against the sender's table as one, so the table
+    sees a single update.  If any of them fails the game goes back to how
+    it was before the first, and only the error is sent.
+    """
+    steps = []
+    for entry in commands:
+        try:
+            step = codec.envelope(entry)
+        except codec.FrameError as error:
+            return create(echo, message=f"Bad batch entry, {error}")
+        if step.command not in BATCHABLE:
+            return create(echo, message=f"Command {step.command} can't be batched!")
+        steps.append(Message(command=step.command, args=dict(step.args)))
+
+    point = table.game.save_point()
+    messages: list[str] = []
+    for step in steps:
+        result = dispatch(step, websocket)
+
+        if result.command != "update":
+            table.game.roll_back(point)
+            # The journal already has the steps that went through
+            journal.snapshot(table.game)
+            return result
+
+        args: Dict[str, Any] = result.args
+        messages.extend(args["messages"])
+
+    return create(update, state=table.game, messages=messages)
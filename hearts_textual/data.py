@@ -1,15 +1,35 @@
 import copy
 from dataclasses import dataclass, field
-from dataclasses_json import dataclass_json
+from dataclasses_json import DataClassJsonMixin, dataclass_json
 from enum import Enum, StrEnum
+import functools
+import operator
 import random
-from random import shuffle
-from typing import Any, Dict, List, Optional, NewType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    NewType,
+    Set,
+    Tuple,
+    TypeVar,
+    cast,
+)
 
 from rich.pretty import pprint
 
+from hearts_textual import cardset
+
 suit_order = ["C", "D", "S", "H"]
 value_order = ["2", "3", "4", "5", "6", "7", "8", "9", "T", "J", "Q", "K", "A"]
+suit_rank = {suit: i for i, suit in enumerate(suit_order)}
+value_rank = {value: i for i, value in enumerate(value_order)}
 
 ArgsType = Dict[str, object]
 ErrorType = NewType("ErrorType", str)
@@ -34,7 +54,7 @@ class Suits(StrEnum):
     HEARTS = "H"
 
     def __lt__(self, other: "Suits") -> bool:  # type: ignore[override]
-        return suit_order.index(self).__lt__(suit_order.index(other))
+        return suit_rank[self] < suit_rank[other]
 
     def color(self) -> Color:
         if self in [Suits.CLUBS, Suits.SPADES]:
@@ -67,31 +87,247 @@ class Values(StrEnum):
     ACE = "A"
 
     def __lt__(self, other: "Values") -> bool:  # type: ignore[override]
-        return value_order.index(self).__lt__(value_order.index(other))
+        return value_rank[self] < value_rank[other]
 
 
-@dataclass_json
-@dataclass(order=True)
-class Card:
+@dataclass(init=False, eq=False, frozen=True)
+class Card(DataClassJsonMixin):
+    """
+    There are only ever 52 Card instances, one per card, built once below.
+    Constructing, parsing or decoding a card hands back the shared instance,
+    so cards compare and hash by their ordinal, which is the card's position
+    in DECK and its bit in a cardset mask.
+    """
+
     suit: Suits
     value: Values
 
+    if TYPE_CHECKING:
+        # Set by _intern, kept off the dataclass fields so they stay off the wire
+        ordinal: int
+        _str: str
+        _repr: str
+
+    def __new__(cls, suit: Suits, value: Values) -> "Card":
+        try:
+            return CARDS[suit_rank[suit] * cardset.SUIT_SIZE + value_rank[value]]
+        except (KeyError, TypeError):
+            raise ValueError(f"Invalid card: {value}{suit}")
+
+    def __init__(self, suit: Suits, value: Values) -> None:
+        # Already set up when it was interned
+        pass
+
+    @staticmethod
+    def _intern(suit: Suits, value: Values) -> "Card":
+        card = object.__new__(Card)
+        ordinal = suit_rank[suit] * cardset.SUIT_SIZE + value_rank[value]
+        object.__setattr__(card, "suit", suit)
+        object.__setattr__(card, "value", value)
+        object.__setattr__(card, "ordinal", ordinal)
+        object.__setattr__(card, "_str", f"{value.value}{suit_display[suit]}")
+        object.__setattr__(card, "_repr", f"{value.value}{suit.value}")
+
+        return card
+
     @staticmethod
     def parse(card_str) -> "Card":
-        return Card(suit=Suits(card_str[1]), value=Values(card_str[0]))
+        try:
+            return CARDS_BY_REPR[card_str]
+        except (KeyError, TypeError):
+            raise ValueError(f"Invalid card: {card_str}")
+
+    @classmethod
+    def from_dict(cls, kvs, *, infer_missing=False) -> "Card":  # type: ignore[override]
+        if type(kvs) is Card:
+            return kvs
+        if type(kvs) is str:
+            return Card.parse(kvs)
+
+        return Card(suit=kvs["suit"], value=kvs["value"])
+
+    def __reduce__(self):
+        return (Card, (self.suit, self.value))
+
+    def __copy__(self) -> "Card":
+        return self
+
+    def __deepcopy__(self, memo) -> "Card":
+        return self
+
+    def __hash__(self) -> int:
+        return self.ordinal
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if type(other) is not Card:
+            return NotImplemented
+
+        return self.ordinal == other.ordinal
+
+    def __lt__(self, other: "Card") -> bool:
+        return self.ordinal < other.ordinal
+
+    def __le__(self, other: "Card") -> bool:
+        return self.ordinal <= other.ordinal
+
+    def __gt__(self, other: "Card") -> bool:
+        return self.ordinal > other.ordinal
+
+    def __ge__(self, other: "Card") -> bool:
+        return self.ordinal >= other.ordinal
 
     def __str__(self) -> str:
-        suit = suit_display[self.suit]
-        return f"{self.value.value}{suit}"
+        return self._str
 
     def __repr__(self) -> str:
-        return f"{self.value.value}{self.suit.value}"
+        return self._repr
+
 
+CARDS = tuple(Card._intern(suit, value) for suit in Suits for value in Values)
+CARDS_BY_REPR: Dict[str, Card] = {repr(card): card for card in CARDS}
+card_ordinal = operator.attrgetter("ordinal")
 
-DECK = [Card(suit=suit, value=value) for suit in Suits for value in Values]
+DECK = list(CARDS)
 TWO_OF_CLUBS = Card(value=Values.TWO, suit=Suits.CLUBS)
 QUEEN_OF_SPADES = Card(value=Values.QUEEN, suit=Suits.SPADES)
 HEART = Suits.HEARTS
+HEARTS_MASK = cardset.SUIT_MASKS[suit_rank[HEART]]
+QUEEN_OF_SPADES_BIT = cardset.bit(QUEEN_OF_SPADES.ordinal)
+TWO_OF_CLUBS_BIT = cardset.bit(TWO_OF_CLUBS.ordinal)
+
+
+def mask_of(cards: Iterable[Card]) -> int:
+    mask = 0
+    for card in cards:
+        mask |= 1 << card.ordinal
+
+    return mask
+
+
+def cards_of(mask: int) -> List[Card]:
+    """
+    Cards in a cardset mask, in sorted order
+    """
+    return [CARDS[index] for index in cardset.indexes(mask)]
+
+
+class CardList(list):
+    """
+    A list of cards that keeps a cardset mask of its contents up to date,
+    so membership and suit queries don't have to scan the list.  Assumes a
+    card is never in the same list twice, which holds for a deck, hand or pile.
+    """
+
+    __slots__ = ("mask", "_doubled")
+
+    def __init__(self, cards: Iterable[Card] = ()) -> None:
+        super().__init__(cards)
+        self.mask = mask_of(self)
+        # Cards briefly in the list twice, like mid swap in a shuffle
+        self._doubled: Optional[Set[Card]] = None
+
+    def __reduce__(self):
+        return (CardList, (list(self),))
+
+    def __contains__(self, card: object) -> bool:
+        if isinstance(card, Card):
+            return self.mask >> card.ordinal & 1 == 1
+
+        return super().__contains__(card)
+
+    def __setitem__(self, index, value) -> None:  # type: ignore[override]
+        if type(index) is not int:
+            super().__setitem__(index, value)
+            self.mask = mask_of(self)
+            self._doubled = None
+            return
+
+        old = self[index]
+        super().__setitem__(index, value)
+        if old is value:
+            return
+
+        bit = 1 << value.ordinal
+        if self.mask & bit:
+            # Still at its old index too, until that gets written over
+            if self._doubled is None:
+                self._doubled = set()
+            self._doubled.add(value)
+        else:
+            self.mask |= bit
+        self._forget(old)
+
+    def __delitem__(self, index) -> None:  # type: ignore[override]
+        if type(index) is not int:
+            super().__delitem__(index)
+            self.mask = mask_of(self)
+            self._doubled = None
+            return
+
+        old = self[index]
+        super().__delitem__(index)
+        self._forget(old)
+
+    def _forget(self, card: Card) -> None:
+        """
+        Clears card's bit, unless another copy of it is still in the list
+        """
+        if self._doubled is not None and card in self._doubled:
+            self._doubled.discard(card)
+            if not self._doubled:
+                self._doubled = None
+        else:
+            self.mask &= ~(1 << card.ordinal)
+
+    def __iadd__(self, cards: Iterable[Card]) -> "CardList":  # type: ignore[override, misc]
+        self.extend(cards)
+        return self
+
+    def append(self, card: Card) -> None:
+        super().append(card)
+        self.mask |= 1 << card.ordinal
+
+    def extend(self, cards: Iterable[Card]) -> None:
+        cards = list(cards)
+        super().extend(cards)
+        self.mask |= mask_of(cards)
+
+    def insert(self, index, card: Card) -> None:  # type: ignore[override]
+        super().insert(index, card)
+        self.mask |= 1 << card.ordinal
+
+    def remove(self, card: Card) -> None:
+        super().remove(card)
+        self.mask &= ~(1 << card.ordinal)
+
+    def pop(self, index=-1) -> Card:  # type: ignore[override]
+        card: Card = super().pop(index)
+        self.mask &= ~(1 << card.ordinal)
+        return card
+
+    def clear(self) -> None:
+        super().clear()
+        self.mask = 0
+        self._doubled = None
+
+    def copy(self) -> "CardList":
+        return CardList(self)
+
+    def shuffle(self, rng: random.Random) -> None:
+        """
+        Shuffles in place, on a plain list since the mask can't change
+        """
+        cards = list(self)
+        rng.shuffle(cards)
+        super().__setitem__(slice(None), cards)
+
+    def suit_count(self, suit: Suits) -> int:
+        return cardset.suit_count(self.mask, suit_rank[suit])
+
+    def has_suit(self, suit: Suits) -> bool:
+        return cardset.has_suit(self.mask, suit_rank[suit])
 
 
 @dataclass_json
@@ -105,12 +341,20 @@ class Player:
     pile: List[Card] = field(default_factory=list)
     scores: List[int] = field(default_factory=list)
 
+    _card_lists: ClassVar[frozenset] = frozenset(["hand", "pile"])
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # hand and pile are always CardLists, whoever assigns them
+        if name in self._card_lists and type(value) is not CardList:
+            value = CardList(value)
+        super().__setattr__(name, value)
+
     def __hash__(self) -> int:
         return f"{self.name}".__hash__()
 
     def score_round(self) -> int:
-        hearts_score = len([card for card in self.pile if card.suit == HEART])
-        queen_score = 13 if QUEEN_OF_SPADES in self.pile else 0
+        hearts_score = cardset.count(self.pile.mask & HEARTS_MASK)  # type: ignore[attr-defined]
+        queen_score = 13 if self.pile.mask & QUEEN_OF_SPADES_BIT else 0  # type: ignore[attr-defined]
 
         return hearts_score + queen_score
 
@@ -126,14 +370,14 @@ class Player:
         return total
 
     def has_suit(self, suit: Suits) -> bool:
-        cards_in_suit = [card for card in self.hand if card.suit == suit]
+        hand: CardList = self.hand  # type: ignore[assignment]
 
-        return len(cards_in_suit) >= 1
+        return hand.has_suit(suit)
 
     def suit_count(self, suit: Suits) -> int:
-        cards_in_suit = [card for card in self.hand if card.suit == suit]
+        hand: CardList = self.hand  # type: ignore[assignment]
 
-        return len(cards_in_suit)
+        return hand.suit_count(suit)
 
 
 passing_orders = [
@@ -145,6 +389,51 @@ passing_orders = [
 PassingOrder = Optional[List[int]]
 
 
+# A Game method, recorded hands it back with its signature intact
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def recorded(
+    encode: Optional[Callable[..., Dict[str, Any]]] = None
+) -> Callable[[F], F]:
+    """
+    Reports a Game method to game.recorder once it has gone through, with
+    encode turning its arguments into plain values.  Recorded methods called
+    from inside another one aren't reported on their own, replaying the
+    outer call redoes them.
+    """
+
+    def wrap(method: F) -> F:
+        @functools.wraps(method)
+        def inner(self: "Game", *args: Any, **kwargs: Any) -> Any:
+            if self.recorder is None or self._recording:
+                return method(self, *args, **kwargs)
+
+            self._recording = True
+            try:
+                result = method(self, *args, **kwargs)
+            finally:
+                self._recording = False
+
+            if result is self:
+                recorded_args = {} if encode is None else encode(self, *args, **kwargs)
+                self.recorder(self, method.__name__, recorded_args)
+
+            return result
+
+        return cast(F, inner)
+
+    return wrap
+
+
+def _seat_args(game: "Game", player: Player, name: Optional[str]) -> Dict[str, Any]:
+    return {"seat": game.players.index(player), "name": name}
+
+
+def _play_args(game: "Game", card: Card, player: Player) -> Dict[str, Any]:
+    return {"seat": game.players.index(player), "card": repr(card)}
+
+
 def default_players() -> List[Player]:
     return [
         Player(name="One"),
@@ -157,48 +446,137 @@ def default_players() -> List[Player]:
 @dataclass_json
 @dataclass
 class Game:
+    version: int = 0
     round: int = 0
     turn: int = 0
     started: bool = False
     ended: bool = False
     bots: bool = False
     hearts_broken: bool = False
-    deck: List[Card] = field(default_factory=lambda: DECK.copy())
+    deck: List[Card] = field(default_factory=lambda: CardList(DECK))
     lead_player: Optional[int] = None
     players: List[Player] = field(default_factory=default_players)
     turn_order: List[int] = field(default_factory=list)
     played_cards: List[Card] = field(default_factory=list)
     summary: Dict[str, object] = field(default_factory=dict)
 
+    # Picks a bot's card when it has a choice, e.g. hearts_textual.ismcts.Searcher.
+    # None plays a random legal card
+    bot_policy: ClassVar[Optional["BotPolicy"]] = None
+
+    def __post_init__(self) -> None:
+        if type(self.deck) is not CardList:
+            self.deck = CardList(self.deck)
+        self._index_owners()
+        # Per player index, a bit per suit_rank they've shown they're out of
+        self._voids: List[int] = [0, 0, 0, 0]
+        # legal_mask's cache, keyed on (version, hand mask)
+        self._legal_key: Optional[Tuple[int, int]] = None
+        self._legal = 0
+        # Shuffles come from here, so a seed replays the same deals.  Seeded
+        # off the random module, so random.seed still fixes every game
+        self._rng = random.Random(random.getrandbits(64))
+        # Told about every recorded call that goes through, see hearts_textual.journal
+        self.recorder: Optional[Recorder] = None
+        self._recording = False
+
+    def _index_owners(self) -> None:
+        """
+        Rebuild the card index -> player index lookup from the hands
+        """
+        self._owners: List[Optional[int]] = [None] * cardset.CARD_COUNT
+        for i, player in enumerate(self.players):
+            for index in cardset.indexes(player.hand.mask):  # type: ignore[attr-defined]
+                self._owners[index] = i
+
+    def touch(self) -> "Game":
+        """
+        Bump the state version, anything that changes the game calls this
+        """
+        self.version += 1
+
+        return self
+
+    def save_point(self) -> "SavePoint":
+        """
+        Everything roll_back needs to put the game back how it is now.
+        The players stay the same objects, only their state is copied.
+        """
+        recorder, self.recorder = self.recorder, None
+        try:
+            memo = {id(player): player for player in self.players}
+            game = copy.deepcopy(self, memo)
+        finally:
+            self.recorder = recorder
+        players = [copy.deepcopy(vars(player)) for player in self.players]
+
+        return game, players
+
+    def roll_back(self, point: "SavePoint") -> "Game":
+        game, players = point
+        recorder = self.recorder
+        for player, saved in zip(game.players, players):
+            player.__dict__.update(saved)
+        self.__dict__.update(game.__dict__)
+        self.recorder = recorder
+
+        return self
+
     def passing_order(self) -> PassingOrder:
         return passing_orders[self.round - 1 % 4]
 
     def new_deck(self) -> "Game":
-        self.deck = DECK.copy()
+        self.deck = CardList(DECK)
+
+        return self
+
+    def seed(self, seed: Optional[int]) -> "Game":
+        self._rng.seed(seed)
 
         return self
 
     def shuffle(self) -> "Game":
-        shuffle(self.deck)
+        self.deck.shuffle(self._rng)  # type: ignore[attr-defined]
 
         return self
 
     def shuffle_players(self) -> "Game":
-        shuffle(self.players)
+        self._rng.shuffle(self.players)
+
+        return self
+
+    @recorded(_seat_args)
+    def seat_player(self, player: Player, name: Optional[str] = None) -> "Game":
+        """
+        Marks player connected, renaming them unless name is None or "random"
+        """
+        if name is not None and name != "random":
+            player.name = name
+
+        player.connected = True
+        self.touch()
 
         return self
 
     def player_connected_count(self) -> int:
         return len([True for player in self.players if player.connected])
 
-    def get_open_seat(self) -> Optional[Player]:
-        for player in self.players:
-            if not player.connected:
-                return player
+    def get_open_seat(self, name: Optional[str] = None) -> Optional[Player]:
+        """
+        The first empty seat.  Once a game is going, the empty seat called
+        name if there is one, so players get their seat back after a restore.
+        """
+        open_seats = [player for player in self.players if not player.connected]
+        if self.started:
+            for player in open_seats:
+                if player.name == name:
+                    return player
 
-        return None
+        return open_seats[0] if open_seats else None
 
+    @recorded()
     def reset(self) -> "Game":
+        self.touch()
         self._new_and_reset()
         self.started = False
         for player in self.players:
@@ -219,12 +597,16 @@ class Game:
         self.new_deck().shuffle().shuffle_players()
         self.summary = {}
         for player in self.players:
-            player.hand = []
+            player.hand = CardList()
             player.scores = []
+        self._owners = [None] * cardset.CARD_COUNT
+        self._voids = [0, 0, 0, 0]
 
         return self
 
+    @recorded()
     def new_game(self) -> "Game":
+        self.touch()
         self._new_and_reset()
         self.started = True
         self.ended = False
@@ -246,9 +628,10 @@ class Game:
                 self.lead_player = player_index
 
             self.players[player_index].hand.append(card)
+            self._owners[card.ordinal] = player_index
 
         for player in self.players:
-            player.hand.sort()
+            player.hand.sort(key=card_ordinal)
 
         return self
 
@@ -266,21 +649,27 @@ class Game:
     def end_round(self) -> "Game":
         return self
 
+    @recorded()
     def next_round(self) -> "Game":
+        self.touch()
         self.round += 1
         self.turn = 0
         self.hearts_broken = False
         self.new_deck().shuffle()
         for player in self.players:
-            player.hand = []
-            player.pile = []
+            player.hand = CardList()
+            player.pile = CardList()
+        self._owners = [None] * cardset.CARD_COUNT
+        self._voids = [0, 0, 0, 0]
         self.deal()
         self.turn_order = [0, 1, 2, 3]
         self.summary = {}
 
         return self
 
+    @recorded()
     def next_turn(self) -> "Game":
+        self.touch()
         self.turn += 1
         if self.turn > 1:
             self.lead_player = self.hand_winner()
@@ -299,31 +688,8 @@ class Game:
             index = self.lead_player
         self.turn_order = [(index + i) % 4 for i in range(4)]
 
-        if self.bots and self.get_lead_player().bot and self.turn <= 13:
-            for order in self.turn_order:
-                player = self.players[order]
-                if not player.bot:
-                    break
-                else:
-                    result = self.play_bot_card()
-
         return self
 
-    def _first_turn_check(self, card: Card, player: Player) -> Optional[ErrorType]:
-        if (
-            self.turn == 1
-            and self.lead_player is not None
-            and not self.is_lead_player(player)
-        ):
-            return ErrorType(
-                f"Player {player.name} not allowed to play yet, must be {self.get_lead_player().name}!"
-            )
-
-        if card != TWO_OF_CLUBS:
-            return ErrorType(f"Card {card} is invalid, must be {TWO_OF_CLUBS}")
-
-        return None
-
     def is_lead_player(self, player: Player) -> bool:
         if self.lead_player is None:
             return False
@@ -344,18 +710,22 @@ class Game:
         raise Exception(f"Player {name} not found!")
 
     def hand_winner(self) -> int:
+        lead_suit = self.played_cards[0].suit
         pc = zip(self.played_cards, self.turn_order)
-        cards_in_suit = [
-            (card, pi) for card, pi in pc if card.suit == self.played_cards[0].suit
-        ]
-        cards_in_suit.sort()
-        cards_in_suit.reverse()
-        winning_card, player_index = cards_in_suit[0]
+        winning_ordinal, player_index = max(
+            (card.ordinal, pi) for card, pi in pc if card.suit == lead_suit
+        )
         return player_index
 
     def has_card(self, card: Card) -> Optional[Player]:
-        for player in self.players:
+        owner = self._owners[card.ordinal]
+        if owner is not None and card in self.players[owner].hand:
+            return self.players[owner]
+
+        # Hands were changed behind our back, fall back to a scan
+        for i, player in enumerate(self.players):
             if card in player.hand:
+                self._owners[card.ordinal] = i
                 return player
 
         return None
@@ -363,53 +733,89 @@ class Game:
     def _current_player(self) -> Player:
         return self.players[self.turn_order[len(self.played_cards)]]
 
-    def _get_bot_card(self, player: Player) -> Card:
+    def player_to_play(self) -> Optional[Player]:
         """
-        TODO: account for edge cases with breaking hearts and first turn
+        Whoever has to play the next card, None between tricks or games
         """
-        if self.turn == 1 and len(self.played_cards) == 0:
-            return TWO_OF_CLUBS
+        if self.ended or not self.turn_order or len(self.played_cards) >= 4:
+            return None
 
-        filtered_hand = None
-        if len(self.played_cards) == 0:
-            if self.hearts_broken:
-                filtered_hand = player.hand
-            else:
-                filtered_hand = [card for card in player.hand if card.suit != HEART]
-        else:
-            lead_suit = self.played_cards[0].suit
-            if player.suit_count(lead_suit) == 0:
-                filtered_hand = player.hand
-            else:
-                filtered_hand = [card for card in player.hand if card.suit == lead_suit]
+        return self._current_player()
+
+    def legal_mask(self, player: Player) -> int:
+        """
+        Cards player may play right now as a cardset mask, nothing unless
+        it's their turn.  Worked out once per version and hand, so validation,
+        bots and the update sent to clients all share it.
+        """
+        to_play = self.player_to_play()
+        if to_play is None or (player is not to_play and player != to_play):
+            return 0
 
-        return random.choice(filtered_hand)
+        hand_mask = player.hand.mask  # type: ignore[attr-defined]
+        key = (self.version, hand_mask)
+        if key == self._legal_key:
+            return self._legal
 
-    def _can_play_heart(self, player: Player) -> bool:
-        hearts_only = len(player.hand) == player.suit_count(HEART)
+        self._legal_key = key
+        self._legal = self._find_legal(hand_mask)
 
+        return self._legal
+
+    def legal_moves(self, player: Player) -> Iterator[Card]:
+        """
+        The cards in legal_mask, lowest first
+        """
+        for index in cardset.indexes(self.legal_mask(player)):
+            yield CARDS[index]
+
+    def _cache_legal(self, mask: int) -> None:
+        """
+        Takes legal moves worked out elsewhere (e.g. sent by the server) for
+        whoever is on turn at this version
+        """
+        player = self.player_to_play()
+        if player is not None:
+            self._legal_key = (self.version, player.hand.mask)  # type: ignore[attr-defined]
+            self._legal = mask
+
+    def _find_legal(self, hand_mask: int) -> int:
         if len(self.played_cards) == 0:
-            return hearts_only
+            if self.turn == 1:
+                return hand_mask & TWO_OF_CLUBS_BIT
+            if self.hearts_broken or hand_mask & ~HEARTS_MASK == 0:
+                return hand_mask
 
-        return hearts_only or (not player.has_suit(self.played_cards[0]))
+            return hand_mask & ~HEARTS_MASK
 
-    def play_card(self, card: Card, player: Player) -> "GameOrErrorType":
-        current_player = self._current_player()
-        if player != current_player:
-            return ErrorType(
-                f"It's not {player.name}'s turn!  It is {current_player.name}'s!"
-            )
+        lead_mask = cardset.SUIT_MASKS[suit_rank[self.played_cards[0].suit]]
+        legal = hand_mask & lead_mask or hand_mask
+        if self.turn == 1:
+            # No throwing crap on the first trick
+            legal &= ~QUEEN_OF_SPADES_BIT
+
+        return legal
+
+    def _get_bot_card(self, player: Player) -> Card:
+        legal = self.legal_mask(player)
 
-        if self.turn == 1 and len(self.played_cards) == 0:
-            error_message = self._first_turn_check(card, player)
-            if error_message is not None:
-                return error_message
+        policy = type(self).bot_policy
+        if policy is not None and cardset.count(legal) > 1:
+            card = policy(self, player)
+            if legal >> card.ordinal & 1:
+                return card
 
-        if self.turn == 1 and len(self.played_cards) > 0:
-            if card == QUEEN_OF_SPADES:
-                return ErrorType(
-                    "Card Q♤ is invalid, cannot throw crap on the first turn!"
-                )
+        return random.choice(cards_of(legal))
+
+    def _illegal_play(self, card: Card, player: Player) -> ErrorType:
+        """
+        Says why card isn't in legal_mask, only worked out for bad plays
+        """
+        if self.turn == 1 and len(self.played_cards) == 0 and card != TWO_OF_CLUBS:
+            return ErrorType(f"Card {card} is invalid, must be {TWO_OF_CLUBS}")
+
+        if self.turn == 1 and card == QUEEN_OF_SPADES:
+            return ErrorType("Card Q♤ is invalid, cannot throw crap on the first turn!")
 
         if (
             len(self.played_cards) > 0
@@ -419,43 +825,50 @@ class Game:
             suit = suit_display[self.played_cards[0].suit]
             return ErrorType(f"Card {card} is invalid, must play a {suit}!")
 
-        if (
-            card.suit == HEART
-            and not self.hearts_broken
-            and not self._can_play_heart(player)
-        ):
+        if card.suit == HEART and card in player.hand:
             return ErrorType(f"Card {card} is invalid, hearts not broken!")
 
-        if card in player.hand:
-            if card.suit == HEART:
-                self.hearts_broken = True
-            player.play = card
-            player.hand.remove(card)
-            self.played_cards.append(card)
-
-            # If we have bot players, don't do end of turn cleanup
-            # until we've played 4 cards.  This is recursive so be careful!
-            if self.bots and len(self.played_cards) < 4 and not current_player.bot:
-                for _ in range(len(self.played_cards), 4):
-                    self.play_bot_card()
-            elif len(self.played_cards) == 4 and self.turn <= 13:
-                # TODO: need to decouple this to show all the plays before continuing
-                self.next_turn()
-                if self.turn > 13:
-                    self.score_round()
-                    self.next_round()
-
-                    for player in self.players:
-                        if player.score_total() > 100:
-                            self.ended = True
-
-                    if not self.ended:
-                        self.next_turn()
-
-            return self
-
         return ErrorType(f"Card {card} not in Player {player.name}'s hand")
 
+    @recorded(_play_args)
+    def play_card(self, card: Card, player: Player) -> "GameOrErrorType":
+        current_player = self._current_player()
+        if player != current_player:
+            return ErrorType(
+                f"It's not {player.name}'s turn!  It is {current_player.name}'s!"
+            )
+
+        if not self.legal_mask(player) >> card.ordinal & 1:
+            return self._illegal_play(card, player)
+
+        self.touch()
+        if card.suit == HEART:
+            self.hearts_broken = True
+        if len(self.played_cards) > 0 and card.suit != self.played_cards[0].suit:
+            lead_rank = suit_rank[self.played_cards[0].suit]
+            self._voids[self.turn_order[len(self.played_cards)]] |= 1 << lead_rank
+        player.play = card
+        player.hand.remove(card)
+        self._owners[card.ordinal] = None
+        self.played_cards.append(card)
+
+        # Bots don't play from in here, see bot_to_play() and advance()
+        if len(self.played_cards) == 4 and self.turn <= 13:
+            # TODO: need to decouple this to show all the plays before continuing
+            self.next_turn()
+            if self.turn > 13:
+                self.score_round()
+                self.next_round()
+
+                for player in self.players:
+                    if player.score_total() > 100:
+                        self.ended = True
+
+                if not self.ended:
+                    self.next_turn()
+
+        return self
+
     def play_bot_card(self) -> "GameOrErrorType":
         current_player = self._current_player()
 
@@ -466,10 +879,58 @@ class Game:
 
         return self.play_card(card, current_player)
 
+    def bot_to_play(self) -> bool:
+        """
+        Whether the game is waiting on a bot rather than a human
+        """
+        return (
+            self.bots
+            and self.started
+            and not self.ended
+            and 1 <= self.turn <= 13
+            and len(self.played_cards) < 4
+            and self._current_player().bot
+        )
+
+    def advance(self, max_steps: Optional[int] = None) -> List["PlayEvent"]:
+        """
+        Plays bot cards one at a time until a human has to act, or until
+        max_steps cards, and returns an event for each card played
+        """
+        events: List[PlayEvent] = []
+        while self.bot_to_play() and (max_steps is None or len(events) < max_steps):
+            events.append(self.play_bot(self._get_bot_card(self._current_player())))
+
+        return events
+
+    def play_bot(self, card: Card) -> "PlayEvent":
+        """
+        Plays card for the bot on turn, for callers that chose it themselves
+        """
+        player = self._current_player()
+        turn = self.turn
+        result = self.play_card(card, player)
+        if type(result) is not Game:
+            raise Exception(f"Bot {player.name} made an illegal play: {result}")
+
+        return PlayEvent(player=player.name, card=card, turn=turn)
+
+    @recorded()
     def end_game(self) -> "Game":
+        self.touch()
         self.ended = True
 
         return self
 
 
+@dataclass
+class PlayEvent:
+    player: str
+    card: Card
+    turn: int
+
+
 GameOrErrorType = Game | ErrorType
+BotPolicy = Callable[[Game, Player], Card]
+Recorder = Callable[[Game, str, Dict[str, Any]], None]
+SavePoint = Tuple[Game, List[Dict[str, Any]]]
@@ -0,0 +1,146 @@
+"""
+Diffs between two serialized Game states, so a table only has to send what
+changed since the last update instead of the whole game.
+
+A delta has three parts, each keyed by a dotted path into the state dict
+(e.g. "turn" or "players.2.hand"):
+
+- changes: path -> new value
+- appends: path -> items added to the end of a list
+- removes: path -> indexes dropped from a list
+"""
+
+from typing import Any, Dict, List
+import zlib
+
+
+DeltaType = Dict[str, Dict[str, Any]]
+
+
+def _removed_indexes(old: list, new: list) -> List[int] | None:
+    """
+    Indexes to drop from old to get new, if new is a subsequence of old
+    """
+    removed = []
+    j = 0
+    for i, item in enumerate(old):
+        if j < len(new) and new[j] == item:
+            j += 1
+        else:
+            removed.append(i)
+
+    if j != len(new):
+        return None
+
+    return removed
+
+
+def _diff_value(path: str, old: Any, new: Any, delta: DeltaType) -> None:
+    if old == new:
+        return
+
+    if type(old) is list and type(new) is list and len(new) > 0:
+        if len(new) > len(old) and new[: len(old)] == old:
+            delta["appends"][path] = new[len(old) :]
+            return
+
+        if len(new) < len(old):
+            removed = _removed_indexes(old, new)
+            if removed is not None:
+                delta["removes"][path] = removed
+                return
+
+    delta["changes"][path] = new
+
+
+def diff(old: Dict[str, Any], new: Dict[str, Any]) -> DeltaType:
+    delta: DeltaType = {"changes": {}, "appends": {}, "removes": {}}
+
+    for key, value in new.items():
+        old_value = old.get(key)
+        if (
+            key == "players"
+            and type(old_value) is list
+            and len(old_value) == len(value)
+        ):
+            for i, (old_player, player) in enumerate(zip(old_value, value)):
+                for pkey, pvalue in player.items():
+                    _diff_value(
+                        f"players.{i}.{pkey}", old_player.get(pkey), pvalue, delta
+                    )
+        else:
+            _diff_value(key, old_value, value, delta)
+
+    return delta
+
+
+def is_empty(delta: DeltaType) -> bool:
+    return not (delta["changes"] or delta["appends"] or delta["removes"])
+
+
+def _resolve(state: Any, path: str) -> tuple[Any, Any]:
+    """
+    Returns the container holding the last part of path, and that key
+    """
+    *parents, last = path.split(".")
+    target = state
+    for part in parents:
+        target = target[int(part)] if type(target) is list else target[part]
+
+    return target, (int(last) if type(target) is list else last)
+
+
+def apply(state: Dict[str, Any], delta: DeltaType) -> Dict[str, Any]:
+    """
+    Patches state in place and returns it
+    """
+    for path, indexes in delta.get("removes", {}).items():
+        target, key = _resolve(state, path)
+        items = target[key]
+        for index in sorted(indexes, reverse=True):
+            del items[index]
+
+    for path, value in delta.get("changes", {}).items():
+        target, key = _resolve(state, path)
+        target[key] = value
+
+    for path, values in delta.get("appends", {}).items():
+        target, key = _resolve(state, path)
+        target[key].extend(values)
+
+    return state
+
+
+def _card_code(card: Any) -> str:
+    if card is None:
+        return "-"
+    if type(card) is str:
+        return card
+
+    return f"{card['value']}{card['suit']}"
+
+
+def checksum(state: Dict[str, Any]) -> int:
+    """
+    Cheap fingerprint of the parts of a state that clients act on, so they
+    can tell when a delta was applied to the wrong base
+    """
+    parts = [
+        str(state.get("version")),
+        str(state.get("round")),
+        str(state.get("turn")),
+        str(state.get("lead_player")),
+        str(state.get("hearts_broken")),
+        str(state.get("ended")),
+        "".join(_card_code(card) for card in state.get("played_cards", [])),
+    ]
+
+    for player in state.get("players", []):
+        parts.append(player["name"])
+        parts.append(str(player["connected"]))
+        parts.append("".join(_card_code(card) for card in player["hand"]))
+        parts.append(_card_code(player["play"]))
+        parts.append(str(len(player["pile"])))
+        parts.append(",".join(str(score) for score in player["scores"]))
+
+    return zlib.crc32("|".join(parts).encode())
@@ -0,0 +1,477 @@
+#!/usr/bin/env python
+"""
+Information set Monte Carlo tree search bot.
+
+Each iteration deals the cards the bot can't see to the other seats, in a way
+that fits what it has seen (hand sizes, suits a seat has shown it's out of),
+then walks one shared tree with UCB, only considering moves that are legal in
+that deal, and plays the rest of the round out at random.  Rewards are points
+avoided this round, shooting the moon included.
+
+Searches stop at a deadline rather than an iteration count.  With workers,
+a process pool runs independent searches alongside the calling process and
+their root visit counts are summed, results that miss the deadline are
+dropped.
+
+    Game.bot_policy = Searcher(budget=0.25, workers=3)
+
+    python -m hearts_textual.ismcts --rounds 20 --budget 0.05
+"""
+
+import asyncio
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+import math
+import random
+import statistics
+import time
+from typing import Dict, List, Optional, Tuple
+
+import simple_parsing
+
+from hearts_textual import cardset
+from hearts_textual.data import (
+    CARDS,
+    HEART,
+    HEARTS_MASK,
+    QUEEN_OF_SPADES,
+    QUEEN_OF_SPADES_BIT,
+    TWO_OF_CLUBS_BIT,
+    Card,
+    Game,
+    Player,
+    suit_rank,
+)
+
+HEART_RANK = suit_rank[HEART]
+QUEEN_OF_SPADES_CARD = QUEEN_OF_SPADES.ordinal
+MOON = 26
+# Tries at a deal that respects every known void before giving up on voids
+DEAL_TRIES = 20
+# Share of the budget searches get, the rest covers collecting results
+SEARCH_SHARE = 0.9
+VisitCounts = Dict[int, int]
+
+
+@dataclass(frozen=True)
+class Observation:
+    """
+    What seat can see of the round, as plain ints so it pickles small
+    """
+
+    seat: int
+    hand: int
+    unseen: int
+    hand_sizes: Tuple[int, ...]
+    voids: Tuple[int, ...]
+    trick: Tuple[int, ...]
+    leader: int
+    tricks_left: int
+    first_trick: bool
+    hearts_broken: bool
+    points: Tuple[int, ...]
+
+
+def _points(mask: int) -> int:
+    return cardset.count(mask & HEARTS_MASK) + (13 if mask & QUEEN_OF_SPADES_BIT else 0)
+
+
+def observe(game: Game, player: Player) -> Observation:
+    seat = next(i for i, p in enumerate(game.players) if p is player)
+    hand: int = player.hand.mask  # type: ignore[attr-defined]
+    seen = hand
+    for p in game.players:
+        seen |= p.pile.mask  # type: ignore[attr-defined]
+    trick = tuple(card.ordinal for card in game.played_cards)
+    for ordinal in trick:
+        seen |= cardset.bit(ordinal)
+
+    return Observation(
+        seat=seat,
+        hand=hand,
+        unseen=cardset.FULL & ~seen,
+        hand_sizes=tuple(len(p.hand) for p in game.players),
+        voids=tuple(game._voids),
+        trick=trick,
+        leader=game.turn_order[0],
+        tricks_left=14 - game.turn,
+        first_trick=game.turn == 1,
+        hearts_broken=game.hearts_broken,
+        points=tuple(_points(p.pile.mask) for p in game.players),  # type: ignore[attr-defined]
+    )
+
+
+def determinize(observation: Observation, rng: random.Random) -> List[int]:
+    """
+    Hands for all four seats, dealing the unseen cards to the other seats.
+    Most constrained cards go first, falls back to ignoring voids if the
+    constraints keep painting it into a corner.
+    """
+    others = [seat for seat in range(4) if seat != observation.seat]
+    cards = list(cardset.indexes(observation.unseen))
+
+    for attempt in range(DEAL_TRIES + 1):
+        voids = observation.voids if attempt < DEAL_TRIES else (0, 0, 0, 0)
+        room = list(observation.hand_sizes)
+        hands = [0, 0, 0, 0]
+        hands[observation.seat] = observation.hand
+
+        rng.shuffle(cards)
+        eligible = {
+            card: [seat for seat in others if not voids[seat] >> (card // 13) & 1]
+            for card in cards
+        }
+        for card in sorted(cards, key=lambda card: len(eligible[card])):
+            seats = [seat for seat in eligible[card] if room[seat] > 0]
+            if not seats:
+                break
+            seat = rng.choice(seats)
+            hands[seat] |= cardset.bit(card)
+            room[seat] -= 1
+        else:
+            return hands
+
+    raise Exception(f"Can't deal {len(cards)} unseen cards to {observation.hand_sizes}")
+
+
+class _Round:
+    """
+    The rest of a round on bitmasks, following the same rules as Game.play_card
+    """
+
+    __slots__ = (
+        "hands",
+        "trick",
+        "leader",
+        "seat",
+        "tricks_left",
+        "first_trick",
+        "hearts_broken",
+        "points",
+    )
+
+    def __init__(self, observation: Observation, hands: List[int]) -> None:
+        self.hands = hands
+        self.trick = list(observation.trick)
+        self.leader = observation.leader
+        self.seat = (observation.leader + len(self.trick)) % 4
+        self.tricks_left = observation.tricks_left
+        self.first_trick = observation.first_trick
+        self.hearts_broken = observation.hearts_broken
+        self.points = list(observation.points)
+
+    def legal(self) -> int:
+        hand = self.hands[self.seat]
+        if not self.trick:
+            if self.first_trick:
+                return hand & TWO_OF_CLUBS_BIT
+            if self.hearts_broken or hand & ~HEARTS_MASK == 0:
+                return hand
+
+            return hand & ~HEARTS_MASK
+
+        legal = hand & cardset.SUIT_MASKS[self.trick[0] // 13] or hand
+        if self.first_trick:
+            legal &= ~QUEEN_OF_SPADES_BIT
+
+        return legal
+
+    def play(self, card: int) -> None:
+        self.hands[self.seat] &= ~(1 << card)
+        if card // 13 == HEART_RANK:
+            self.hearts_broken = True
+        trick = self.trick
+        trick.append(card)
+
+        if len(trick) < 4:
+            self.seat = (self.seat + 1) % 4
+            return
+
+        lead_suit = trick[0] // 13
+        winning_card = max(card for card in trick if card // 13 == lead_suit)
+        winner = (self.leader + trick.index(winning_card)) % 4
+        points = 0
+        for card in trick:
+            if card // 13 == HEART_RANK:
+                points += 1
+            elif card == QUEEN_OF_SPADES_CARD:
+                points += 13
+        self.points[winner] += points
+
+        self.trick = []
+        self.leader = self.seat = winner
+        self.tricks_left -= 1
+        self.first_trick = False
+
+    def rewards(self) -> List[float]:
+        """
+        Share of the round's points each seat avoided, 1 is a clean round
+        """
+        if MOON in self.points:
+            return [1.0 if points == MOON else 0.0 for points in self.points]
+
+        return [1.0 - points / MOON for points in self.points]
+
+
+def _random_bit(mask: int, rng: random.Random) -> int:
+    return rng.choice(list(cardset.indexes(mask)))
+
+
+class _Node:
+    __slots__ = (
+        "parent",
+        "move",
+        "seat",
+        "children",
+        "tried",
+        "visits",
+        "total",
+        "avails",
+    )
+
+    def __init__(self, parent: Optional["_Node"], move: int, seat: int) -> None:
+        self.parent = parent
+        self.move = move
+        # Who played move, rewards are counted from their side
+        self.seat = seat
+        self.children: Dict[int, _Node] = {}
+        self.tried = 0
+        self.visits = 0
+        self.total = 0.0
+        self.avails = 1
+
+
+def search(
+    observation: Observation,
+    deadline: float,
+    seed: Optional[int] = None,
+    exploration: float = 0.7,
+    max_iterations: Optional[int] = None,
+) -> VisitCounts:
+    """
+    Runs iterations until deadline (a time.monotonic value) or max_iterations,
+    returns how often each of the root's moves was visited
+    """
+    rng = random.Random(seed)
+    root = _Node(None, -1, -1)
+    iterations = 0
+
+    while time.monotonic() < deadline and (
+        max_iterations is None or iterations < max_iterations
+    ):
+        iterations += 1
+        state = _Round(observation, determinize(observation, rng))
+        node = root
+
+        # Select down the tree, expanding the first untried legal move
+        while state.tricks_left > 0:
+            legal = state.legal()
+            untried = legal & ~node.tried
+            if untried:
+                move = _random_bit(untried, rng)
+                child = _Node(node, move, state.seat)
+                node.children[move] = child
+                node.tried |= 1 << move
+                state.play(move)
+                node = child
+                break
+
+            best = None
+            best_score = -1.0
+            for move in cardset.indexes(legal):
+                child = node.children[move]
+                child.avails += 1
+                score = child.total / child.visits + exploration * math.sqrt(
+                    math.log(child.avails) / child.visits
+                )
+                if score > best_score:
+                    best, best_score = child, score
+            assert best is not None
+            state.play(best.move)
+            node = best
+
+        # Play the rest of the round out at random
+        while state.tricks_left > 0:
+            state.play(_random_bit(state.legal(), rng))
+
+        rewards = state.rewards()
+        while node.parent is not None:
+            node.visits += 1
+            node.total += rewards[node.seat]
+            node = node.parent
+
+    return {move: child.visits for move, child in root.children.items()}
+
+
+class Searcher:
+    """
+    A Game.bot_policy that spends up to budget seconds a move on search.
+    workers extra processes search alongside the caller, 0 searches inline.
+    """
+
+    def __init__(
+        self,
+        budget: float = 0.25,
+        workers: int = 0,
+        exploration: float = 0.7,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.budget = budget
+        self.workers = workers
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> "Searcher":
+        """
+        Spins the pool up ahead of time, so the first move doesn't pay for it
+        """
+        if self.workers > 0 and self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            wait([self.pool.submit(_warm) for _ in range(self.workers)])
+
+        return self
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def visits(
+        self, observation: Observation, until: Optional[float] = None
+    ) -> VisitCounts:
+        """
+        Root visit counts, all in by until (a time.monotonic value), which
+        defaults to a budget from now
+        """
+        if until is None:
+            until = time.monotonic() + self.budget
+        deadline = until - self.budget * (1 - SEARCH_SHARE)
+
+        futures: List[Future] = []
+        if self.workers > 0:
+            self.start()
+            assert self.pool is not None
+            futures = [
+                self.pool.submit(
+                    search,
+                    observation,
+                    deadline,
+                    self.rng.getrandbits(32),
+                    self.exploration,
+                )
+                for _ in range(self.workers)
+            ]
+
+        counts = search(
+            observation, deadline, self.rng.getrandbits(32), self.exploration
+        )
+
+        if futures:
+            done, late = wait(futures, timeout=max(0.0, until - time.monotonic()))
+            for future in late:
+                future.cancel()
+            for future in done:
+                if future.exception() is None:
+                    for move, visits in future.result().items():
+                        counts[move] = counts.get(move, 0) + visits
+
+        return counts
+
+    def __call__(self, game: Game, player: Player) -> Card:
+        legal = game.legal_mask(player)
+        if cardset.count(legal) == 1:
+            return CARDS[cardset.lowest(legal)]
+
+        return self._pick(self.visits(observe(game, player)), legal)
+
+    async def decide(self, game: Game, player: Player) -> Card:
+        """
+        Same as calling it, but searches on another thread, so the event
+        loop keeps serving every other table and socket meanwhile
+        """
+        legal = game.legal_mask(player)
+        if cardset.count(legal) == 1:
+            return CARDS[cardset.lowest(legal)]
+
+        # A snapshot, the game can move on while the search runs
+        observation = observe(game, player)
+        # The budget runs from now, time queued for the executor counts too
+        until = time.monotonic() + self.budget
+        loop = asyncio.get_running_loop()
+        counts = await loop.run_in_executor(None, self.visits, observation, until)
+
+        return self._pick(counts, legal)
+
+    def _pick(self, counts: VisitCounts, legal: int) -> Card:
+        moves = [move for move in counts if legal >> move & 1]
+        if not moves:
+            return CARDS[_random_bit(legal, self.rng)]
+
+        return CARDS[max(moves, key=lambda move: counts[move])]
+
+
+def _warm() -> None:
+    pass
+
+
+def evaluate(
+    rounds: int, budget: float, workers: int = 0, seed: Optional[int] = None
+) -> Tuple[float, float]:
+    """
+    Plays rounds with a Searcher in one seat and random bots in the others,
+    returns the mean round points of the searcher and of the random bots
+    """
+    if seed is not None:
+        random.seed(seed)
+    searcher = Searcher(budget=budget, workers=workers, seed=seed).start()
+    mine: List[int] = []
+    theirs: List[int] = []
+
+    try:
+        for _ in range(rounds):
+            game = Game().reset()
+            game.bots = True
+            game.new_game().next_round().next_turn()
+            me = game.players[0]
+
+            while game.round == 1:
+                player = game._current_player()
+                if player is me:
+                    card = searcher(game, player)
+                else:
+                    card = game._get_bot_card(player)
+                result = game.play_card(card, player)
+                if type(result) is not Game:
+                    raise Exception(f"{player.name} made an illegal play: {result}")
+
+            scores = [player.scores[0] for player in game.players]
+            mine.append(scores[0])
+            theirs.extend(scores[1:])
+    finally:
+        searcher.close()
+
+    return statistics.fmean(mine), statistics.fmean(theirs)
+
+
+@dataclass
+class Options:
+    rounds: int = 20
+    # Seconds a move
+    budget: float = 0.05
+    workers: int = 0
+    seed: Optional[int] = None
+
+
+def main():
+    options, _ = simple_parsing.parse_known_args(Options)
+    mine, theirs = evaluate(
+        options.rounds, options.budget, options.workers, options.seed
+    )
+
+    print(f"{'ismcts points/round':>22}: {mine:.2f}")
+    print(f"{'random points/round':>22}: {theirs:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+"""
+Append-only per-table game journals, for settling disputes, recovering
+tables and feeding offline bot analysis.
+
+Every recorded Game call that goes through (seat_player, new_game,
+next_round, next_turn, play_card, ...) becomes an event, and every
+snapshot_every events a full snapshot is written too.  The first records
+of a journal are the game's RNG seed and a snapshot, so replay never has
+to start from nothing.
+
+Records are length-prefixed:
+
+    u32 payload length, u8 kind, u32 seq, then compact JSON
+
+seq is the number of events recorded so far, a snapshot with seq n is the
+game right after event n.  Replay only has to read the headers to find the
+nearest snapshot, then decodes from there.
+
+Encoding happens on the caller's thread, a writer thread does the disk
+work, so the event loop never waits on a file.
+
+    journal.configure("journals", snapshot_every=100)
+    journal.start("default", game)
+    ...
+    game = journal.replay("journals/default-1a2b3c4d.journal", seq=40)
+"""
+
+import array
+import base64
+from collections import OrderedDict
+import json
+import os
+import queue
+import random
+import struct
+import threading
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+import uuid
+
+from hearts_textual import codec, log
+from hearts_textual.data import Card, Game
+
+HEADER = struct.Struct(">IBI")
+
+KIND_SEED = 0
+KIND_SNAPSHOT = 1
+KIND_EVENT = 2
+
+SNAPSHOT_EVERY = 100
+SUFFIX = ".journal"
+# Journal files the writer keeps open at once, the least recently written
+# is closed past this, so thousands of tables don't mean thousands of fds
+MAX_OPEN_FILES = 64
+
+_encoder = json.JSONEncoder(separators=(",", ":"))
+
+_writer: Optional["Writer"] = None
+_directory: Optional[str] = None
+_snapshot_every = SNAPSHOT_EVERY
+
+
+class JournalError(Exception):
+    pass
+
+
+class Writer:
+    """
+    One thread appending for every journal.  It takes everything queued at
+    once, writes it and flushes before waiting again.  A write that fails
+    is dropped and kept in error, the thread carries on with the rest.
+    """
+
+    def __init__(self, max_open: int = MAX_OPEN_FILES) -> None:
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.files: "OrderedDict[str, IO[bytes]]" = OrderedDict()
+        self.max_open = max_open
+        # The last OSError the thread hit, if any
+        self.error: Optional[OSError] = None
+        self.thread = threading.Thread(
+            target=self._run, name="journal-writer", daemon=True
+        )
+        self.thread.start()
+
+    def write(self, path: str, data: bytes) -> None:
+        self.queue.put((path, data))
+
+    def close_file(self, path: str) -> None:
+        self.queue.put((path, None))
+
+    def flush(self) -> None:
+        """
+        Waits until everything queued so far is on disk, or has failed to be
+        """
+        done = threading.Event()
+        self.queue.put(done)
+        # Checked now and then so a dead thread can't leave us waiting forever
+        while not done.wait(0.5):
+            if not self.thread.is_alive():
+                return
+
+    def stop(self) -> None:
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self) -> None:
+        while True:
+            items = [self.queue.get()]
+            while True:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            dirty = set()
+            waiting: List[threading.Event] = []
+            stopping = False
+            for item in items:
+                if item is None:
+                    stopping = True
+                elif type(item) is threading.Event:
+                    waiting.append(item)
+                else:
+                    path, data = item
+                    if data is None:
+                        self._close(path)
+                        dirty.discard(path)
+                    elif self._append(path, data):
+                        dirty.add(path)
+
+            for path in dirty:
+                file = self.files.get(path)
+                if file is not None:
+                    self._guard(path, file.flush)
+            for done in waiting:
+                done.set()
+
+            if stopping:
+                for path in list(self.files):
+                    self._close(path)
+                return
+
+    def _append(self, path: str, data: bytes) -> bool:
+        file = self.files.get(path)
+        if file is None:
+            while len(self.files) >= self.max_open:
+                self._close(next(iter(self.files)))
+            try:
+                file = self.files[path] = open(path, "ab")
+            except OSError as error:
+                self._failed(path, error)
+                return False
+        else:
+            self.files.move_to_end(path)
+
+        return self._guard(path, lambda: file.write(data))
+
+    def _close(self, path: str) -> None:
+        file = self.files.pop(path, None)
+        if file is not None:
+            self._guard(path, file.close)
+
+    def _guard(self, path: str, action: Callable[[], Any]) -> bool:
+        try:
+            action()
+        except OSError as error:
+            self._failed(path, error)
+            return False
+
+        return True
+
+    def _failed(self, path: str, error: OSError) -> None:
+        self.error = error
+        log.error("journal_failed", path=path, error=str(error))
+
+
+def _record(kind: int, seq: int, payload: Dict[str, Any]) -> bytes:
+    data = _encoder.encode(payload).encode()
+
+    return HEADER.pack(len(data), kind, seq) + data
+
+
+def snapshot_of(game: Game) -> Dict[str, Any]:
+    """
+    Everything needed to carry on from here, RNG included, as plain JSON
+    """
+    version, internal, gauss = game._rng.getstate()
+    # 625 words of Mersenne Twister state, far quicker as one base64 string
+    words = base64.b64encode(array.array("I", internal).tobytes()).decode()
+
+    return {
+        "state": codec.encode_game(game, compact=True),
+        "rng": [version, words, gauss],
+        "voids": list(game._voids),
+    }
+
+
+def restore(snapshot: Dict[str, Any]) -> Game:
+    game = codec.decode_game(snapshot["state"])
+    version, words, gauss = snapshot["rng"]
+    internal = array.array("I", base64.b64decode(words))
+    game._rng.setstate((version, tuple(internal), gauss))
+    game._voids = list(snapshot["voids"])
+    # decode_game leaves the summary as plain JSON, the live game has cards
+    summary: Dict[str, Any] = game.summary
+    if "last_hand" in summary:
+        summary["last_hand"] = list(codec.decode_cards(summary["last_hand"]))
+
+    return game
+
+
+class Journal:
+    """
+    Game.recorder for one table's journal file
+    """
+
+    def __init__(
+        self, path: str, writer: Writer, snapshot_every: int = SNAPSHOT_EVERY
+    ) -> None:
+        self.path = path
+        self.writer = writer
+        self.snapshot_every = snapshot_every
+        self.seq = 0
+
+    def attach(self, game: Game, seed: Optional[int] = None) -> "Journal":
+        """
+        Reseeds game so its shuffles can be replayed, and starts recording it
+        """
+        if seed is None:
+            seed = random.getrandbits(64)
+        game.seed(seed)
+        game.recorder = self
+
+        self.writer.write(self.path, _record(KIND_SEED, self.seq, {"seed": seed}))
+        self.snapshot(game)
+
+        return self
+
+    def __call__(self, game: Game, op: str, args: Dict[str, Any]) -> None:
+        self.seq += 1
+        self.writer.write(
+            self.path, _record(KIND_EVENT, self.seq, {"op": op, "args": args})
+        )
+
+        if self.seq % self.snapshot_every == 0:
+            self.snapshot(game)
+
+    def snapshot(self, game: Game) -> None:
+        self.writer.write(
+            self.path, _record(KIND_SNAPSHOT, self.seq, snapshot_of(game))
+        )
+
+    def close(self, game: Optional[Game] = None) -> None:
+        if game is not None and game.recorder is self:
+            game.recorder = None
+        self.writer.close_file(self.path)
+
+
+def configure(directory: str, snapshot_every: int = SNAPSHOT_EVERY) -> None:
+    global _writer, _directory, _snapshot_every
+
+    shutdown()
+    os.makedirs(directory, exist_ok=True)
+    _directory = directory
+    _snapshot_every = snapshot_every
+    _writer = Writer()
+
+
+def enabled() -> bool:
+    return _writer is not None
+
+
+def start(table_id: str, game: Game, seed: Optional[int] = None) -> Optional[Journal]:
+    """
+    Starts a new journal file for a table, does nothing unless configured
+    """
+    if _writer is None or _directory is None:
+        return None
+
+    name = f"{table_id}-{uuid.uuid4().hex[:8]}{SUFFIX}"
+    path = os.path.join(_directory, name)
+
+    return Journal(path, _writer, _snapshot_every).attach(game, seed)
+
+
+def close(game: Game) -> None:
+    if isinstance(game.recorder, Journal):
+        game.recorder.close(game)
+
+
+def snapshot(game: Game) -> None:
+    """
+    Snapshots a journalled game right now, e.g. after rolling it back
+    past events already written
+    """
+    if isinstance(game.recorder, Journal):
+        game.recorder.snapshot(game)
+
+
+def flush() -> None:
+    if _writer is not None:
+        _writer.flush()
+
+
+def shutdown() -> None:
+    """
+    Writes out whatever is still queued and stops the writer thread
+    """
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+
+def scan(path: str) -> Iterator[Tuple[int, int, int, int]]:
+    """
+    (offset, kind, seq, length) for each whole record, without decoding any.
+    A record cut short by a crash ends the scan.
+    """
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        offset = 0
+        while offset + HEADER.size <= size:
+            file.seek(offset)
+            length, kind, seq = HEADER.unpack(file.read(HEADER.size))
+            if offset + HEADER.size + length > size:
+                return
+            yield offset, kind, seq, length
+            offset += HEADER.size + length
+
+
+def read(path: str, offset: int = 0) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """
+    (kind, seq, payload) for each whole record from offset on
+    """
+    with open(path, "rb") as file:
+        file.seek(offset)
+        while True:
+            header = file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            length, kind, seq = HEADER.unpack(header)
+            data = file.read(length)
+            if len(data) < length:
+                return
+            yield kind, seq, json.loads(data)
+
+
+def events(path: str) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+    """
+    (seq, op, args) for every event, e.g. for offline analysis
+    """
+    for kind, seq, payload in read(path):
+        if kind == KIND_EVENT:
+            yield seq, payload["op"], payload["args"]
+
+
+def apply(game: Game, op: str, args: Dict[str, Any]) -> None:
+    if op == "play_card":
+        player = game.players[args["seat"]]
+        result = game.play_card(Card.parse(args["card"]), player)
+    elif op == "seat_player":
+        result = game.seat_player(game.players[args["seat"]], args["name"])
+    elif op in ("reset", "new_game", "next_round", "next_turn", "end_game"):
+        result = getattr(game, op)()
+    else:
+        raise JournalError(f"Unknown journal op {op}")
+
+    if type(result) is not Game:
+        raise JournalError(f"Journal event {op} {args} didn't replay: {result}")
+
+
+def replay(path: str, seq: Optional[int] = None) -> Game:
+    """
+    The game as it was after event seq, or after the last event if None.
+    Starts from the nearest snapshot at or before seq.
+    """
+    start: Optional[int] = None
+    for offset, kind, record_seq, _ in scan(path):
+        if kind == KIND_SNAPSHOT and (seq is None or record_seq <= seq):
+            start = offset
+        elif seq is not None and record_seq > seq:
+            break
+
+    if start is None:
+        raise JournalError(f"No snapshot in {path} at or before event {seq}")
+
+    game: Optional[Game] = None
+    for kind, record_seq, payload in read(path, start):
+        if seq is not None and record_seq > seq:
+            break
+        if game is None:
+            game = restore(payload)
+        elif kind == KIND_EVENT:
+            apply(game, payload["op"], payload["args"])
+
+    assert game is not None
+
+    return game
@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+"""
+Local load generator: N synthetic clients against hearts_textual.server.
+
+Clients are grouped four to a table.  The first of each group creates a
+table, the other three join it, and then everyone plays legal cards as
+soon as it is their turn, starting a new game whenever one ends.  Reports
+command round trip percentiles and how many messages the server pushed.
+
+    python -m hearts_textual.loadgen --clients 64 --duration 30
+    python -m hearts_textual.loadgen --clients 64 --spawn True
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+import json
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import simple_parsing
+import websockets
+from websockets.typing import Subprotocol
+
+from hearts_textual import binary, cluster, codec
+from hearts_textual.client import send_command
+from hearts_textual.commands import CLIENT_REDIRECTS, COMMANDS
+from hearts_textual.data import Game, Message
+
+
+# Whether a frame, with the messages the client ran it into, answers the
+# command being timed
+Answered = Callable[[Message, List[str]], bool]
+
+
+@dataclass
+class Stats:
+    latencies: List[float] = field(default_factory=list)
+    sent: int = 0
+    received: int = 0
+    errors: int = 0
+    games: int = 0
+    cards: int = 0
+
+
+def percentile(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+
+    return ordered[index]
+
+
+@dataclass
+class Report:
+    clients: int
+    seconds: float
+    stats: Stats
+
+    def to_dict(self) -> Dict[str, object]:
+        latencies = self.stats.latencies
+        return {
+            "clients": self.clients,
+            "tables": self.clients // 4,
+            "seconds": round(self.seconds, 3),
+            "commands_sent": self.stats.sent,
+            "messages_received": self.stats.received,
+            "server_messages_per_second": round(self.stats.received / self.seconds, 1),
+            "cards_played": self.stats.cards,
+            "games_finished": self.stats.games,
+            "errors": self.stats.errors,
+            "rtt_p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "rtt_p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "rtt_p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        }
+
+
+class SyntheticClient:
+    """
+    One seat at a table, reusing the client side commands to keep its
+    copy of the game up to date
+    """
+
+    def __init__(self, name: str, host: bool, table_id: asyncio.Future, stats: Stats):
+        self.name = name
+        self.host = host
+        self.table_id = table_id
+        self.stats = stats
+        self.game: Optional[Game] = None
+        # When the command waiting on an answer went out, None if none is
+        self.sent_at: Optional[float] = None
+        self.answered: Optional[Answered] = None
+        self.starting = False
+
+    async def send(
+        self, websocket, command: str, answered: Optional[Answered] = None, **args: Any
+    ) -> None:
+        """
+        Sends a command, timed until the first frame answered accepts if
+        given.  Other players' moves arrive in between, the next frame
+        isn't necessarily ours.
+        """
+        self.stats.sent += 1
+        if answered is not None:
+            self.sent_at = time.perf_counter()
+            self.answered = answered
+        await send_command(websocket, {"command": command, "args": args})
+
+    def answers(self, message: Message, messages: List[str]) -> bool:
+        if self.answered is None:
+            return False
+        # Errors only ever go back to whoever sent the command
+        return message.command == "echo" or self.answered(message, messages)
+
+    async def start_game(self, websocket) -> None:
+        self.starting = True
+        commands = ["new_game", "next_round", "next_turn"]
+        await self.send(
+            websocket,
+            "batch",
+            answered=lambda message, messages: "new_game()" in messages,
+            commands=[{"command": command, "args": {}} for command in commands],
+        )
+
+    async def sit_down(self, websocket) -> None:
+        if not self.host:
+            table_id = await self.table_id
+            await self.send(websocket, "join", name=self.name, table=table_id)
+            return
+
+        await self.send(websocket, "create_table", name=self.name)
+        await self.send(websocket, "list_tables")
+        while not self.table_id.done():
+            message = binary.decode_frame(await websocket.recv())
+            self.stats.received += 1
+            args: Dict[str, Any] = message.args
+            if message.command == "tables":
+                for table in args["tables"]:
+                    if self.name in table["players"]:
+                        self.table_id.set_result(table["id"])
+            else:
+                self.handle(message, websocket)
+
+    def handle(self, message, websocket) -> List[str]:
+        """
+        Runs a frame through the client side commands, like client.py does
+        """
+        if message.command not in COMMANDS:
+            return []
+
+        if message.command == "echo":
+            self.stats.errors += 1
+
+        messages: List[str]
+        messages, game = COMMANDS[message.command](websocket=websocket, **message.args)
+        if game is not None and message.command != "echo":
+            self.game = game
+
+        return messages
+
+    def my_card(self):
+        game = self.game
+        if game is None or not game.started or game.ended or game.turn < 1:
+            return None
+        if len(game.played_cards) >= 4:
+            return None
+
+        player = game._current_player()
+        if player.name != self.name:
+            return None
+
+        return game._get_bot_card(player)
+
+    async def act(self, websocket) -> None:
+        game = self.game
+        if game is None or self.sent_at is not None:
+            return
+
+        if self.host and not self.starting and game.player_connected_count() == 4:
+            if not game.started or game.ended:
+                if game.ended:
+                    self.stats.games += 1
+                await self.start_game(websocket)
+                return
+
+        card = self.my_card()
+        if card is not None:
+            self.stats.cards += 1
+            await self.send(
+                websocket,
+                "play_card",
+                answered=lambda message, messages: not self.holds(card),
+                card=codec.encode_card(card),
+            )
+
+    def holds(self, card) -> bool:
+        """
+        Whether card is still in our hand, as far as we've heard
+        """
+        if self.game is None:
+            return True
+
+        for player in self.game.players:
+            if player.name == self.name:
+                return card in player.hand
+
+        return False
+
+    async def run(self, uri: str, deadline: float, use_binary: bool) -> None:
+        moved: Optional[str] = uri
+        while moved is not None:
+            moved = await self.connect(moved, deadline, use_binary)
+
+    async def connect(
+        self, uri: str, deadline: float, use_binary: bool
+    ) -> Optional[str]:
+        """
+        Plays over one connection, returns where to go if redirected
+        """
+        subprotocols: List[Subprotocol] = (
+            binary.SUBPROTOCOLS if use_binary else [binary.SUBPROTOCOL_JSON]
+        )
+
+        async with websockets.connect(uri, subprotocols=subprotocols) as websocket:
+            await self.sit_down(websocket)
+
+            while time.perf_counter() < deadline:
+                try:
+                    frame = await asyncio.wait_for(
+                        websocket.recv(), deadline - time.perf_counter()
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+                now = time.perf_counter()
+                self.stats.received += 1
+
+                message = binary.decode_frame(frame)
+                messages = self.handle(message, websocket)
+                if self.sent_at is not None and self.answers(message, messages):
+                    self.stats.latencies.append(now - self.sent_at)
+                    self.sent_at = None
+                    self.answered = None
+
+                redirect = CLIENT_REDIRECTS.pop(websocket, None)
+                if redirect is not None:
+                    return cluster.redirected(uri, redirect["port"])
+
+                if "resync()" in messages:
+                    await self.send(
+                        websocket,
+                        "resync",
+                        answered=lambda message, messages: message.command == "update",
+                    )
+                    continue
+
+                if self.game is not None and self.game.started and self.game.turn >= 1:
+                    self.starting = False
+
+                await self.act(websocket)
+
+        return None
+
+
+async def run_load(
+    uri: str, clients: int, duration: float, use_binary: bool = False
+) -> Report:
+    stats = Stats()
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    deadline = start + duration
+
+    tasks = []
+    table_id: asyncio.Future = loop.create_future()
+    for i in range(clients):
+        if i % 4 == 0:
+            table_id = loop.create_future()
+        client = SyntheticClient(f"load{i}", i % 4 == 0, table_id, stats)
+        tasks.append(asyncio.create_task(client.run(uri, deadline, use_binary)))
+
+    await asyncio.gather(*tasks)
+
+    return Report(clients=clients, seconds=time.perf_counter() - start, stats=stats)
+
+
+async def wait_for_server(uri: str, timeout: float = 10.0) -> None:
+    give_up = time.perf_counter() + timeout
+    while True:
+        try:
+            async with websockets.connect(uri):
+                return
+        except OSError:
+            if time.perf_counter() > give_up:
+                raise
+            await asyncio.sleep(0.1)
+
+
+@dataclass
+class Options:
+    clients: int = 16
+    duration: float = 10.0
+    host: str = "localhost"
+    port: int = 8765
+    binary: bool = False
+    # Start hearts_textual.server in a subprocess for the run
+    spawn: bool = False
+    # Worker processes for the spawned server
+    workers: int = 1
+    json: bool = False
+
+
+async def load(options: Options) -> Report:
+    uri = f"ws://{options.host}:{options.port}"
+    server = None
+    if options.spawn:
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "hearts_textual.server",
+                "--host",
+                options.host,
+                "--port",
+                str(options.port),
+                "--log_level",
+                "warning",
+                "--workers",
+                str(options.workers),
+            ],
+            stdout=subprocess.DEVNULL,
+        )
+    try:
+        await wait_for_server(uri)
+        return await run_load(uri, options.clients, options.duration, options.binary)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    options, _ = simple_parsing.parse_known_args(Options)
+    report = asyncio.run(load(options))
+
+    if options.json:
+        print(json.dumps(report.to_dict()))
+        return
+
+    for key, value in report.to_dict().items():
+        print(f"{key:>26}: {value}")
+
+
+if __name__ == "__main__":
+    main()
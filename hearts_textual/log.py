@@ -0,0 +1,157 @@
+"""
+Structured logging for the server that stays off the event loop.
+
+Calls only build a LogRecord with a few plain fields and put it on a queue,
+a listener thread formats them as JSON lines and writes them out.  Pass
+ids and names, not live objects like Game, they are formatted later on
+another thread.
+
+    log.configure("debug", sample=0.01)
+    log.debug("command", command="play_card", table="default")
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from typing import Any, Dict, Optional, TextIO
+
+
+LOGGER = logging.getLogger("hearts_textual")
+
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 6),
+            "level": record.levelname.lower(),
+            "event": record.msg,
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """
+    Keeps rate of the records below WARNING, warnings and up always pass
+    """
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        The stock handler formats here, on the caller's thread, we leave
+        that to the listener
+        """
+        return record
+
+
+def configure(
+    level: Optional[str] = "info",
+    sample: float = 1.0,
+    stream: TextIO = sys.stderr,
+) -> None:
+    """
+    level None or "off" turns logging off entirely
+    """
+    reset()
+
+    LOGGER.propagate = False
+    if level is None or level == "off":
+        LOGGER.disabled = True
+        return
+
+    LOGGER.setLevel(LEVELS[level])
+    if sample < 1.0:
+        LOGGER.addFilter(SampleFilter(sample))
+
+    writer = logging.StreamHandler(stream)
+    writer.setFormatter(JsonFormatter())
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    LOGGER.addHandler(_QueueHandler(records))
+
+    global _listener
+    _listener = logging.handlers.QueueListener(records, writer)
+    _listener.start()
+
+
+def reset() -> None:
+    """
+    Back to how logging found us, mostly for tests
+    """
+    shutdown()
+
+    for handler in list(LOGGER.handlers):
+        LOGGER.removeHandler(handler)
+    for log_filter in list(LOGGER.filters):
+        LOGGER.removeFilter(log_filter)
+
+    LOGGER.disabled = False
+    LOGGER.propagate = True
+    LOGGER.setLevel(logging.NOTSET)
+
+
+def shutdown() -> None:
+    """
+    Flushes whatever is still queued and stops the writer thread
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def enabled(level: str) -> bool:
+    """
+    For guarding log calls whose fields cost something to build
+    """
+    return LOGGER.isEnabledFor(LEVELS[level])
+
+
+def _log(level: int, event: str, fields: Dict[str, Any]) -> None:
+    # Checked first so a disabled level costs one call and no record
+    if LOGGER.isEnabledFor(level):
+        LOGGER.log(level, event, extra={"fields": fields})
+
+
+def debug(event: str, **fields: Any) -> None:
+    _log(logging.DEBUG, event, fields)
+
+
+def info(event: str, **fields: Any) -> None:
+    _log(logging.INFO, event, fields)
+
+
+def warning(event: str, **fields: Any) -> None:
+    _log(logging.WARNING, event, fields)
+
+
+def error(event: str, **fields: Any) -> None:
+    _log(logging.ERROR, event, fields)
+
+
+def exception(event: str, **fields: Any) -> None:
+    if LOGGER.isEnabledFor(logging.ERROR):
+        LOGGER.error(event, exc_info=True, extra={"fields": fields})
@@ -0,0 +1,320 @@
+"""
+In-process metrics for the server, readable from tests straight off the
+metric objects and scrapeable in the Prometheus text format.
+
+    curl http://localhost:9108/metrics
+"""
+
+from abc import ABC, abstractmethod
+import asyncio
+from bisect import bisect_left
+import math
+import time
+from typing import Callable, Dict, List, Tuple, TypeVar
+
+
+Labels = Tuple[str, ...]
+M = TypeVar("M", bound="Metric")
+
+# Seconds, tuned for commands that should take well under a millisecond
+LATENCY_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    1.0,
+)
+
+
+def _label_text(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+
+    return repr(value)
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Labels = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+
+    def _key(self, labels: Labels) -> Labels:
+        if len(labels) != len(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {labels}")
+
+        return labels
+
+    @abstractmethod
+    def samples(self) -> List[str]: ...
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.kind}",
+        ] + self.samples()
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Labels = ()) -> None:
+        super().__init__(name, help, labels)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self.values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_label_text(self.labels, key)} {_number(value)}"
+            for key, value in sorted(self.values.items())
+        ]
+
+    def clear(self) -> None:
+        self.values.clear()
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self.values[self._key(labels)] = value
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Labels = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        # per label set: a count per bucket plus one for +Inf, sum, count
+        self.values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        entry = self.values.get(key)
+        if entry is None:
+            entry = self.values[key] = ([0] * (len(self.buckets) + 1), [0.0, 0])
+        counts, totals = entry
+        counts[bisect_left(self.buckets, value)] += 1
+        totals[0] += value
+        totals[1] += 1
+
+    def count(self, *labels: str) -> int:
+        entry = self.values.get(labels)
+        return int(entry[1][1]) if entry else 0
+
+    def sum(self, *labels: str) -> float:
+        entry = self.values.get(labels)
+        return entry[1][0] if entry else 0.0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, totals) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = _label_text(self.labels, key, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _label_text(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_number(totals[0])}")
+            lines.append(f"{self.name}_count{labels} {_number(totals[1])}")
+
+        return lines
+
+    def clear(self) -> None:
+        self.values.clear()
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Metric] = {}
+        # Gauges filled in at scrape time, like the number of tables
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: M) -> M:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Labels = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Labels = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Labels = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def collect(self, func: Callable[[], None]) -> Callable[[], None]:
+        self.collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        for metric in self.metrics.values():
+            metric.clear()
+
+
+REGISTRY = Registry()
+
+COMMAND_SECONDS = REGISTRY.histogram(
+    "hearts_command_seconds",
+    "Time handling one incoming frame, by command and stage",
+    ("command", "stage"),
+)
+MESSAGES_IN = REGISTRY.counter(
+    "hearts_messages_in_total", "Frames received from clients", ("command",)
+)
+MESSAGES_OUT = REGISTRY.counter(
+    "hearts_messages_out_total", "Frames sent to clients, one per socket", ("command",)
+)
+BYTES_ENCODED = REGISTRY.counter(
+    "hearts_bytes_encoded_total", "Bytes of outgoing frames encoded", ("protocol",)
+)
+CONNECTIONS = REGISTRY.gauge("hearts_connections", "Open websocket connections")
+QUEUED_BYTES = REGISTRY.gauge(
+    "hearts_queued_bytes", "Bytes of frames waiting in send queues"
+)
+COMMANDS_REJECTED = REGISTRY.counter(
+    "hearts_commands_rejected_total",
+    "Frames turned away for arguments their command doesn't take",
+    ("command",),
+)
+SHED = REGISTRY.counter(
+    "hearts_shed_total",
+    "Commands and connections turned away to keep up with load",
+    ("reason",),
+)
+FRAMES_DROPPED = REGISTRY.counter(
+    "hearts_frames_dropped_total",
+    "Queued state frames superseded before they were sent",
+    ("reason",),
+)
+SLOW_DISCONNECTS = REGISTRY.counter(
+    "hearts_slow_disconnects_total", "Connections closed for not keeping up"
+)
+TABLES = REGISTRY.gauge("hearts_tables", "Tables hosted by this process")
+BOT_CARDS = REGISTRY.counter("hearts_bot_cards_total", "Cards played by bots")
+LOOP_LAG = REGISTRY.histogram(
+    "hearts_event_loop_lag_seconds",
+    "How late the event loop ran a timer it was asked to run",
+)
+
+
+class Timer:
+    """
+    Stopwatch for the stages of one frame, observed under a single command
+    """
+
+    def __init__(self) -> None:
+        self.last = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def observe(self, command: str) -> None:
+        for stage, seconds in self.stages:
+            COMMAND_SECONDS.observe(seconds, command, stage)
+
+
+async def monitor_loop_lag(interval: float = 0.5) -> None:
+    """
+    Runs forever, sleeping interval and recording how late it woke up
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
+async def _scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request = await reader.readline()
+        # headers aren't needed, but read them so the client isn't cut off
+        while (await reader.readline()).strip():
+            pass
+
+        parts = request.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1] in ("/", "/metrics"):
+            status = "200 OK"
+            body = REGISTRY.render().encode()
+        else:
+            status = "404 Not Found"
+            body = b"Not found\n"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve_metrics(
+    host: str = "localhost", port: int = 9108
+) -> asyncio.AbstractServer:
+    """
+    Starts the scrape endpoint, port 0 picks a free port
+    """
+    return await asyncio.start_server(_scrape, host, port)
@@ -0,0 +1,136 @@
+"""
+Per connection send queues, so one slow client can't hold up its table or
+pile up memory on the server.
+
+Frames for a socket go into its Outbox and a task per connection writes
+them out in order.  A full update supersedes any state frames (updates and
+deltas) still waiting, only the latest state is worth sending.  When the
+queue goes over its frame or byte bound, the waiting state frames are
+thrown away and put() says so, the server then queues one fresh snapshot
+in their place.  A connection that overflows strikes times without its
+queue emptying in between is too slow to keep up, and gets closed.
+
+    outbox = Outbox(websocket)
+    writer = asyncio.create_task(outbox.run())
+    if outbox.put("delta", payload) == RESYNC:
+        ...
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, Deque, Optional, Tuple
+
+import websockets
+
+from hearts_textual import metrics
+
+# Frames and bytes a socket may have waiting
+MAX_FRAMES = 256
+MAX_BYTES = 1 << 20
+# Overflows without catching up before the socket is closed
+STRIKES = 3
+
+QUEUED = "queued"
+RESYNC = "resync"
+CLOSED = "closed"
+
+# Commands carrying game state, a newer full update makes them pointless
+STATE_COMMANDS = {"update", "delta"}
+
+# Close code for consumers that couldn't keep up, 1008 is policy violation
+SLOW_CLOSE_CODE = 1008
+
+
+class Outbox:
+    def __init__(
+        self,
+        websocket,
+        max_frames: int = MAX_FRAMES,
+        max_bytes: int = MAX_BYTES,
+        strikes: int = STRIKES,
+    ) -> None:
+        self.websocket = websocket
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.strikes = strikes
+        self.frames: Deque[Tuple[str, Any]] = deque()
+        self.bytes = 0
+        # Overflows since the queue last emptied
+        self.overflows = 0
+        self.closed = False
+        # Closing the socket, kept so the task isn't collected half way
+        self.closing: Optional[asyncio.Task] = None
+        self.wake = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def put(self, command: str, payload: str | bytes) -> str:
+        """
+        Queues a frame, QUEUED normally.  RESYNC when the queue overflowed
+        and the socket's state frames were dropped, it needs a snapshot.
+        CLOSED once the socket has been given up on.
+        """
+        if self.closed:
+            return CLOSED
+
+        if command == "update":
+            self._drop_state("coalesced")
+
+        self.frames.append((command, payload))
+        self.bytes += len(payload)
+        self.wake.set()
+
+        if len(self.frames) <= self.max_frames and self.bytes <= self.max_bytes:
+            return QUEUED
+
+        self.overflows += 1
+        if self.overflows >= self.strikes:
+            self.close()
+            return CLOSED
+
+        self._drop_state("overflow")
+        return RESYNC
+
+    def _drop_state(self, reason: str) -> None:
+        kept: Deque[Tuple[str, Any]] = deque()
+        for command, payload in self.frames:
+            if command in STATE_COMMANDS:
+                self.bytes -= len(payload)
+                metrics.FRAMES_DROPPED.inc(reason)
+            else:
+                kept.append((command, payload))
+        self.frames = kept
+
+    def close(self) -> None:
+        """
+        Gives up on the socket, dropping whatever is still queued
+        """
+        self.closed = True
+        self.frames.clear()
+        self.bytes = 0
+        self.wake.set()
+        metrics.SLOW_DISCONNECTS.inc()
+        self.closing = asyncio.get_running_loop().create_task(
+            self.websocket.close(SLOW_CLOSE_CODE, "too slow")
+        )
+
+    async def run(self) -> None:
+        """
+        Writes queued frames until the socket closes
+        """
+        while not self.closed:
+            if not self.frames:
+                self.overflows = 0
+                self.wake.clear()
+                await self.wake.wait()
+                continue
+
+            _, payload = self.frames.popleft()
+            self.bytes -= len(payload)
+            try:
+                await self.websocket.send(payload)
+            except websockets.ConnectionClosed:
+                # Gone from under us, the handler notices and cleans up
+                self.closed = True
+                return
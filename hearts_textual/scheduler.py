@@ -0,0 +1,110 @@
+"""
+Plays bot turns for every table from one work queue, a few cards per table
+per tick, so all-bot tables can't hog the event loop and every table gets
+its turn.
+
+A bot policy with an async decide(game, player), like the search bot, is
+awaited instead of called, so its thinking happens off the event loop.
+The tables of a tick think at the same time.
+"""
+
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Set, Tuple
+
+from hearts_textual.data import Game, PlayEvent
+from hearts_textual.tables import Table
+
+
+Publish = Callable[[Table, List[PlayEvent]], Awaitable[None]]
+
+
+class BotScheduler:
+    def __init__(self, steps_per_tick: int = 1) -> None:
+        self.steps_per_tick = steps_per_tick
+        self.queue: Deque[Table] = deque()
+        self.queued: Set[Table] = set()
+        # Tables a tick is playing for right now
+        self.thinking: Set[Table] = set()
+        self.wake = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def schedule(self, table: Table) -> None:
+        """
+        Queue table if a bot has to play there, safe to call after any command
+        """
+        if table in self.queued or table in self.thinking:
+            return
+        if not table.game.bot_to_play():
+            return
+
+        self.queue.append(table)
+        self.queued.add(table)
+        self.wake.set()
+
+    async def tick(self) -> List[Tuple[Table, List[PlayEvent]]]:
+        """
+        Gives each table queued right now up to steps_per_tick cards, tables
+        still waiting on a bot go to the back of the queue
+        """
+        tables = []
+        for _ in range(len(self.queue)):
+            table = self.queue.popleft()
+            self.queued.discard(table)
+
+            # Everyone left, nobody to play for
+            if not table.is_empty():
+                tables.append(table)
+
+        self.thinking.update(tables)
+        try:
+            results = await asyncio.gather(*(self._advance(t) for t in tables))
+        finally:
+            self.thinking.difference_update(tables)
+
+        played = []
+        for table, events in zip(tables, results):
+            if events:
+                played.append((table, events))
+            self.schedule(table)
+
+        return played
+
+    async def _advance(self, table: Table) -> List[PlayEvent]:
+        decide = getattr(Game.bot_policy, "decide", None)
+        if decide is None:
+            return table.game.advance(self.steps_per_tick)
+
+        game = table.game
+        events: List[PlayEvent] = []
+        while game.bot_to_play() and len(events) < self.steps_per_tick:
+            version = game.version
+            card = await decide(game, game._current_player())
+            # Someone else moved the game on while the bot thought
+            if table.game is not game or game.version != version:
+                break
+            events.append(game.play_bot(card))
+
+        return events
+
+    def clear(self) -> None:
+        self.queue.clear()
+        self.queued.clear()
+        self.thinking.clear()
+
+    async def run(self, publish: Publish, delay: float = 0.0) -> None:
+        """
+        Runs forever, sleeping until something is scheduled.  delay paces
+        the ticks, 0 only yields to the event loop between them
+        """
+        while True:
+            if not self.queue:
+                self.wake.clear()
+                await self.wake.wait()
+
+            for table, events in await self.tick():
+                await publish(table, events)
+
+            await asyncio.sleep(delay)
@@ -0,0 +1,151 @@
+"""
+Argument checking for commands, worked out once from each command's
+signature when @command registers it.  A frame with arguments a command
+doesn't take, missing ones it needs, or values of the wrong type is turned
+away before any of the command runs.  Cards are coerced to Card on the way
+in.
+
+    schema = Schema(play_card, injected={"websocket", "table"})
+    problem = schema.check(args)  # None if args will do, coerced in place
+    schema.describe()  # {"card": {"type": "Card", "required": True}}
+"""
+
+import inspect
+import types
+import typing
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Union
+
+from hearts_textual.data import Card
+
+# Gives back the value, coerced if need be, raises ValueError if it won't do
+Check = Callable[[Any], Any]
+
+
+def _any(value: Any) -> Any:
+    return value
+
+
+def _instance(kind: type) -> Check:
+    def check(value: Any) -> Any:
+        # bool is an int as far as isinstance cares, but not as far as we do
+        if not isinstance(value, kind) or (type(value) is bool and kind is not bool):
+            raise ValueError(f"expected {kind.__name__}, got {type(value).__name__}")
+        return value
+
+    return check
+
+
+def _number(value: Any) -> Any:
+    if type(value) not in (int, float):
+        raise ValueError(f"expected float, got {type(value).__name__}")
+    return value
+
+
+def _optional(inner: Check) -> Check:
+    def check(value: Any) -> Any:
+        return None if value is None else inner(value)
+
+    return check
+
+
+def _list_of(inner: Check) -> Check:
+    def check(value: Any) -> Any:
+        if type(value) is not list:
+            raise ValueError(f"expected list, got {type(value).__name__}")
+        if inner is _any:
+            return value
+        return [inner(item) for item in value]
+
+    return check
+
+
+def _card(value: Any) -> Card:
+    try:
+        return Card.from_dict(value)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"expected a card, got {value!r}")
+
+
+def _compile(annotation: Any) -> Check:
+    if annotation is inspect.Parameter.empty or annotation is Any:
+        return _any
+    if annotation is Card:
+        return _card
+    if annotation is float:
+        return _number
+
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin in (Union, types.UnionType) and type(None) in args:
+        (inner,) = [arg for arg in args if arg is not type(None)]
+        return _optional(_compile(inner))
+    if origin is list:
+        return _list_of(_compile(args[0]) if args else _any)
+    if origin is dict:
+        return _instance(dict)
+    if annotation in (str, int, bool, list, dict):
+        return _instance(annotation)
+
+    raise Exception(f"Can't check arguments of type {annotation}")
+
+
+def _type_name(annotation: Any) -> str:
+    if annotation is inspect.Parameter.empty:
+        return "any"
+    if isinstance(annotation, type) and not typing.get_args(annotation):
+        return annotation.__name__
+
+    return str(annotation).replace("typing.", "")
+
+
+class Schema:
+    """
+    The arguments one command takes from a frame
+    """
+
+    def __init__(
+        self, func: Callable, injected: Iterable[str] = (), client_only: bool = False
+    ) -> None:
+        self.name = func.__name__
+        # Only servers send it, clients run it
+        self.client_only = client_only
+        self.checks: Dict[str, Check] = {}
+        self.required: Set[str] = set()
+        self.types: Dict[str, str] = {}
+
+        for name, param in inspect.signature(func).parameters.items():
+            if name in injected:
+                continue
+            if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+                continue
+
+            self.checks[name] = _compile(param.annotation)
+            self.types[name] = _type_name(param.annotation)
+            if param.default is param.empty:
+                self.required.add(name)
+
+    def check(self, args: Dict[str, Any]) -> Optional[str]:
+        """
+        What's wrong with args, None if nothing is
+        """
+        for key in args:
+            if key not in self.checks:
+                return f"{self.name} doesn't take {key}"
+
+        if not self.required <= args.keys():
+            missing = ", ".join(sorted(self.required - args.keys()))
+            return f"{self.name} needs {missing}"
+
+        for key, value in args.items():
+            try:
+                args[key] = self.checks[key](value)
+            except ValueError as error:
+                return f"{self.name} {key}: {error}"
+
+        return None
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {"type": kind, "required": name in self.required}
+            for name, kind in self.types.items()
+        }
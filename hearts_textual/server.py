@@ -1,53 +1,374 @@
 #!/usr/bin/env python
 
 
+import contextlib
 from dataclasses import dataclass
+import functools
+import signal
+from typing import Any, Dict, List, Optional, Set
 
 import asyncio
 import websockets
-from rich.pretty import pprint
 import simple_parsing
 
+from hearts_textual import (
+    admission,
+    binary,
+    cluster,
+    codec,
+    ismcts,
+    journal,
+    log,
+    metrics,
+    outbox,
+)
+from hearts_textual.admission import ADMISSION
+from hearts_textual.cluster import Shard
 from hearts_textual.commands import (
-    run_command,
-    GAME,
-    PLAYERS_TO_SOCKETS,
-    SOCKETS_TO_PLAYERS,
+    COMMANDS,
+    busy,
+    create,
+    dispatch,
+    echo,
+    TABLES,
+    update,
 )
+from hearts_textual.data import Game, PlayEvent
+from hearts_textual.outbox import Outbox
+from hearts_textual.scheduler import BotScheduler
+from hearts_textual.store import SqliteStore
+from hearts_textual.tables import RESUME_WINDOW, Table
+
+connected: Set[Any] = set()
+BOTS = BotScheduler()
+OUTBOXES: Dict[Any, Outbox] = {}
+
+# Seconds between sweeps for expired sessions
+SWEEP_INTERVAL = 10.0
+
+
+@metrics.REGISTRY.collect
+def _count_tables() -> None:
+    metrics.TABLES.set(len(TABLES))
+
+
+@metrics.REGISTRY.collect
+def _count_queued() -> None:
+    metrics.QUEUED_BYTES.set(sum(box.bytes for box in OUTBOXES.values()))
+
+
+def _protocol(sockets) -> str:
+    return "binary" if binary.wants_binary(next(iter(sockets))) else "json"
+
+
+def _encode(frames):
+    outgoing = []
+    for recipients, frame in frames:
+        # Encoded once per protocol, not once per socket
+        for sockets, payload in binary.encode_for(recipients, frame):
+            outgoing.append((sockets, frame.command, payload))
+            metrics.BYTES_ENCODED.inc(_protocol(sockets), amount=len(payload))
+            metrics.MESSAGES_OUT.inc(frame.command, amount=len(sockets))
+
+    return outgoing
+
+
+def _broadcast(outgoing) -> None:
+    behind = set()
+    for sockets, command, payload in outgoing:
+        for websocket in sockets:
+            box = OUTBOXES.get(websocket)
+            if box is not None and box.put(command, payload) == outbox.RESYNC:
+                behind.add(websocket)
+
+    for websocket in behind:
+        _resync(websocket)
+
+
+def _resync(websocket) -> None:
+    """
+    Queues a snapshot for a socket whose backlog was thrown away
+    """
+    table = TABLES.for_socket(websocket)
+    if table is None:
+        return
+
+    table.synced.discard(websocket)
+    result = create(update, state=table.game, messages=[])
+    _broadcast(_encode(table.outbound(result)))
+
+
+async def _turn_away(websocket) -> None:
+    """
+    Tells a connection over the cap to come back later, and closes it
+    """
+    metrics.SHED.inc("connections")
+    log.info("busy", remote=str(websocket.remote_address))
+    message = create(busy, reason="connections", retry_after=ADMISSION.retry_after)
+    for _, payload in binary.encode_for({websocket}, message):
+        await websocket.send(payload)
+    await websocket.close(admission.BUSY_CLOSE_CODE, "server busy")
 
-connected = set()
 
+async def publish_bot_plays(table: Table, events: List[PlayEvent]) -> None:
+    messages = [f"toaster('{event.player} played {event.card}')" for event in events]
+    result = create(update, state=table.game, messages=messages)
+    _broadcast(_encode(table.outbound(result)))
+    metrics.BOT_CARDS.inc(amount=len(events))
+    TABLES.checkpoint(table)
+
+
+async def sweep_sessions() -> None:
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL)
+        # Seats given up for good go back on offer, let whoever's left see it
+        for table in TABLES.sweep():
+            result = create(update, state=table.game, messages=[])
+            _broadcast(_encode(table.outbound(result)))
+
+
+async def handler(websocket, **outbox_args):
+    if ADMISSION.connections_full(len(connected)):
+        await _turn_away(websocket)
+        return
 
-async def handler(websocket):
     # Register.
     connected.add(websocket)
+    box = OUTBOXES[websocket] = Outbox(websocket, **outbox_args)
+    writer = asyncio.create_task(box.run())
+    bucket = ADMISSION.bucket()
+    throttled = False
+    metrics.CONNECTIONS.inc()
+    log.info("connect", remote=str(websocket.remote_address))
     try:
         async for message in websocket:
-            result = run_command(message, websocket)
-            pprint(result)
-            websockets.broadcast(connected, result.to_json())
+            wait = 0.0 if bucket is None else bucket.take()
+            if wait:
+                # Dropped unread, the sender hears once each time it goes over
+                metrics.SHED.inc("rate")
+                if not throttled:
+                    result = create(busy, reason="rate", retry_after=wait)
+                    _broadcast(_encode([({websocket}, result)]))
+                throttled = True
+                continue
+            throttled = False
+
+            timer = metrics.Timer()
+            try:
+                incoming = binary.decode_frame(message)
+            except codec.FrameError as error:
+                metrics.MESSAGES_IN.inc("malformed")
+                result = create(echo, message=f"Bad frame, {error}")
+                _broadcast(_encode([({websocket}, result)]))
+                continue
+            command = incoming.command if incoming.command in COMMANDS else "unknown"
+            metrics.MESSAGES_IN.inc(command)
+            timer.lap("decode")
+
+            result = dispatch(incoming, websocket, from_client=True)
+            timer.lap("run")
+            if log.enabled("debug"):
+                log.debug(
+                    "command",
+                    command=incoming.command,
+                    result=result.command,
+                    table=getattr(TABLES.for_socket(websocket), "id", None),
+                )
+
+            # Only the table the sender sits at sees the result
+            outgoing = _encode(TABLES.outbound(websocket, result))
+            timer.lap("encode")
+
+            _broadcast(outgoing)
+            timer.lap("broadcast")
+            timer.observe(command)
+
+            table = TABLES.for_socket(websocket)
+            if table is not None:
+                TABLES.checkpoint(table)
+                BOTS.schedule(table)
     finally:
         # Unregister.
+        writer.cancel()
+        OUTBOXES.pop(websocket, None)
         connected.remove(websocket)
-        player = SOCKETS_TO_PLAYERS.pop(websocket)
-        PLAYERS_TO_SOCKETS.pop(player)
-        pprint(player)
+        metrics.CONNECTIONS.dec()
+        player = TABLES.leave(websocket)
+        log.info("disconnect", player=getattr(player, "name", None))
+        if box.closing is not None:
+            await box.closing
+
 
+def _stop(stop: asyncio.Future) -> None:
+    if not stop.done():
+        stop.set_result(None)
 
-async def server():
-    async with websockets.serve(handler, "localhost", 8765):
-        await asyncio.Future()  # run forever
+
+async def server(
+    host: str = "localhost",
+    port: int = 8765,
+    metrics_port: int = 0,
+    bot_delay: float = 0.0,
+    outbox_args: Optional[Dict[str, int]] = None,
+):
+    if metrics_port:
+        await metrics.serve_metrics(host, metrics_port)
+    lag = asyncio.create_task(metrics.monitor_loop_lag())
+    bots = asyncio.create_task(BOTS.run(publish_bot_plays, bot_delay))
+    sweeper = asyncio.create_task(sweep_sessions())
+
+    serving = functools.partial(handler, **(outbox_args or {}))
+    shard = TABLES.shard
+    loop = asyncio.get_running_loop()
+    try:
+        async with contextlib.AsyncExitStack() as listeners:
+            await listeners.enter_async_context(
+                websockets.serve(
+                    serving,
+                    host,
+                    port,
+                    subprotocols=binary.SUBPROTOCOLS,
+                    # Every worker takes connections on the public port
+                    reuse_port=shard is not None,
+                )
+            )
+            if shard is not None:
+                # Where redirects for this worker's tables point
+                await listeners.enter_async_context(
+                    websockets.serve(
+                        serving, host, shard.own_port, subprotocols=binary.SUBPROTOCOLS
+                    )
+                )
+            # Runs until SIGTERM, e.g. from the cluster's parent, and returns so
+            # run() still gets to close the store and journal
+            stop = loop.create_future()
+            loop.add_signal_handler(signal.SIGTERM, _stop, stop)
+            await stop
+    finally:
+        # Also on cancellation, or the background tasks outlive the server
+        loop.remove_signal_handler(signal.SIGTERM)
+        lag.cancel()
+        bots.cancel()
+        sweeper.cancel()
 
 
 @dataclass
 class Options:
     bots: bool = False
+    # Seconds between bot cards, 0 plays them as fast as the loop allows
+    bot_delay: float = 0.0
+    # Cards each table's bots may play before the next table gets a go
+    bot_steps: int = 1
+    # random, or ismcts for the search bot
+    bot: str = "random"
+    # Seconds the search bot may think about each card
+    bot_budget: float = 0.25
+    # Processes searching alongside the server's own, 0 searches inline
+    bot_workers: int = 0
+    host: str = "localhost"
+    port: int = 8765
+    # Prometheus text scrape endpoint on host, 0 turns it off
+    metrics_port: int = 9108
+    # debug, info, warning, error or off, defaults to off in production
+    log_level: Optional[str] = None
+    # Fraction of debug and info records kept
+    log_sample: float = 1.0
+    production: bool = False
+    # Directory to journal every table's game to, none if unset
+    journal_dir: Optional[str] = None
+    # Events between full snapshots in a journal
+    journal_snapshot_every: int = journal.SNAPSHOT_EVERY
+    # SQLite database to checkpoint games in progress to and restore them from
+    store: Optional[str] = None
+    # Seconds between checkpoint commits
+    store_interval: float = 0.5
+    # Seconds a dropped player has to resume their seat
+    resume_window: float = RESUME_WINDOW
+    # Frames and bytes each connection may have waiting to be sent
+    send_queue_frames: int = outbox.MAX_FRAMES
+    send_queue_bytes: int = outbox.MAX_BYTES
+    # Send queue overflows in a row before a connection is closed as too slow
+    slow_strikes: int = outbox.STRIKES
+    # Commands a second each connection may send, and in one burst, 0 rate is no limit
+    rate_limit: float = admission.RATE
+    rate_burst: int = admission.BURST
+    # Connections and tables this process takes on, 0 for no cap
+    max_connections: int = 0
+    max_tables: int = 0
+    # Seconds clients turned away for capacity are told to wait
+    retry_after: float = admission.RETRY_AFTER
+    # Worker processes sharing the port, each hosting its own share of tables
+    workers: int = 1
 
 
 def main():
     options, _ = simple_parsing.parse_known_args(Options)
-    GAME.bots = options.bots
-    asyncio.run(server())
+    if options.workers > 1:
+        cluster.run_workers(run, options.workers, options.port, options)
+    else:
+        run(None, options)
+
+
+def run(shard: Optional[Shard], options: Options) -> None:
+    """
+    Runs one server process, or one worker of a cluster
+    """
+    if shard is not None:
+        # Ctrl-C reaches the whole process group, leave it to the parent,
+        # which stops us with SIGTERM
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    log_level = options.log_level
+    if log_level is None:
+        log_level = "off" if options.production else "info"
+    log.configure(log_level, options.log_sample)
+
+    TABLES.shard = shard
+    TABLES.bots = options.bots
+    TABLES.resume_window = options.resume_window
+    ADMISSION.rate = options.rate_limit
+    ADMISSION.burst = options.rate_burst
+    ADMISSION.max_connections = options.max_connections
+    ADMISSION.max_tables = options.max_tables
+    ADMISSION.retry_after = options.retry_after
+    for table in TABLES:
+        table.game.bots = options.bots
+    if options.store is not None:
+        restored = TABLES.restore(SqliteStore(options.store, options.store_interval))
+        log.info("restored", tables=len(restored))
+    if options.journal_dir is not None:
+        journal.configure(options.journal_dir, options.journal_snapshot_every)
+        # Tables made or restored before now
+        for table in TABLES:
+            journal.start(table.id, table.game)
+    BOTS.steps_per_tick = options.bot_steps
+    if options.bot == "ismcts":
+        Game.bot_policy = ismcts.Searcher(
+            budget=options.bot_budget, workers=options.bot_workers
+        ).start()
+    metrics_port = options.metrics_port
+    if shard is not None and metrics_port:
+        metrics_port += shard.index
+    try:
+        asyncio.run(
+            server(
+                options.host,
+                options.port,
+                metrics_port,
+                options.bot_delay,
+                {
+                    "max_frames": options.send_queue_frames,
+                    "max_bytes": options.send_queue_bytes,
+                    "strikes": options.slow_strikes,
+                },
+            )
+        )
+    finally:
+        if isinstance(Game.bot_policy, ismcts.Searcher):
+            Game.bot_policy.close()
+        if TABLES.store is not None:
+            TABLES.store.close()
+        journal.shutdown()
+        log.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+"""
+Headless bot-vs-bot self-play, straight on Game with no websockets or TUI.
+
+    python -m hearts_textual.simulate --games 1000 --workers 8
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import json
+import os
+import random
+import statistics
+import time
+from typing import Dict, List, Optional
+
+import simple_parsing
+
+from hearts_textual.data import Game
+
+
+# A game that runs this long has gone wrong somewhere
+MAX_ROUNDS = 200
+
+
+@dataclass
+class GameResult:
+    rounds: int
+    tricks: int
+    scores: List[int]
+
+
+@dataclass
+class Report:
+    games: int
+    workers: int
+    seconds: float
+    tricks: int
+    rounds: int
+    scores: List[int] = field(default_factory=list)
+    winners: List[int] = field(default_factory=lambda: [0, 0, 0, 0])
+
+    def games_per_second(self) -> float:
+        return self.games / self.seconds
+
+    def tricks_per_second(self) -> float:
+        return self.tricks / self.seconds
+
+    def score_histogram(self, width: int = 10) -> Dict[str, int]:
+        buckets: Dict[int, int] = {}
+        for score in self.scores:
+            bucket = score // width * width
+            buckets[bucket] = buckets.get(bucket, 0) + 1
+
+        return {
+            f"{bucket}-{bucket + width - 1}": buckets[bucket]
+            for bucket in sorted(buckets)
+        }
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "games": self.games,
+            "workers": self.workers,
+            "seconds": round(self.seconds, 3),
+            "games_per_second": round(self.games_per_second(), 1),
+            "tricks_per_second": round(self.tricks_per_second(), 1),
+            "rounds_per_game": round(self.rounds / self.games, 2),
+            "score_mean": round(statistics.fmean(self.scores), 2),
+            "score_stdev": round(statistics.pstdev(self.scores), 2),
+            "score_min": min(self.scores),
+            "score_max": max(self.scores),
+            "score_histogram": self.score_histogram(),
+            "wins_by_seat": self.winners,
+        }
+
+
+def new_bot_game() -> Game:
+    """
+    Every seat a bot, nobody connects so new_game hands them all over
+    """
+    game = Game().reset()
+    game.bots = True
+
+    return game.new_game().next_round().next_turn()
+
+
+def play_game() -> GameResult:
+    game = new_bot_game()
+    cards = 0
+
+    while not game.ended:
+        if game.round > MAX_ROUNDS:
+            raise Exception(f"Game still going after {MAX_ROUNDS} rounds")
+
+        # A round at a time, so a runaway game still trips the check above
+        cards += len(game.advance(52))
+
+    return GameResult(
+        # next_round has already moved on to the round that never got played
+        rounds=game.round - 1,
+        tricks=cards // 4,
+        scores=[player.score_total() for player in game.players],
+    )
+
+
+def play_games(count: int, seed: Optional[int] = None) -> List[GameResult]:
+    if seed is not None:
+        random.seed(seed)
+
+    return [play_game() for _ in range(count)]
+
+
+def _chunks(games: int, workers: int) -> List[int]:
+    size, extra = divmod(games, workers)
+
+    return [size + (1 if i < extra else 0) for i in range(workers) if size or i < extra]
+
+
+def simulate(games: int, workers: int = 1, seed: Optional[int] = None) -> Report:
+    chunks = _chunks(games, workers)
+    seeds = [None if seed is None else seed + i for i in range(len(chunks))]
+
+    start = time.perf_counter()
+    if workers == 1:
+        batches = [
+            play_games(count, chunk_seed) for count, chunk_seed in zip(chunks, seeds)
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            batches = list(pool.map(play_games, chunks, seeds))
+    seconds = time.perf_counter() - start
+
+    report = Report(games=games, workers=workers, seconds=seconds, tricks=0, rounds=0)
+    for batch in batches:
+        for result in batch:
+            report.tricks += result.tricks
+            report.rounds += result.rounds
+            report.scores.extend(result.scores)
+            report.winners[result.scores.index(min(result.scores))] += 1
+
+    return report
+
+
+@dataclass
+class Options:
+    games: int = 100
+    workers: int = os.cpu_count() or 1
+    seed: Optional[int] = None
+    json: bool = False
+
+
+def main():
+    options, _ = simple_parsing.parse_known_args(Options)
+    report = simulate(options.games, options.workers, options.seed)
+
+    if options.json:
+        print(json.dumps(report.to_dict()))
+        return
+
+    for key, value in report.to_dict().items():
+        print(f"{key:>18}: {value}")
+
+
+if __name__ == "__main__":
+    main()
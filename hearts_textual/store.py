@@ -0,0 +1,213 @@
+"""
+Checkpoints of in-progress tables, so a restart or a crash doesn't take the
+games being played with it.
+
+The registry hands a table's game to its store whenever the game has moved
+on and sits between tricks, so at most the cards of one trick are lost.
+Finished games and tables that never started are deleted instead.  On
+startup the server loads everything left and players rejoin their seats.
+
+SqliteStore keeps one row per table in a WAL mode database.  save() only
+encodes the game and parks it, a writer thread commits whatever has piled
+up in one transaction every interval, keeping just the latest checkpoint
+per table.
+
+    store = SqliteStore("tables.db")
+    for table_id, game, saved_at in store.load():
+        ...
+"""
+
+from abc import ABC, abstractmethod
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from hearts_textual import journal
+from hearts_textual.data import Game
+
+# Seconds between the writer's commits
+INTERVAL = 0.5
+
+_encoder = json.JSONEncoder(separators=(",", ":"))
+
+
+def encode(game: Game) -> str:
+    return _encoder.encode(journal.snapshot_of(game))
+
+
+def decode(checkpoint: str | bytes) -> Game:
+    return journal.restore(json.loads(checkpoint))
+
+
+class TableStore(ABC):
+    """
+    Where checkpoints go
+    """
+
+    @abstractmethod
+    def save(self, table_id: str, game: Game) -> None: ...
+
+    @abstractmethod
+    def delete(self, table_id: str) -> None: ...
+
+    @abstractmethod
+    def load(self) -> Iterator[Tuple[str, Game, float]]:
+        """
+        Every table's last checkpoint, with the time.time() it was saved at
+        """
+
+    def flush(self) -> None:
+        """
+        Waits until everything saved so far is stored
+        """
+
+    def close(self) -> None:
+        self.flush()
+
+
+class MemoryStore(TableStore):
+    """
+    Keeps checkpoints in a dict, for tests and for running without a disk
+    """
+
+    def __init__(self) -> None:
+        self.checkpoints: Dict[str, str] = {}
+        self.saved_at: Dict[str, float] = {}
+
+    def save(self, table_id: str, game: Game) -> None:
+        self.checkpoints[table_id] = encode(game)
+        self.saved_at[table_id] = time.time()
+
+    def delete(self, table_id: str) -> None:
+        self.checkpoints.pop(table_id, None)
+        self.saved_at.pop(table_id, None)
+
+    def load(self) -> Iterator[Tuple[str, Game, float]]:
+        for table_id, checkpoint in list(self.checkpoints.items()):
+            yield table_id, decode(checkpoint), self.saved_at[table_id]
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tables (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    checkpoint TEXT NOT NULL,
+    saved_at REAL NOT NULL DEFAULT 0
+)
+"""
+
+
+class SqliteStore(TableStore):
+    def __init__(self, path: str, interval: float = INTERVAL) -> None:
+        self.path = path
+        self.interval = interval
+        # table id -> (version, checkpoint, saved at), None to delete
+        self.pending: Dict[str, Optional[Tuple[int, str, float]]] = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = False
+        self.flushed = threading.Condition(self.lock)
+        # Counts of saves and deletes asked for, and of those committed
+        self.queued = 0
+        self.written = 0
+
+        db = self._connect()
+        db.execute(SCHEMA)
+        columns = [row[1] for row in db.execute("PRAGMA table_info(tables)")]
+        if "saved_at" not in columns:
+            # Databases from before checkpoints were timed
+            db.execute("ALTER TABLE tables ADD COLUMN saved_at REAL NOT NULL DEFAULT 0")
+        db.close()
+
+        self.thread = threading.Thread(
+            target=self._run, name="table-store", daemon=True
+        )
+        self.thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps NORMAL crash safe, only the last commits can go missing
+        db.execute("PRAGMA synchronous=NORMAL")
+
+        return db
+
+    def save(self, table_id: str, game: Game) -> None:
+        checkpoint = encode(game)
+        with self.lock:
+            self.pending[table_id] = (game.version, checkpoint, time.time())
+            self.queued += 1
+
+    def delete(self, table_id: str) -> None:
+        with self.lock:
+            self.pending[table_id] = None
+            self.queued += 1
+
+    def load(self) -> Iterator[Tuple[str, Game, float]]:
+        self.flush()
+        db = self._connect()
+        try:
+            rows = db.execute("SELECT id, checkpoint, saved_at FROM tables").fetchall()
+        finally:
+            db.close()
+
+        for table_id, checkpoint, saved_at in rows:
+            yield table_id, decode(checkpoint), saved_at
+
+    def flush(self) -> None:
+        with self.lock:
+            target = self.queued
+            self.wake.set()
+            while self.written < target and self.thread.is_alive():
+                self.flushed.wait(self.interval)
+
+    def close(self) -> None:
+        with self.lock:
+            self.stopping = True
+        self.wake.set()
+        self.thread.join()
+
+    def _run(self) -> None:
+        db = self._connect()
+        try:
+            while True:
+                self.wake.wait(self.interval)
+                self.wake.clear()
+                with self.lock:
+                    batch, self.pending = self.pending, {}
+                    upto = self.queued
+                    stopping = self.stopping
+
+                if batch:
+                    self._write(db, batch)
+
+                with self.lock:
+                    self.written = upto
+                    self.flushed.notify_all()
+
+                if stopping:
+                    return
+        finally:
+            db.close()
+
+    def _write(self, db: sqlite3.Connection, batch: Dict) -> None:
+        saves: List[Tuple[str, int, str, float]] = []
+        deletes: List[Tuple[str]] = []
+        for table_id, saved in batch.items():
+            if saved is None:
+                deletes.append((table_id,))
+            else:
+                saves.append((table_id, *saved))
+
+        db.execute("BEGIN")
+        db.executemany(
+            "INSERT INTO tables (id, version, checkpoint, saved_at)"
+            " VALUES (?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET"
+            " version = excluded.version, checkpoint = excluded.checkpoint,"
+            " saved_at = excluded.saved_at",
+            saves,
+        )
+        db.executemany("DELETE FROM tables WHERE id = ?", deletes)
+        db.execute("COMMIT")
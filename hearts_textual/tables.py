@@ -0,0 +1,480 @@
+from collections import deque
+from dataclasses import dataclass, field
+import itertools
+import secrets
+import time
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from hearts_textual import delta, journal
+from hearts_textual.cluster import Shard
+from hearts_textual.data import Game, Message, Player
+from hearts_textual.store import TableStore
+from hearts_textual.views import SPECTATOR, Views
+
+
+DEFAULT_TABLE_ID = "default"
+
+# Deltas each table keeps for reconnecting clients to catch up from
+HISTORY = 64
+# Seconds a dropped connection's session lives, empty tables go with them
+RESUME_WINDOW = 120.0
+# Command results only the sender sees
+REPLIES = {"busy", "echo", "redirect", "replay", "schemas", "tables"}
+
+
+def new_table_game() -> Game:
+    return Game().reset()
+
+
+@dataclass(eq=False)
+class Table:
+    """
+    One game plus the sockets seated at it, or watching it
+    """
+
+    id: str
+    game: Game = field(default_factory=new_table_game)
+    sockets_to_players: Dict[Any, Player] = field(default_factory=dict)
+    players_to_sockets: Dict[Player, Any] = field(default_factory=dict)
+    spectators: Set[Any] = field(default_factory=set)
+    # Sockets holding the last published state, they only need deltas
+    synced: Set[Any] = field(default_factory=set)
+    # Last published state per viewer, see _viewer
+    published: Dict[Optional[int], Dict[str, Any]] = field(default_factory=dict)
+    published_version: Optional[int] = None
+    views: Views = field(default_factory=Views)
+    # Game version last handed to the registry's store
+    saved_version: Optional[int] = None
+    # time.monotonic() until which a restored table is kept, seated or not
+    held_until: Optional[float] = None
+    # Recent delta args per viewer, oldest first
+    history: Deque[Dict[Optional[int], Dict[str, Any]]] = field(
+        default_factory=lambda: deque(maxlen=HISTORY)
+    )
+
+    def members(self) -> Set[Any]:
+        return set(self.sockets_to_players.keys()) | self.spectators
+
+    def seat(self, websocket, player: Player) -> None:
+        self.spectators.discard(websocket)
+        self.synced.discard(websocket)
+        self.sockets_to_players[websocket] = player
+        self.players_to_sockets[player] = websocket
+
+    def watch(self, websocket) -> None:
+        self.unseat(websocket)
+        self.spectators.add(websocket)
+
+    def unseat(self, websocket) -> Optional[Player]:
+        player = self.sockets_to_players.pop(websocket, None)
+        self.spectators.discard(websocket)
+        self.synced.discard(websocket)
+        if player is not None:
+            self.players_to_sockets.pop(player, None)
+
+        return player
+
+    def outbound(self, message: Message, sender=None) -> List[Tuple[Set[Any], Message]]:
+        """
+        Works out who gets what for a command result.  Each player gets
+        their own view of the game and spectators share one.  Members that
+        are already in sync get a delta against the last view published to
+        them, everyone else (new joins, resyncs) gets the full snapshot.
+        """
+        if message.command in REPLIES:
+            return [({sender}, message)]
+        if message.command != "update":
+            return [(self.members(), message)]
+
+        messages = message.args.get("messages", [])
+        session = message.args.get("session")
+
+        audiences: Dict[Optional[int], Set[Any]] = {}
+        for websocket, player in self.sockets_to_players.items():
+            audiences.setdefault(_viewer(player), set()).add(websocket)
+        if self.spectators:
+            audiences[_viewer(SPECTATOR)] = set(self.spectators)
+
+        # Every seat held, socket or not, so dropped players can resume
+        viewers: Dict[Optional[int], Optional[Player]] = {
+            _viewer(player): player for player in self.game.players if player.connected
+        }
+        if self.spectators:
+            viewers[_viewer(SPECTATOR)] = SPECTATOR
+
+        previous = self.published
+        self.published = {}
+        self.published_version = self.game.version
+        frames = []
+        deltas: Dict[Optional[int], Dict[str, Any]] = {}
+        for key, viewer in viewers.items():
+            sockets = audiences.get(key, set())
+            state = self.views.state(self.game, viewer)
+            legal = self.views.legal(self.game, viewer)
+            self.published[key] = state
+
+            stale = sockets - self.synced
+            fresh = sockets - stale
+            if stale:
+                full = {"state": state, "messages": messages, "legal": legal}
+                # A joiner's resume token rides on its own copy of the snapshot
+                joined: Set[Any] = set()
+                if session is not None and sender in stale:
+                    joined = {sender}
+                    mine = Message(command="update", args={**full, "session": session})
+                    frames.append((joined, mine))
+                if stale - joined:
+                    rest = Message(command="update", args=full)
+                    frames.append((stale - joined, rest))
+                self.synced |= stale
+
+            # Worked out even with nobody to send it to, for the history
+            before = previous.get(key)
+            if before is not None:
+                changes = delta.diff(before, state)
+                if not delta.is_empty(changes) or messages:
+                    args: Dict[str, Any] = {
+                        "base": before["version"],
+                        "version": state["version"],
+                        "checksum": delta.checksum(state),
+                        "messages": messages,
+                        "legal": legal,
+                    }
+                    args.update(changes)
+                    deltas[key] = args
+                    if fresh:
+                        frames.append((fresh, Message(command="delta", args=args)))
+
+        if deltas:
+            self.history.append(deltas)
+
+        return frames
+
+    def since(
+        self, version: int, viewer: Optional[Player]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        The deltas taking viewer's client from version to the last published
+        state, None if that's further back than the history goes
+        """
+        key = _viewer(viewer)
+        if key not in self.published:
+            return None
+        if version == self.published_version:
+            return []
+
+        for i, deltas in enumerate(self.history):
+            args = deltas.get(key)
+            if args is not None and args["base"] == version:
+                # A viewer missing from an entry had nothing to catch up on
+                later = itertools.islice(self.history, i, None)
+                return [d[key] for d in later if key in d]
+
+        return None
+
+    def is_empty(self) -> bool:
+        return len(self.sockets_to_players) == 0 and not self.spectators
+
+    def listing(self) -> Dict[str, object]:
+        return {
+            "id": self.id,
+            "players": [p.name for p in self.game.players if p.connected],
+            "open_seats": 4 - self.game.player_connected_count(),
+            "started": self.game.started,
+            "spectators": len(self.spectators),
+        }
+
+
+def _viewer(player: Optional[Player]) -> Optional[int]:
+    # By identity, seats move around when new_game shuffles them
+    return None if player is None else id(player)
+
+
+@dataclass(eq=False)
+class Session:
+    """
+    A seat held for whoever shows the token, across dropped connections
+    """
+
+    token: str
+    table: Table
+    player: Player
+    websocket: Any = None
+    # time.monotonic() when the connection dropped, None while it's up
+    dropped: Optional[float] = None
+
+
+def token_table(token: str) -> str:
+    return token.rpartition(".")[0]
+
+
+def _in_progress(game: Game) -> bool:
+    return game.started and not game.ended
+
+
+class TableRegistry:
+    """
+    All tables hosted by this process, and which table each socket sits at
+    """
+
+    def __init__(self, *, bots: bool = False) -> None:
+        self.bots = bots
+        # Where in-progress games are checkpointed, None keeps them in memory only
+        self.store: Optional[TableStore] = None
+        self.tables: Dict[str, Table] = {}
+        self.sockets_to_tables: Dict[Any, Table] = {}
+        self.sessions: Dict[str, Session] = {}
+        self.sockets_to_sessions: Dict[Any, Session] = {}
+        self.resume_window = RESUME_WINDOW
+        # This worker's part of a cluster, None hosts every table
+        self.shard: Optional[Shard] = None
+        self._ids = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def __iter__(self) -> Iterator[Table]:
+        return iter(self.tables.values())
+
+    def create(self, table_id: Optional[str] = None) -> Table:
+        if table_id is None:
+            table_id = self._next_id()
+        elif table_id in self.tables:
+            raise Exception(f"Table {table_id} already exists!")
+
+        table = Table(id=table_id)
+        table.game.bots = self.bots
+        journal.start(table_id, table.game)
+        self.tables[table_id] = table
+
+        return table
+
+    def _next_id(self) -> str:
+        while True:
+            table_id = str(next(self._ids))
+            if table_id not in self.tables and self.owns(table_id):
+                return table_id
+
+    def owns(self, table_id: str) -> bool:
+        return self.shard is None or self.shard.owns(table_id)
+
+    def get(self, table_id: str) -> Optional[Table]:
+        return self.tables.get(table_id)
+
+    def for_socket(self, websocket) -> Optional[Table]:
+        return self.sockets_to_tables.get(websocket)
+
+    def seat(self, table: Table, websocket, player: Player) -> None:
+        current = self.for_socket(websocket)
+        if current is not None and current is not table:
+            self.leave(websocket)
+
+        table.seat(websocket, player)
+        self.sockets_to_tables[websocket] = table
+
+    def watch(self, table: Table, websocket) -> None:
+        current = self.for_socket(websocket)
+        if current is not None and current is not table:
+            self.leave(websocket)
+
+        table.watch(websocket)
+        self.sockets_to_tables[websocket] = table
+
+    def open_session(self, table: Table, websocket, player: Player) -> Session:
+        """
+        Seats websocket and hands it a token to resume with
+        """
+        self.seat(table, websocket, player)
+        # Carries the table id, so any worker knows where to send it
+        token = f"{table.id}.{secrets.token_urlsafe(16)}"
+        session = Session(token, table, player, websocket)
+        self.sessions[session.token] = session
+        self.sockets_to_sessions[websocket] = session
+
+        return session
+
+    def resume(self, token: str, websocket) -> Optional[Session]:
+        """
+        Puts websocket back in the seat token was issued for, bumping any
+        connection still holding it.  None if the session is gone.
+        """
+        session = self.sessions.get(token)
+        if session is None or self.tables.get(session.table.id) is not session.table:
+            return None
+
+        if session.websocket is websocket:
+            return session
+        if session.websocket is not None:
+            # Left without a drop check, the seat is about to be filled again
+            bumped = session.websocket
+            session.table.unseat(bumped)
+            self.sockets_to_tables.pop(bumped, None)
+            self.sockets_to_sessions.pop(bumped, None)
+
+        self.seat(session.table, websocket, session.player)
+        session.websocket = websocket
+        session.dropped = None
+        self.sockets_to_sessions[websocket] = session
+
+        return session
+
+    def leave(self, websocket) -> Optional[Player]:
+        """
+        Drop a socket from its table, and the table itself once nobody
+        is left at it (the default table always stays).  A game in progress
+        is kept while anyone dropped from it can still resume.
+        """
+        table = self.sockets_to_tables.pop(websocket, None)
+        session = self.sockets_to_sessions.pop(websocket, None)
+        if session is not None:
+            session.websocket = None
+            session.dropped = time.monotonic()
+        if table is None:
+            return None
+
+        player = table.unseat(websocket)
+
+        if table.is_empty() and not self._resumable(table):
+            self._drop(table)
+
+        return player
+
+    def _resumable(self, table: Table) -> bool:
+        return _in_progress(table.game) and any(
+            session.table is table for session in self.sessions.values()
+        )
+
+    def _drop(self, table: Table) -> None:
+        for token, session in list(self.sessions.items()):
+            if session.table is table:
+                del self.sessions[token]
+
+        if table.id == DEFAULT_TABLE_ID:
+            return
+
+        self.tables.pop(table.id, None)
+        journal.close(table.game)
+        # A game in progress stays in the store to come back after a restart
+        if self.store is not None and not _in_progress(table.game):
+            self.store.delete(table.id)
+
+    def sweep(self, now: Optional[float] = None) -> List[Table]:
+        """
+        Forgets sessions dropped for longer than the resume window, and the
+        empty tables that were only kept around for them.  Returns the tables
+        still standing that got a seat back, so their members can be told.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        freed = []
+        for token, session in list(self.sessions.items()):
+            dropped = session.dropped
+            if dropped is not None and now - dropped > self.resume_window:
+                del self.sessions[token]
+                table = session.table
+                if self.tables.get(table.id) is table and session.player.connected:
+                    session.player.connected = False
+                    table.game.touch()
+                    if table not in freed:
+                        freed.append(table)
+
+        for table in list(self.tables.values()):
+            if table.held_until is not None and now < table.held_until:
+                continue
+            if table.is_empty() and not self._resumable(table):
+                self._drop(table)
+
+        return [table for table in freed if self.tables.get(table.id) is table]
+
+    def checkpoint(self, table: Table) -> None:
+        """
+        Hands table's game to the store if it has moved on and sits between
+        tricks, safe to call after anything that might have changed it
+        """
+        if self.store is None or table.saved_version == table.game.version:
+            return
+
+        game = table.game
+        if not _in_progress(game):
+            if table.saved_version is not None:
+                self.store.delete(table.id)
+            table.saved_version = None
+        elif len(game.played_cards) == 0:
+            self.store.save(table.id, game)
+            table.saved_version = game.version
+
+    def restore(self, store: TableStore) -> List[Table]:
+        """
+        Brings back every table store has, with nobody seated, and keeps
+        checkpointing to it.  Each is kept for the resume window from its
+        checkpoint, so its players have time to come back.
+        """
+        self.store = store
+        restored = []
+        now = time.monotonic()
+        for table_id, game, saved_at in store.load():
+            if not self.owns(table_id):
+                continue
+            for player in game.players:
+                player.connected = False
+            game.bots = self.bots
+
+            table = self.tables.get(table_id)
+            if table is None:
+                table = self.tables[table_id] = Table(id=table_id, game=game)
+            else:
+                table.game = game
+            table.saved_version = game.version
+            # Checkpoints from before they were timed count as just saved
+            age = max(0.0, time.time() - saved_at) if saved_at else 0.0
+            table.held_until = now + max(0.0, self.resume_window - age)
+            restored.append(table)
+
+        return restored
+
+    def outbound(self, websocket, message: Message) -> List[Tuple[Set[Any], Message]]:
+        """
+        Frames to send for the result of a command sent by websocket
+        """
+        table = self.for_socket(websocket)
+        if table is None:
+            return [({websocket}, message)]
+
+        return table.outbound(message, websocket)
+
+    def recipients(self, websocket) -> Set[Any]:
+        """
+        Sockets that should see the result of a command sent by websocket
+        """
+        table = self.for_socket(websocket)
+        if table is None:
+            return {websocket}
+
+        return table.members()
+
+    def listing(self) -> List[Dict[str, object]]:
+        return [table.listing() for table in self.tables.values()]
+
+    def reset(self) -> None:
+        """
+        Drop every table but the default one, and reset that
+        """
+        self.sockets_to_tables.clear()
+        self.sessions.clear()
+        self.sockets_to_sessions.clear()
+        for table_id in list(self.tables.keys()):
+            if table_id != DEFAULT_TABLE_ID:
+                self.tables.pop(table_id)
+
+        default = self.tables.get(DEFAULT_TABLE_ID)
+        if default is not None:
+            default.game.reset()
+            default.game.bots = self.bots
+            default.sockets_to_players.clear()
+            default.players_to_sockets.clear()
+            default.spectators.clear()
+            default.synced.clear()
+            default.published = {}
+            default.published_version = None
+            default.history.clear()
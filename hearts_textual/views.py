@@ -0,0 +1,87 @@
+"""
+What each seat gets to see of a game.  Players see their own hand and
+nobody else's, spectators see no hands at all, and nobody sees the deck.
+Everything else, tricks, piles and scores, is public anyway.
+
+A table's Views encodes its game once per version and redacts that for
+each viewer as they're asked for, keeping the results until the game
+moves on.
+
+    views = Views()
+    state = views.state(game, player)
+    legal = views.legal(game, player)
+"""
+
+from typing import Any, Dict, List, Optional
+
+from hearts_textual import codec
+from hearts_textual.data import Game, Player
+
+# Viewer for sockets watching a table without a seat
+SPECTATOR = None
+
+
+def redact(state: Dict[str, Any], seat: Optional[int]) -> Dict[str, Any]:
+    """
+    An encoded state with every hand but seat's emptied, along with the
+    deck.  Shares everything it doesn't change with state.
+    """
+    players = []
+    for index, player in enumerate(state["players"]):
+        if index != seat and player["hand"]:
+            player = {**player, "hand": []}
+        players.append(player)
+
+    return {**state, "deck": [], "players": players}
+
+
+class Views:
+    """
+    Redacted states of one game, cached per version
+    """
+
+    def __init__(self) -> None:
+        self.game: Optional[Game] = None
+        self.version: Optional[int] = None
+        self.full: Dict[str, Any] = {}
+        self.on_turn: Optional[Player] = None
+        self.on_turn_legal: List[str] = []
+        # Keyed by id(player), seats move around when new_game shuffles them
+        self.states: Dict[Optional[int], Dict[str, Any]] = {}
+
+    def _refresh(self, game: Game) -> None:
+        if game is self.game and game.version == self.version:
+            return
+
+        self.game = game
+        self.version = game.version
+        self.full = codec.encode_game(game)
+        self.on_turn = game.player_to_play()
+        self.on_turn_legal = codec.encode_legal(game)
+        self.states = {}
+
+    def state(self, game: Game, viewer: Optional[Player]) -> Dict[str, Any]:
+        self._refresh(game)
+
+        key = None if viewer is None else id(viewer)
+        state = self.states.get(key)
+        if state is None:
+            seat = None
+            if viewer is not None:
+                seat = next(
+                    i for i, player in enumerate(game.players) if player is viewer
+                )
+            state = self.states[key] = redact(self.full, seat)
+
+        return state
+
+    def legal(self, game: Game, viewer: Optional[Player]) -> List[str]:
+        """
+        The on turn player's legal cards, only for them to see
+        """
+        self._refresh(game)
+
+        if viewer is None or viewer is not self.on_turn:
+            return []
+
+        return self.on_turn_legal
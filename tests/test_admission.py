@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+import websockets
+
+from hearts_textual import admission, binary, metrics
+from hearts_textual.admission import ADMISSION, Admission, TokenBucket
+from hearts_textual.commands import run_command, CLIENT_BUSY, TABLES
+from hearts_textual.server import handler
+
+from tests.fixtures import websocket, game_reset, base_template
+
+help_str = json.dumps({"command": "help", "args": {}})
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucket:
+    def test_burst_then_rate(self):
+        clock = Clock()
+        bucket = TokenBucket(rate=2.0, burst=3, clock=clock)
+
+        assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert bucket.take() == 0.5
+
+        clock.now = 0.5
+        assert bucket.take() == 0.0
+        assert bucket.take() == 0.5
+
+    def test_refill_stops_at_burst(self):
+        clock = Clock()
+        bucket = TokenBucket(rate=1.0, burst=2, clock=clock)
+        clock.now = 100.0
+
+        assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 1.0]
+
+
+class TestAdmission:
+    def test_zero_is_no_limit(self):
+        limits = Admission(rate=0)
+
+        assert limits.bucket() is None
+        assert not limits.connections_full(10**6)
+        assert not limits.tables_full(10**6)
+
+    def test_caps(self):
+        limits = Admission(max_connections=2, max_tables=1)
+
+        assert not limits.connections_full(1)
+        assert limits.connections_full(2)
+        assert limits.tables_full(1)
+
+
+class TestTableCap:
+    def test_create_table_turned_away(self, websocket, monkeypatch):
+        metrics.REGISTRY.clear()
+        monkeypatch.setattr(ADMISSION, "max_tables", len(TABLES))
+        create_str = base_template.substitute(
+            command="create_table", args='{"name": "Homer"}'
+        )
+
+        message = run_command(create_str, websocket())
+
+        assert message.command == "busy"
+        assert message.args == {"reason": "tables", "retry_after": 5.0}
+        assert len(TABLES) == 1
+        assert metrics.SHED.value("tables") == 1
+
+    def test_client_remembers_wait(self, websocket):
+        client = websocket()
+        frame = json.dumps(
+            {"command": "busy", "args": {"reason": "rate", "retry_after": 0.25}}
+        )
+
+        run_command(frame, client)
+
+        assert CLIENT_BUSY[client] == 0.25
+
+
+class TestServer:
+    def test_rate_limited(self, monkeypatch):
+        metrics.REGISTRY.clear()
+        monkeypatch.setattr(ADMISSION, "rate", 0.001)
+        monkeypatch.setattr(ADMISSION, "burst", 2)
+
+        async def run():
+            async with websockets.serve(handler, "localhost", 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                async with websockets.connect(f"ws://localhost:{port}") as client:
+                    for _ in range(5):
+                        await client.send(help_str)
+                    received = [await client.recv() for _ in range(3)]
+                    try:
+                        extra = await asyncio.wait_for(client.recv(), 0.2)
+                    except asyncio.TimeoutError:
+                        extra = None
+
+            return [binary.decode_frame(frame) for frame in received], extra
+
+        received, extra = asyncio.run(run())
+
+        assert [m.command for m in received] == ["echo", "echo", "busy"]
+        assert received[2].args["reason"] == "rate"
+        assert extra is None
+        assert metrics.SHED.value("rate") == 3
+
+    def test_connection_cap(self, monkeypatch):
+        metrics.REGISTRY.clear()
+        monkeypatch.setattr(ADMISSION, "max_connections", 1)
+
+        async def run():
+            async with websockets.serve(handler, "localhost", 0) as server:
+                uri = f"ws://localhost:{server.sockets[0].getsockname()[1]}"
+                async with websockets.connect(uri) as first:
+                    await first.send(help_str)
+                    await first.recv()
+                    async with websockets.connect(uri) as second:
+                        turned_away = binary.decode_frame(await second.recv())
+                        await second.wait_closed()
+                        code = second.close_code
+                    await first.send(help_str)
+                    still_served = binary.decode_frame(await first.recv())
+
+            return turned_away, code, still_served
+
+        turned_away, code, still_served = asyncio.run(run())
+
+        assert turned_away.command == "busy"
+        assert turned_away.args["reason"] == "connections"
+        assert code == admission.BUSY_CLOSE_CODE
+        assert still_served.command == "echo"
+        assert metrics.SHED.value("connections") == 1
@@ -0,0 +1,90 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from hearts_textual.batch import (
+    BatchRound,
+    highest_policy,
+    lowest_policy,
+    play_round,
+    random_policy,
+    shuffled_decks,
+)
+from hearts_textual.data import CARDS, CardList, Game
+
+
+def engine_round(deck, pick_lowest):
+    """
+    Plays one deal through Game.play_card, each seat playing the lowest (or
+    highest) card the engine accepts.  Returns the round scores and plays.
+    """
+    game = Game().reset().new_game().next_round()
+    for player in game.players:
+        player.hand = CardList()
+    game.deck = CardList(CARDS[ordinal] for ordinal in deck)
+    game.deal()
+    game.next_turn()
+
+    plays = []
+    for _ in range(52):
+        player = game._current_player()
+        cards = list(player.hand) if pick_lowest else list(reversed(player.hand))
+        for card in cards:
+            if type(game.play_card(card, player)) is Game:
+                plays.append(card.ordinal)
+                break
+        else:
+            raise Exception(f"{player.name} has no legal card")
+
+    return [player.scores[-1] for player in game.players], plays
+
+
+class TestBatchRound:
+    def test_deal(self):
+        decks = shuffled_decks(8, np.random.default_rng(0))
+        state = BatchRound.deal(decks)
+
+        assert (state.hands.sum(axis=2) == 13).all()
+        assert (state.hands.sum(axis=1) == 1).all()
+        assert (state.hands[np.arange(8), state.leader, 0]).all()
+
+    def test_scores_add_up(self):
+        rng = np.random.default_rng(1)
+        scores = play_round(shuffled_decks(256, rng), random_policy, rng)
+        totals = scores.sum(axis=1)
+
+        assert ((totals == 26) | (totals == 78)).all()
+
+    def test_random_policy_is_legal(self):
+        rng = np.random.default_rng(2)
+        state = BatchRound.deal(shuffled_decks(128, rng))
+
+        while not state.finished:
+            legal = state.legal()
+            assert legal.any(axis=1).all()
+            cards = random_policy(legal, rng)
+            assert legal[np.arange(128), cards].all()
+            state.play(cards)
+
+
+@pytest.mark.parametrize(
+    "policy, pick_lowest", [(lowest_policy, True), (highest_policy, False)]
+)
+def test_agrees_with_engine(policy, pick_lowest):
+    rng = np.random.default_rng(3)
+    decks = shuffled_decks(40, rng)
+
+    state = BatchRound.deal(decks)
+    batch_plays = []
+    while not state.finished:
+        cards = policy(state.legal(), rng)
+        batch_plays.append(cards)
+        state.play(cards)
+    batch_plays = np.stack(batch_plays, axis=1)
+    batch_scores = state.scores()
+
+    for i, deck in enumerate(decks):
+        scores, plays = engine_round(deck, pick_lowest)
+
+        assert plays == batch_plays[i].tolist()
+        assert scores == batch_scores[i].tolist()
@@ -0,0 +1,25 @@
+from benchmarks.run import compare, run
+
+
+class TestBenchmarks:
+    def test_engine_runs(self):
+        results = run(only="engine", repeat=1, scale=0.01)
+
+        assert set(results) == {
+            "engine.deal",
+            "engine.shuffle",
+            "engine.play_card",
+            "engine.hand_winner",
+            "engine.score_round",
+            "engine.full_round",
+        }
+        assert all(value > 0 for value in results.values())
+
+    def test_compare_flags_regressions(self, capsys):
+        regressions = compare(
+            {"fast": 1.0, "slow": 3.0, "new": 1.0},
+            {"fast": 1.0, "slow": 2.0},
+            threshold=1.25,
+        )
+
+        assert regressions == ["slow"]
@@ -0,0 +1,166 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+
+from hearts_textual import binary, codec, delta, views
+from hearts_textual.data import Game, Message
+from hearts_textual.server import handler
+
+from tests.fixtures import game_reset
+
+
+@pytest.fixture
+def game():
+    game = Game().reset().new_game().next_round().next_turn()
+    for _ in range(6):
+        player = game._current_player()
+        for card in list(player.hand):
+            if type(game.play_card(card, player)) is Game:
+                break
+    game.players[1].scores = [3, 26, 0]
+
+    return game
+
+
+class FakeSocket:
+    def __init__(self, subprotocol):
+        self.subprotocol = subprotocol
+
+
+class TestBinary:
+    def test_update_roundtrip(self, game):
+        message = Message(command="update", args={"state": game, "messages": ["hi"]})
+        decoded = binary.decode_message(binary.encode_message(message))
+
+        assert decoded.command == "update"
+        assert decoded.args["state"] == codec.encode_game(game)
+        assert decoded.args["messages"] == ["hi"]
+
+    def test_update_carries_legal(self, game):
+        legal = codec.encode_legal(game)
+        message = Message(
+            command="update", args={"state": game, "messages": [], "legal": legal}
+        )
+        decoded = binary.decode_message(binary.encode_message(message))
+
+        assert legal
+        assert decoded.args["legal"] == legal
+
+    def test_update_from_state_dict(self, game):
+        state = codec.encode_game(game)
+        message = Message(command="update", args={"state": state, "messages": []})
+        frame = binary.encode_message(message)
+
+        assert binary.decode_message(frame).args["state"] == state
+        assert len(frame) < len(codec.encode_message(message)) / 4
+
+    def test_other_messages(self):
+        message = Message(command="echo", args={"message": "honk"})
+        decoded = binary.decode_message(binary.encode_message(message))
+
+        assert decoded == message
+
+    def test_truncated_frame(self, game):
+        message = Message(command="update", args={"state": game, "messages": []})
+
+        with pytest.raises(binary.BinaryFrameError):
+            binary.decode_message(binary.encode_message(message)[:20])
+
+    def test_decode_frame_dispatch(self):
+        message = Message(command="echo", args={"message": "honk"})
+
+        assert binary.decode_frame(codec.encode_message(message)) == message
+        assert binary.decode_frame(binary.encode_message(message)) == message
+
+    def test_delta_roundtrip(self, game):
+        before = views.redact(codec.encode_game(game), 0)
+        player = game._current_player()
+        for card in list(player.hand):
+            if type(game.play_card(card, player)) is Game:
+                break
+        game.players[2].scores.append(-5)
+        game.summary = {"moon": "Goose", "note": [1, "x"]}
+        after = views.redact(codec.encode_game(game), 0)
+        args = {
+            "base": before["version"],
+            "version": after["version"],
+            "checksum": delta.checksum(after),
+            "messages": ["toaster('hi')"],
+            "legal": ["2C", "QS"],
+            **delta.diff(before, after),
+        }
+        message = Message(command="delta", args=args)
+
+        frame = binary.encode_message(message)
+        decoded = binary.decode_message(frame)
+
+        assert decoded == message
+        assert delta.apply(before, decoded.args) == after
+        assert len(frame) < len(codec.encode_message(message)) / 2
+
+    def test_replay_roundtrip(self):
+        deltas = [
+            {
+                "base": version,
+                "version": version + 1,
+                "checksum": 2**32 - 1,
+                "messages": [],
+                "legal": None,
+                "changes": {"turn": version, "hearts_broken": True, "play": None},
+                "appends": {"played_cards": [{"suit": "S", "value": "Q"}]},
+                "removes": {"players.0.hand": [0, 12]},
+            }
+            for version in range(3)
+        ]
+        message = Message(command="replay", args={"deltas": deltas})
+
+        assert binary.decode_message(binary.encode_message(message)) == message
+
+    def test_encode_once_per_protocol(self):
+        sockets = [
+            FakeSocket(binary.SUBPROTOCOL_BINARY),
+            FakeSocket(binary.SUBPROTOCOL_JSON),
+            FakeSocket(None),
+            FakeSocket(binary.SUBPROTOCOL_BINARY),
+        ]
+        frames = binary.encode_for(sockets, Message(command="echo", args={}))
+
+        assert len(frames) == 2
+        assert {len(recipients) for recipients, _ in frames} == {2}
+
+
+class TestMixedTable:
+    def test_json_and_binary_clients(self):
+        async def run():
+            async with websockets.serve(
+                handler, "localhost", 0, subprotocols=binary.SUBPROTOCOLS
+            ) as server:
+                port = server.sockets[0].getsockname()[1]
+                uri = f"ws://localhost:{port}"
+                async with websockets.connect(
+                    uri, subprotocols=[binary.SUBPROTOCOL_JSON]
+                ) as json_client, websockets.connect(
+                    uri, subprotocols=binary.SUBPROTOCOLS
+                ) as binary_client:
+                    join = {"command": "join", "args": {"name": "Homer"}}
+                    await json_client.send(json.dumps(join))
+                    first = await json_client.recv()
+                    join["args"]["name"] = "Goose"
+                    await binary_client.send(
+                        binary.encode_message(Message(**join))  # type: ignore[arg-type]
+                    )
+                    return (
+                        binary_client.subprotocol,
+                        await binary_client.recv(),
+                        await json_client.recv(),
+                    )
+
+        subprotocol, binary_frame, json_frame = asyncio.run(run())
+
+        assert subprotocol == binary.SUBPROTOCOL_BINARY
+        assert type(binary_frame) is bytes
+        assert binary.decode_frame(binary_frame).command == "update"
+        assert type(json_frame) is str
+        assert codec.decode_message(json_frame).command == "delta"
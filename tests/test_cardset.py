@@ -0,0 +1,146 @@
+import random
+
+from hearts_textual import cardset
+from hearts_textual.data import (
+    Card,
+    CardList,
+    DECK,
+    Game,
+    Player,
+    Suits,
+    cards_of,
+    QUEEN_OF_SPADES,
+    TWO_OF_CLUBS,
+)
+
+import pytest
+
+
+class TestCardSet:
+    def test_deck_indexes(self):
+        for i, card in enumerate(DECK):
+            assert card.ordinal == i
+
+    def test_suit_masks(self):
+        mask = cardset.FULL
+
+        for i in range(4):
+            assert cardset.suit_count(mask, i) == 13
+
+        assert cardset.count(mask) == 52
+
+    def test_indexes(self):
+        mask = cardset.bit(3) | cardset.bit(40) | cardset.bit(17)
+
+        assert list(cardset.indexes(mask)) == [3, 17, 40]
+        assert cardset.lowest(mask) == 3
+        assert cardset.highest(mask) == 40
+
+    def test_cards_of(self):
+        cards = [Card.parse(c) for c in ["QS", "2C", "AH"]]
+        mask = CardList(cards).mask
+
+        assert cards_of(mask) == sorted(cards)
+
+
+class TestCardList:
+    def test_mask_follows_list(self):
+        hand = CardList()
+        hand.append(Card.parse("2C"))
+        hand.extend([Card.parse("QS"), Card.parse("3H")])
+
+        assert Card.parse("QS") in hand
+        assert hand.suit_count(Suits.HEARTS) == 1
+
+        hand.remove(Card.parse("QS"))
+        assert Card.parse("QS") not in hand
+        assert not hand.has_suit(Suits.SPADES)
+
+        hand.pop()
+        del hand[0]
+        assert hand.mask == 0
+        assert len(hand) == 0
+
+    def test_mask_survives_shuffles_and_swaps(self):
+        rng = random.Random(7)
+        deck = CardList(DECK)
+        for _ in range(20):
+            rng.shuffle(deck)
+            assert deck.mask == cardset.FULL
+
+        hand = CardList(DECK[:5])
+        hand[0], hand[4] = hand[4], hand[0]
+        hand[1] = DECK[10]
+        hand[2:4] = [DECK[20]]
+        del hand[-1]
+        assert hand.mask == CardList(list(hand)).mask
+
+    def test_player_assignment_converts(self):
+        player = Player(name="Homer", hand=[Card.parse("2C")])
+        player.pile = [QUEEN_OF_SPADES, Card.parse("4H")]
+
+        assert type(player.hand) is CardList
+        assert player.has_suit(Suits.CLUBS)
+        assert player.score_round() == 14
+
+
+class TestOwnerIndex:
+    @pytest.fixture(autouse=True)
+    def dealt(self):
+        self.game = Game().reset().new_game().next_round().next_turn()
+
+    def test_deal_indexes_owners(self):
+        for card in DECK:
+            owner = self.game.has_card(card)
+
+            assert card in owner.hand
+
+    def test_play_clears_owner(self):
+        lead = self.game.get_lead_player()
+        self.game.play_card(TWO_OF_CLUBS, lead)
+
+        assert self.game.has_card(TWO_OF_CLUBS) is None
+
+    def test_moved_behind_our_back(self):
+        p1, p2 = self.game.players[0], self.game.players[1]
+        card = p1.hand[-1]
+        p1.hand.remove(card)
+        p2.hand.append(card)
+
+        assert self.game.has_card(card) is p2
+
+
+class TestInternedCards:
+    def test_shared_instances(self):
+        card = Card.parse("QS")
+
+        assert card is QUEEN_OF_SPADES
+        assert Card.from_dict({"suit": "S", "value": "Q"}) is card
+        assert Card(suit=Suits.SPADES, value="Q") is card
+        assert Card.from_dict("QS") is card
+        assert DECK[card.ordinal] is card
+
+    def test_wire_format_unchanged(self):
+        assert QUEEN_OF_SPADES.to_dict() == {"suit": "S", "value": "Q"}
+        assert Card.from_json(QUEEN_OF_SPADES.to_json()) is QUEEN_OF_SPADES
+
+    def test_ordering_and_hashing(self):
+        cards = [Card.parse(c) for c in ["AH", "2C", "QS", "TD"]]
+
+        assert sorted(cards) == [Card.parse(c) for c in ["2C", "TD", "QS", "AH"]]
+        assert len({Card.parse("2C"), TWO_OF_CLUBS}) == 1
+
+    def test_copies_are_shared(self):
+        import copy
+        import pickle
+
+        assert copy.deepcopy(QUEEN_OF_SPADES) is QUEEN_OF_SPADES
+        assert pickle.loads(pickle.dumps(QUEEN_OF_SPADES)) is QUEEN_OF_SPADES
+
+    def test_display(self):
+        assert str(QUEEN_OF_SPADES) == "Q♠"
+        assert repr(QUEEN_OF_SPADES) == "QS"
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            Card.parse("1X")
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+
+import websockets
+
+from hearts_textual import cluster, server
+from hearts_textual.cluster import Shard
+from hearts_textual.commands import (
+    run_command,
+    CLIENT_REDIRECTS,
+    DEFAULT_TABLE_ID,
+    TABLES,
+)
+from hearts_textual.tables import token_table
+
+from tests.fixtures import join, websocket, game_reset, base_template
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+async def start_game(uri):
+    """
+    Sits down at a worker's default table and starts a bot game, once the
+    worker is up
+    """
+    for _ in range(200):
+        try:
+            async with websockets.connect(uri) as client:
+                await client.send(json.dumps(join_frame))
+                await client.recv()
+                await client.send(json.dumps(start_frame))
+                return json.loads(await client.recv())["command"]
+        except OSError:
+            await asyncio.sleep(0.1)
+
+
+join_frame = {"command": "join", "args": {"name": "Homer"}}
+steps = [{"command": command} for command in ["new_game", "next_round", "next_turn"]]
+start_frame = {"command": "batch", "args": {"commands": steps}}
+
+
+def not_owning(table_id):
+    """
+    A shard of a two worker cluster that doesn't own table_id
+    """
+    index = 1 - cluster.owner(table_id, 2)
+
+    return Shard(index, 2, 8765)
+
+
+class TestShard:
+    def test_every_table_has_one_owner(self):
+        shards = [Shard(i, 4, 8765) for i in range(4)]
+
+        for i in range(100):
+            owners = [shard for shard in shards if shard.owns(str(i))]
+            assert len(owners) == 1
+            assert owners[0].own_port == shards[0].port_of(str(i))
+
+    def test_redirected(self):
+        assert cluster.redirected("ws://localhost:8765", 8767) == (
+            "ws://localhost:8767"
+        )
+        assert cluster.redirected("ws://example.com:8765/x", 9000) == (
+            "ws://example.com:9000/x"
+        )
+
+
+class TestRunWorkers:
+    def test_sigterm_stops_workers(self, tmp_path):
+        before = signal.getsignal(signal.SIGTERM)
+        port = free_port()
+        path = str(tmp_path / "tables.db")
+        # Commits that would never come around on their own before the kill
+        options = server.Options(
+            bots=True,
+            port=port,
+            metrics_port=0,
+            log_level="off",
+            store=path,
+            store_interval=60.0,
+        )
+        started = []
+
+        def play_then_stop():
+            try:
+                uri = f"ws://localhost:{cluster.worker_port(port, 0)}"
+                started.append(asyncio.run(start_game(uri)))
+            finally:
+                os.kill(os.getpid(), signal.SIGTERM)
+
+        client = threading.Thread(target=play_then_stop)
+        client.start()
+        cluster.run_workers(server.run, 1, port, options)
+        client.join()
+
+        assert started == ["delta"]
+        assert signal.getsignal(signal.SIGTERM) is before
+        # The worker closed its store on the way out
+        with sqlite3.connect(path) as db:
+            (count,) = db.execute("SELECT count(*) FROM tables").fetchone()
+        assert count == 1
+
+
+class TestRegistry:
+    def test_creates_only_owned_tables(self, monkeypatch):
+        shard = Shard(0, 2, 8765)
+        monkeypatch.setattr(TABLES, "shard", shard)
+
+        for _ in range(5):
+            assert shard.owns(TABLES.create().id)
+
+    def test_token_names_table(self, join, websocket):
+        message = run_command(join("Homer"), websocket())
+
+        assert token_table(message.args["session"]) == DEFAULT_TABLE_ID
+
+
+class TestRedirects:
+    def test_join_elsewhere(self, join, websocket, monkeypatch):
+        shard = not_owning(DEFAULT_TABLE_ID)
+        monkeypatch.setattr(TABLES, "shard", shard)
+
+        message = run_command(join("Homer"), websocket())
+
+        assert message.command == "redirect"
+        assert message.args == {
+            "port": shard.port_of(DEFAULT_TABLE_ID),
+            "command": "join",
+            "args": {"name": "Homer", "table": DEFAULT_TABLE_ID},
+        }
+        assert not TABLES.get(DEFAULT_TABLE_ID).players_to_sockets
+
+    def test_resume_follows_token(self, join, websocket, monkeypatch):
+        token = run_command(join("Homer"), websocket()).args["session"]
+        monkeypatch.setattr(TABLES, "shard", not_owning(DEFAULT_TABLE_ID))
+        args = json.dumps({"token": token, "version": 3})
+
+        message = run_command(
+            base_template.substitute(command="resume", args=args), websocket()
+        )
+
+        assert message.command == "redirect"
+        assert message.args["args"]["token"] == token
+        assert message.args["args"]["version"] == 3
+
+    def test_owner_seats(self, join, websocket, monkeypatch):
+        owner = cluster.owner(DEFAULT_TABLE_ID, 2)
+        monkeypatch.setattr(TABLES, "shard", Shard(owner, 2, 8765))
+
+        assert run_command(join("Homer"), websocket()).command == "update"
+
+    def test_client_remembers_redirect(self, join, websocket, monkeypatch):
+        monkeypatch.setattr(TABLES, "shard", not_owning(DEFAULT_TABLE_ID))
+        server, client = websocket(), websocket()
+
+        message = run_command(join("Homer"), server)
+        run_command(message.to_json(), client)
+
+        assert CLIENT_REDIRECTS[client]["command"] == "join"
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from hearts_textual import codec
+from hearts_textual.data import Card, Game, Message, QUEEN_OF_SPADES
+
+
+@pytest.fixture
+def game():
+    game = Game().reset().new_game().next_round().next_turn()
+    for _ in range(5):
+        player = game._current_player()
+        for card in list(player.hand):
+            if type(game.play_card(card, player)) is Game:
+                break
+
+    return game
+
+
+class TestCodec:
+    def test_game_matches_dataclasses_json(self, game):
+        assert codec.encode_game(game) == game.to_dict(encode_json=True)
+
+    def test_message_matches_dataclasses_json(self, game):
+        message = Message(command="update", args={"state": game, "messages": ["x"]})
+
+        assert json.loads(codec.encode_message(message)) == json.loads(
+            message.to_json()
+        )
+
+    def test_decode_legacy_frame(self, game):
+        message = Message(command="update", args={"state": game, "messages": []})
+        decoded = codec.decode_message(message.to_json())
+
+        assert decoded.command == "update"
+        assert decoded.args["state"] == json.loads(message.to_json())["args"]["state"]
+
+    def test_game_roundtrip(self, game):
+        state = codec.encode_game(game)
+        decoded = codec.decode_game(json.loads(json.dumps(state)))
+
+        assert codec.encode_game(decoded) == state
+        assert decoded.has_card(decoded.players[0].hand[0]) is decoded.players[0]
+
+    def test_compact_roundtrip(self, game):
+        state = codec.encode_game(game, compact=True)
+        decoded = codec.decode_game(json.loads(json.dumps(state)))
+
+        assert state["players"][0]["hand"][0] == repr(game.players[0].hand[0])
+        assert codec.encode_game(decoded, compact=True) == state
+        assert [Card.from_dict(card) for card in decoded.summary["last_hand"]] == (
+            game.summary["last_hand"]
+        )
+
+    def test_card_forms(self):
+        assert codec.encode_card(QUEEN_OF_SPADES) == {"suit": "S", "value": "Q"}
+        assert codec.encode_card(QUEEN_OF_SPADES, compact=True) == "QS"
+        assert codec.decode_card("QS") is QUEEN_OF_SPADES
+        assert codec.decode_card(None) is None
@@ -1,3 +1,4 @@
+import json
 from typing import List, Optional
 
 from rich import print_json
@@ -6,10 +7,18 @@ import pytest
 
 from hearts_textual.commands import (
     run_command,
+    TABLES,
     SOCKETS_TO_PLAYERS,
     PLAYERS_TO_SOCKETS,
 )
-from hearts_textual.data import Card, Suits, Values, Game, TWO_OF_CLUBS
+from hearts_textual.data import (
+    Card,
+    Suits,
+    Values,
+    Game,
+    QUEEN_OF_SPADES,
+    TWO_OF_CLUBS,
+)
 
 from tests.fixtures import (
     hands,
@@ -324,3 +333,79 @@ class TestGameLoop:
         assert game.ended
         assert scores == [3, 16, 2, 5]
         assert total_scores == [21, 112, 14, 35]
+
+
+def batch_str(*commands, card=None):
+    steps = [{"command": command, "args": {}} for command in commands]
+    if card is not None:
+        steps.append({"command": "play_card", "args": {"card": card.to_dict()}})
+    return json.dumps({"command": "batch", "args": {"commands": steps}})
+
+
+class TestBatch:
+    def test_starts_game_in_one_update(self, four_players_and_sockets):
+        [w1, w2, w3, w4] = four_players_and_sockets
+        game = TABLES.for_socket(w1).game
+        version = game.version
+
+        message = run_command(batch_str("new_game", "next_round", "next_turn"), w1)
+        frames = TABLES.outbound(w1, message)
+
+        assert message.command == "update"
+        assert message.args["messages"] == [
+            "toaster('New game started!')",
+            "new_game()",
+        ]
+        assert game.round == 1 and game.turn == 1
+        assert game.version == version + 3
+        assert sorted(len(to) for to, _ in frames) == [1, 1, 1, 1]
+
+    def test_failure_rolls_back(self, four_players_and_sockets):
+        [w1, w2, w3, w4] = four_players_and_sockets
+        table = TABLES.for_socket(w1)
+        game = table.game
+        before = game.to_dict(encode_json=True)
+        players = list(game.players)
+
+        # Nobody can lead the queen of spades
+        message = run_command(
+            batch_str("new_game", "next_round", "next_turn", card=QUEEN_OF_SPADES), w1
+        )
+
+        assert message.command == "echo"
+        assert game.to_dict(encode_json=True) == before
+        assert game.players == players
+        assert all(a is b for a, b in zip(game.players, players))
+        assert table.sockets_to_players[w1] in game.players
+
+        message = run_command(batch_str("new_game", "next_round", "next_turn"), w1)
+        assert message.command == "update"
+        assert game.get_lead_player().hand.mask >> TWO_OF_CLUBS.ordinal & 1
+
+    def test_only_game_commands(self, four_players_and_sockets):
+        [w1, w2, w3, w4] = four_players_and_sockets
+
+        message = run_command(batch_str("new_game", "join"), w1)
+
+        assert message.args["message"] == "Command join can't be batched!"
+        assert not TABLES.for_socket(w1).game.started
+
+    def test_bad_entries_run_nothing(self, four_players_and_sockets):
+        [w1, w2, w3, w4] = four_players_and_sockets
+        game = TABLES.for_socket(w1).game
+        version = game.version
+
+        for entry in [
+            {"args": {}},
+            {"command": ["new_game"]},
+            {"command": "play_card", "args": ["QS"]},
+        ]:
+            steps = [{"command": "new_game", "args": {}}, entry]
+            message = run_command(
+                json.dumps({"command": "batch", "args": {"commands": steps}}), w1
+            )
+            assert message.command == "echo"
+            assert message.args["message"].startswith("Bad batch entry, ")
+
+        assert game.version == version
+        assert not game.started
@@ -0,0 +1,144 @@
+import json
+
+import pytest
+
+from hearts_textual import delta, views
+from hearts_textual.commands import (
+    run_command,
+    TABLES,
+    CLIENT_STATES,
+    SOCKETS_TO_PLAYERS,
+)
+from hearts_textual.data import Game
+
+from tests.fixtures import (
+    run_helper,
+    join,
+    play_card,
+    websocket,
+    game_reset,
+    four_players_and_sockets,
+    new_game_str,
+    next_round_str,
+    next_turn_str,
+    base_template,
+)
+
+
+resync_str = base_template.substitute(command="resync", args="{}")
+
+
+class TestDiff:
+    def test_roundtrip(self):
+        game = Game().reset().new_game().next_round().next_turn()
+        old = game.to_dict(encode_json=True)
+        game.play_card(game.get_lead_player().hand[0], game.get_lead_player())
+        new = game.to_dict(encode_json=True)
+
+        changes = delta.diff(old, new)
+        patched = delta.apply(json.loads(json.dumps(old)), changes)
+
+        assert patched == new
+        assert delta.checksum(patched) == delta.checksum(new)
+        assert changes["removes"] == {f"players.{game.lead_player}.hand": [0]}
+        assert changes["appends"] == {"played_cards": [new["played_cards"][0]]}
+
+    def test_no_change(self):
+        state = Game().reset().to_dict(encode_json=True)
+
+        assert delta.is_empty(delta.diff(state, state))
+
+    def test_checksum_detects_hand_change(self):
+        state = Game().reset().new_game().next_round().to_dict(encode_json=True)
+        other = json.loads(json.dumps(state))
+        other["players"][0]["hand"].pop()
+
+        assert delta.checksum(state) != delta.checksum(other)
+
+
+class TestOutbound:
+    def deliver(self, sender, result, clients):
+        """
+        Run every outbound frame through the client side commands
+        """
+        received = {}
+        for recipients, frame in TABLES.outbound(sender, result):
+            for socket in recipients:
+                received[socket] = frame.command
+                run_command(frame.to_json(), clients[socket])
+
+        return received
+
+    def test_join_gets_snapshot_others_get_delta(self, join, websocket):
+        w1 = websocket()
+        w2 = websocket()
+        clients = {w1: websocket(), w2: websocket()}
+
+        received = self.deliver(w1, run_command(join("Homer"), w1), clients)
+        assert received == {w1: "update"}
+
+        received = self.deliver(w2, run_command(join("Goose"), w2), clients)
+        assert received == {w1: "delta", w2: "update"}
+        assert CLIENT_STATES[clients[w1]] == CLIENT_STATES[clients[w2]]
+
+    def test_play_sends_deltas(self, four_players_and_sockets, play_card, websocket):
+        sockets = four_players_and_sockets
+        clients = {w: websocket() for w in sockets}
+        for w in sockets:
+            self.deliver(w, run_command(resync_str, w), clients)
+
+        for command in [new_game_str, next_round_str, next_turn_str]:
+            received = self.deliver(
+                sockets[0], run_command(command, sockets[0]), clients
+            )
+            assert set(received.values()) == {"delta"}
+
+        game = TABLES.for_socket(sockets[0]).game
+        lead = game.get_lead_player()
+        lead_socket = TABLES.for_socket(sockets[0]).players_to_sockets[lead]
+        received = self.deliver(
+            lead_socket, run_command(play_card(lead.hand[0]), lead_socket), clients
+        )
+
+        server_state = game.to_dict(encode_json=True)
+        assert set(received.values()) == {"delta"}
+        for w, client in clients.items():
+            seat = game.players.index(TABLES.for_socket(w).sockets_to_players[w])
+            assert CLIENT_STATES[client] == views.redact(server_state, seat)
+
+    def test_updates_carry_legal_moves(
+        self, mocker, four_players_and_sockets, websocket
+    ):
+        sockets = four_players_and_sockets
+        for command in [new_game_str, next_round_str]:
+            run_command(command, sockets[0])
+
+        result = run_command(next_turn_str, sockets[0])
+        table = TABLES.for_socket(sockets[0])
+        lead_socket = table.players_to_sockets[table.game.get_lead_player()]
+        frames = TABLES.outbound(sockets[0], result)
+        (frame,) = [frame for to, frame in frames if lead_socket in to]
+        assert frame.args["legal"] == ["2C"]
+        assert all(f.args["legal"] == [] for _, f in frames if f is not frame)
+
+        find = mocker.spy(Game, "_find_legal")
+        messages, game = run_command(frame.to_json(), websocket())
+        lead = game.get_lead_player()
+
+        # Taken from the frame rather than worked out again
+        assert [repr(card) for card in game.legal_moves(lead)] == ["2C"]
+        assert find.call_count == 0
+
+    def test_stale_base_asks_for_resync(self, join, websocket):
+        w = websocket()
+        client = websocket()
+        self.deliver(w, run_command(join("Homer"), w), {w: client})
+        CLIENT_STATES[client]["version"] = -1
+
+        result = run_command(join("Goose"), websocket())
+        frames = TABLES.outbound(w, result)
+        (_, frame) = [f for f in frames if f[1].command == "delta"][0]
+        messages, game = run_command(frame.to_json(), client)
+
+        assert messages == ["resync()"]
+        assert game is None
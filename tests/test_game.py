@@ -1,4 +1,4 @@
-from hearts_textual.data import Game
+from hearts_textual.data import CARDS, TWO_OF_CLUBS, Game, Suits
 
 import pytest
 
@@ -17,3 +17,60 @@ class TestGame:
         assert game.lead_player is None
         assert len(game.players) == 4
         assert len(game.played_cards) == 0
+
+
+def started_game() -> Game:
+    return Game().reset().new_game().next_round().next_turn()
+
+
+class TestLegalMoves:
+    def test_first_lead_is_two_of_clubs(self):
+        game = started_game()
+        lead = game.get_lead_player()
+
+        assert list(game.legal_moves(lead)) == [TWO_OF_CLUBS]
+        for player in game.players:
+            if player is not lead:
+                assert list(game.legal_moves(player)) == []
+
+    def test_cached_per_version(self, mocker):
+        game = started_game()
+        lead = game.get_lead_player()
+        find = mocker.spy(game, "_find_legal")
+
+        game.legal_mask(lead)
+        game.legal_mask(lead)
+        assert find.call_count == 1
+
+        game.play_card(TWO_OF_CLUBS, lead)
+        game.legal_mask(game._current_player())
+        assert find.call_count == 2
+
+    def test_play_card_agrees(self):
+        game = started_game()
+        while game.round == 1:
+            player = game._current_player()
+            legal = game.legal_mask(player)
+            for card in CARDS:
+                if not legal >> card.ordinal & 1:
+                    assert type(game.play_card(card, player)) is not Game
+            assert type(game.play_card(next(game.legal_moves(player)), player)) is Game
+
+    def test_illegal_play_messages(self):
+        game = started_game()
+        lead = game.get_lead_player()
+        other = next(card for card in lead.hand if card != TWO_OF_CLUBS)
+
+        assert "must be 2♣" in game.play_card(other, lead)
+
+        game.play_card(TWO_OF_CLUBS, lead)
+        follower = game._current_player()
+        missing = next(
+            card
+            for card in CARDS
+            if card.suit == Suits.CLUBS and card not in follower.hand
+        )
+        assert "not in Player" in game.play_card(missing, follower)
+        if follower.has_suit(Suits.CLUBS):
+            off_suit = next(card for card in follower.hand if card.suit != Suits.CLUBS)
+            assert "must play a ♣" in game.play_card(off_suit, follower)
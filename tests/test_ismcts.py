@@ -0,0 +1,212 @@
+import asyncio
+import copy
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from hearts_textual import cardset
+from hearts_textual.data import (
+    CARDS,
+    QUEEN_OF_SPADES,
+    TWO_OF_CLUBS,
+    Card,
+    CardList,
+    Game,
+    suit_rank,
+)
+from hearts_textual.ismcts import (
+    Searcher,
+    _Round,
+    determinize,
+    evaluate,
+    observe,
+    search,
+)
+
+
+def bot_game() -> Game:
+    game = Game().reset()
+    game.bots = True
+
+    return game.new_game().next_round().next_turn()
+
+
+def play_random(game: Game, cards: int) -> None:
+    for _ in range(cards):
+        player = game._current_player()
+        assert type(game.play_card(game._get_bot_card(player), player)) is Game
+
+
+class TestLegalMask:
+    def test_matches_play_card(self):
+        random.seed(5)
+        for _ in range(3):
+            game = bot_game()
+            while game.round == 1:
+                player = game._current_player()
+                legal = game.legal_mask(player)
+                for card in player.hand:
+                    copied = copy.deepcopy(game)
+                    result = copied.play_card(card, copied._current_player())
+                    assert (type(result) is Game) == bool(legal >> card.ordinal & 1)
+                game.play_card(game._get_bot_card(player), player)
+
+    def test_first_lead(self):
+        game = bot_game()
+
+        assert game.legal_mask(game.get_lead_player()) == 1 << TWO_OF_CLUBS.ordinal
+
+    def test_tracks_voids(self):
+        game = bot_game()
+        for player in game.players:
+            player.hand = CardList()
+        game.players[0].hand = CardList([TWO_OF_CLUBS])
+        game.players[1].hand = CardList([Card.parse("3H")])
+        game.lead_player = 0
+        game.turn_order = [0, 1, 2, 3]
+        game._index_owners()
+
+        game.play_card(TWO_OF_CLUBS, game.players[0])
+        game.play_card(Card.parse("3H"), game.players[1])
+
+        assert game._voids[1] == 1 << suit_rank["C"]
+        assert game._voids[0] == 0
+
+
+class TestDeterminize:
+    def test_respects_sizes_and_voids(self):
+        game = bot_game()
+        play_random(game, 21)
+        me = game._current_player()
+        observation = observe(game, me)
+        rng = random.Random(1)
+
+        for _ in range(50):
+            hands = determinize(observation, rng)
+            assert hands[observation.seat] == me.hand.mask
+            assert [cardset.count(hand) for hand in hands] == list(
+                observation.hand_sizes
+            )
+            assert hands[0] | hands[1] | hands[2] | hands[3] == (
+                observation.unseen | observation.hand
+            )
+            for seat, hand in enumerate(hands):
+                if seat != observation.seat:
+                    for suit in range(4):
+                        if observation.voids[seat] >> suit & 1:
+                            assert not cardset.has_suit(hand, suit)
+
+    def test_round_rules_match_game(self):
+        random.seed(3)
+        game = bot_game()
+        play_random(game, 6)
+        observation = observe(game, game._current_player())
+        state = _Round(observation, [player.hand.mask for player in game.players])
+
+        while game.round == 1:
+            player = game._current_player()
+            assert game.legal_mask(player) == state.legal()
+            card = game._get_bot_card(player)
+            state.play(card.ordinal)
+            game.play_card(card, player)
+
+        assert state.points == [player.scores[0] for player in game.players] or (
+            26 in state.points
+        )
+
+
+class TestSearcher:
+    def test_search_only_visits_legal_moves(self):
+        game = bot_game()
+        play_random(game, 5)
+        player = game._current_player()
+        observation = observe(game, player)
+
+        counts = search(observation, time.monotonic() + 10, seed=1, max_iterations=200)
+
+        assert sum(counts.values()) == 200
+        for move in counts:
+            assert game.legal_mask(player) >> move & 1
+
+    def test_dumps_the_queen_under_the_ace(self):
+        game = bot_game()
+        for player in game.players:
+            player.hand = CardList()
+        game.players[0].hand = CardList([Card.parse("AS"), Card.parse("2D")])
+        game.players[1].hand = CardList([QUEEN_OF_SPADES, Card.parse("3S")])
+        game.players[2].hand = CardList([Card.parse("4D"), Card.parse("5D")])
+        game.players[3].hand = CardList([Card.parse("6D"), Card.parse("7D")])
+        # Everything else is already taken, so the deal is known
+        held = [card for player in game.players for card in player.hand]
+        game.players[2].pile = CardList(card for card in CARDS if card not in held)
+        game.turn = 12
+        game.lead_player = 0
+        game.turn_order = [0, 1, 2, 3]
+        game._index_owners()
+        game.play_card(Card.parse("AS"), game.players[0])
+
+        searcher = Searcher(budget=0.05, seed=1)
+        assert searcher(game, game.players[1]) == QUEEN_OF_SPADES
+
+    def test_picks_a_legal_card_within_budget(self):
+        game = bot_game()
+        play_random(game, 9)
+        player = game._current_player()
+        searcher = Searcher(budget=0.1, seed=2)
+
+        start = time.perf_counter()
+        card = searcher(game, player)
+        elapsed = time.perf_counter() - start
+
+        assert game.legal_mask(player) >> card.ordinal & 1
+        assert elapsed < 0.2
+
+    def test_decide_counts_time_queued(self):
+        game = bot_game()
+        play_random(game, 9)
+        player = game._current_player()
+        searcher = Searcher(budget=0.5, seed=3)
+
+        async def inner():
+            loop = asyncio.get_running_loop()
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=1))
+            # Keeps the only executor thread busy for the whole budget
+            loop.run_in_executor(None, time.sleep, 0.5)
+            start = time.monotonic()
+            card = await searcher.decide(game, player)
+            return card, time.monotonic() - start
+
+        card, elapsed = asyncio.run(inner())
+
+        assert game.legal_mask(player) >> card.ordinal & 1
+        assert elapsed < 0.8
+
+    def test_process_pool(self):
+        game = bot_game()
+        play_random(game, 13)
+        player = game._current_player()
+        searcher = Searcher(budget=0.2, workers=2, seed=4).start()
+        try:
+            counts = searcher.visits(observe(game, player))
+            card = searcher(game, player)
+        finally:
+            searcher.close()
+
+        assert sum(counts.values()) > 0
+        assert game.legal_mask(player) >> card.ordinal & 1
+
+    def test_bot_policy_plays_whole_game(self):
+        Game.bot_policy = Searcher(budget=0.002, seed=6)
+        try:
+            game = bot_game()
+            while not game.ended and game.round < 3:
+                game.advance(52)
+        finally:
+            Game.bot_policy = None
+
+        assert game.round == 3 or game.ended
+
+    def test_beats_random(self):
+        mine, theirs = evaluate(rounds=6, budget=0.02, seed=11)
+
+        assert mine < theirs
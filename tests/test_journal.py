@@ -0,0 +1,161 @@
+import os
+import random
+
+import pytest
+
+from hearts_textual import codec, journal
+from hearts_textual.data import Game
+from hearts_textual.tables import TableRegistry
+
+
+class Tracking(journal.Journal):
+    """
+    Keeps the encoded state after every event to check replays against
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.states = {}
+
+    def attach(self, game, seed=None):
+        super().attach(game, seed)
+        self.states[0] = codec.encode_game(game)
+        return self
+
+    def __call__(self, game, op, args):
+        super().__call__(game, op, args)
+        self.states[self.seq] = codec.encode_game(game)
+
+
+@pytest.fixture
+def writer():
+    writer = journal.Writer()
+    yield writer
+    writer.stop()
+
+
+@pytest.fixture
+def played(tmp_path, writer):
+    """
+    A journalled bot game played two rounds in, with a human seated first
+    """
+    random.seed(2)
+    path = str(tmp_path / "game.journal")
+    game = Game().reset()
+    game.bots = True
+    recorder = Tracking(path, writer, snapshot_every=25).attach(game, seed=99)
+
+    game.seat_player(game.players[0], "Homer")
+    game.new_game().next_round().next_turn()
+    while game.round < 3:
+        if not game.advance(1):
+            human = game._current_player()
+            game.play_card(next(game.legal_moves(human)), human)
+    writer.flush()
+
+    return path, game, recorder
+
+
+class TestJournal:
+    def test_replays_every_point(self, played):
+        path, game, recorder = played
+
+        for seq in [0, 1, 4, 24, 25, 26, 60, recorder.seq]:
+            assert codec.encode_game(journal.replay(path, seq)) == recorder.states[seq]
+
+        assert codec.encode_game(journal.replay(path)) == codec.encode_game(game)
+
+    def test_nested_calls_not_recorded_twice(self, played):
+        path, game, recorder = played
+        ops = [op for _, op, _ in journal.events(path)]
+
+        assert ops[:4] == ["seat_player", "new_game", "next_round", "next_turn"]
+        assert set(ops[4:]) == {"play_card"}
+        assert len(ops) == recorder.seq == 4 + 52 * 2
+
+    def test_snapshots_every_n_events(self, played):
+        path, _, recorder = played
+        snapshots = [
+            seq
+            for _, kind, seq, _ in journal.scan(path)
+            if kind == journal.KIND_SNAPSHOT
+        ]
+
+        assert snapshots == list(range(0, recorder.seq + 1, 25))
+
+    def test_replay_keeps_dealing_the_same(self, played):
+        path, game, _ = played
+        replayed = journal.replay(path)
+
+        game.next_round()
+        replayed.next_round()
+        assert codec.encode_game(replayed) == codec.encode_game(game)
+
+    def test_truncated_tail_is_ignored(self, played):
+        path, _, recorder = played
+        with open(path, "ab") as file:
+            file.write(journal.HEADER.pack(100, journal.KIND_EVENT, recorder.seq + 1))
+            file.write(b'{"op": "pl')
+
+        assert codec.encode_game(journal.replay(path)) == recorder.states[recorder.seq]
+
+    def test_registry_journals_new_tables(self, tmp_path):
+        journal.configure(str(tmp_path), snapshot_every=10)
+        try:
+            registry = TableRegistry()
+            table = registry.create()
+            table.game.seat_player(table.game.players[0], "Goose")
+            journal.flush()
+        finally:
+            journal.shutdown()
+
+        (name,) = os.listdir(tmp_path)
+        game = journal.replay(str(tmp_path / name))
+        assert name.startswith(f"{table.id}-")
+        assert game.players[0].name == "Goose"
+        assert game.players[0].connected
+
+    def test_roll_back_snapshots(self, tmp_path, writer):
+        path = str(tmp_path / "game.journal")
+        game = Game().reset()
+        game.bots = True
+        journal.Journal(path, writer).attach(game, seed=5)
+        game.new_game().next_round().next_turn()
+
+        point = game.save_point()
+        lead = game.get_lead_player()
+        game.play_card(next(game.legal_moves(lead)), lead)
+        game.roll_back(point)
+        journal.snapshot(game)
+        writer.flush()
+
+        assert codec.encode_game(journal.replay(path)) == codec.encode_game(game)
+
+    def test_open_files_bounded(self, tmp_path):
+        writer = journal.Writer(max_open=2)
+        try:
+            paths = [str(tmp_path / f"{i}.journal") for i in range(5)]
+            for _ in range(3):
+                for path in paths:
+                    writer.write(path, b"x")
+                    writer.flush()
+                    assert len(writer.files) <= 2
+        finally:
+            writer.stop()
+
+        for path in paths:
+            with open(path, "rb") as file:
+                assert file.read() == b"xxx"
+
+    def test_failed_write_releases_flush(self, tmp_path, writer):
+        missing = str(tmp_path / "gone" / "game.journal")
+        path = str(tmp_path / "game.journal")
+
+        writer.write(missing, b"lost")
+        writer.write(path, b"kept")
+        writer.flush()
+
+        assert isinstance(writer.error, FileNotFoundError)
+        assert writer.thread.is_alive()
+        with open(path, "rb") as file:
+            assert file.read() == b"kept"
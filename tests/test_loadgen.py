@@ -0,0 +1,45 @@
+import asyncio
+
+import websockets
+
+from hearts_textual import binary
+from hearts_textual.loadgen import percentile, run_load
+from hearts_textual.server import handler
+
+from tests.fixtures import game_reset
+
+
+async def load_against_handler(clients: int, duration: float, use_binary: bool):
+    async with websockets.serve(
+        handler, "localhost", 0, subprotocols=binary.SUBPROTOCOLS
+    ) as server:
+        port = server.sockets[0].getsockname()[1]
+        return await run_load(f"ws://localhost:{port}", clients, duration, use_binary)
+
+
+class TestLoadgen:
+    def test_percentile(self):
+        samples = [float(i) for i in range(1, 101)]
+
+        assert percentile([], 50) == 0.0
+        assert percentile(samples, 50) == 51.0
+        assert percentile(samples, 99) == 99.0
+        assert percentile(samples, 100) == 100.0
+
+    def test_run_load(self, game_reset):
+        report = asyncio.run(load_against_handler(8, 1.5, False))
+        summary = report.to_dict()
+
+        assert summary["tables"] == 2
+        assert summary["errors"] == 0
+        assert summary["cards_played"] > 0
+        assert summary["messages_received"] > summary["commands_sent"]
+        assert summary["rtt_p50_ms"] <= summary["rtt_p99_ms"]
+        # Sitting down isn't timed, 2 create_table, 2 list_tables, 6 joins
+        assert 0 < len(report.stats.latencies) <= summary["commands_sent"] - 10
+
+    def test_run_load_binary(self, game_reset):
+        report = asyncio.run(load_against_handler(4, 1.0, True))
+
+        assert report.stats.errors == 0
+        assert report.stats.cards > 0
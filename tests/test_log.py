@@ -0,0 +1,75 @@
+import io
+import json
+import threading
+
+import pytest
+
+from hearts_textual import log
+
+
+@pytest.fixture
+def stream():
+    stream = io.StringIO()
+    yield stream
+    log.reset()
+
+
+def lines(stream):
+    log.shutdown()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+class TestLog:
+    def test_structured_lines(self, stream):
+        log.configure("debug", stream=stream)
+        log.debug("command", command="play_card", table="default")
+        log.info("disconnect", player=None)
+
+        first, second = lines(stream)
+        assert first["level"] == "debug"
+        assert first["event"] == "command"
+        assert first["command"] == "play_card"
+        assert first["table"] == "default"
+        assert second == {
+            "ts": second["ts"],
+            "level": "info",
+            "event": "disconnect",
+            "player": None,
+        }
+
+    def test_formats_off_the_calling_thread(self, stream, monkeypatch):
+        threads = []
+        format = log.JsonFormatter.format
+
+        def spy(self, record):
+            threads.append(threading.current_thread())
+            return format(self, record)
+
+        monkeypatch.setattr(log.JsonFormatter, "format", spy)
+        log.configure("info", stream=stream)
+        log.info("connect")
+
+        assert len(lines(stream)) == 1
+        assert threads and threading.current_thread() not in threads
+
+    def test_level(self, stream):
+        log.configure("info", stream=stream)
+        log.debug("command")
+
+        assert not log.enabled("debug")
+        assert lines(stream) == []
+
+    def test_sampling_keeps_warnings(self, stream):
+        log.configure("debug", sample=0.0, stream=stream)
+        for _ in range(20):
+            log.info("connect")
+        log.warning("slow")
+
+        assert [line["event"] for line in lines(stream)] == ["slow"]
+
+    def test_off(self, stream):
+        log.configure("off", stream=stream)
+        log.error("boom")
+
+        assert not log.enabled("error")
+        assert lines(stream) == []
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+
+from hearts_textual import metrics
+from hearts_textual.metrics import Counter, Histogram, Metric, Registry
+from hearts_textual.server import handler
+
+from tests.fixtures import game_reset
+
+
+class TestMetrics:
+    def test_counter(self):
+        counter = Counter("things_total", "Things", ("kind",))
+        counter.inc("a")
+        counter.inc("a", amount=2)
+        counter.inc("b")
+
+        assert counter.value("a") == 3
+        assert counter.value("missing") == 0
+        assert counter.samples() == [
+            'things_total{kind="a"} 3',
+            'things_total{kind="b"} 1',
+        ]
+
+    def test_histogram(self):
+        histogram = Histogram("took_seconds", "Took", buckets=(0.1, 1.0))
+        for value in [0.05, 0.1, 0.5, 3.0]:
+            histogram.observe(value)
+
+        assert histogram.count() == 4
+        assert histogram.sum() == 3.65
+        assert histogram.samples() == [
+            'took_seconds_bucket{le="0.1"} 2',
+            'took_seconds_bucket{le="1"} 3',
+            'took_seconds_bucket{le="+Inf"} 4',
+            "took_seconds_sum 3.65",
+            "took_seconds_count 4",
+        ]
+
+    def test_metric_is_abstract(self):
+        class Untyped(Metric):
+            def samples(self):
+                return []
+
+        with pytest.raises(TypeError):
+            Untyped("untyped", "Has no clear")  # type: ignore[abstract]
+
+    def test_render_runs_collectors(self):
+        registry = Registry()
+        gauge = registry.gauge("answer", "The answer")
+        registry.collect(lambda: gauge.set(42))
+
+        assert registry.render() == (
+            "# HELP answer The answer\n# TYPE answer gauge\nanswer 42\n"
+        )
+
+    def test_handler_and_scrape(self, game_reset):
+        metrics.REGISTRY.clear()
+
+        async def run():
+            scrape = await metrics.serve_metrics("localhost", 0)
+            scrape_port = scrape.sockets[0].getsockname()[1]
+
+            async with websockets.serve(handler, "localhost", 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                async with websockets.connect(f"ws://localhost:{port}") as client:
+                    join = {"command": "join", "args": {"name": "Metrics"}}
+                    await client.send(json.dumps(join))
+                    await client.recv()
+                    await client.send(json.dumps({"command": "nope", "args": {}}))
+                    await client.recv()
+                    connections = metrics.CONNECTIONS.value()
+
+            reader, writer = await asyncio.open_connection("localhost", scrape_port)
+            writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+            scrape.close()
+
+            return connections, response.decode()
+
+        connections, response = asyncio.run(run())
+
+        assert connections == 1
+        assert metrics.CONNECTIONS.value() == 0
+        assert metrics.MESSAGES_IN.value("join") == 1
+        assert metrics.MESSAGES_IN.value("unknown") == 1
+        assert metrics.MESSAGES_OUT.value("update") == 1
+        assert metrics.BYTES_ENCODED.value("json") > 0
+        for stage in ["decode", "run", "encode", "broadcast"]:
+            assert metrics.COMMAND_SECONDS.count("join", stage) == 1
+
+        assert response.startswith("HTTP/1.1 200 OK")
+        assert 'hearts_messages_in_total{command="join"} 1' in response
+        assert "hearts_tables 1" in response
@@ -0,0 +1,149 @@
+import asyncio
+
+import websockets
+
+from hearts_textual import codec, metrics, server
+from hearts_textual.commands import run_command
+from hearts_textual.outbox import CLOSED, QUEUED, RESYNC, Outbox
+
+from tests.fixtures import join, websocket, game_reset
+
+
+class Socket:
+    """
+    Stands in for a websocket, send() blocks until let through
+    """
+
+    def __init__(self) -> None:
+        self.sent = []
+        self.closed = None
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def send(self, payload) -> None:
+        await self.gate.wait()
+        self.sent.append(payload)
+
+    async def close(self, code, reason) -> None:
+        self.closed = (code, reason)
+
+
+class GoneSocket(Socket):
+    async def send(self, payload) -> None:
+        raise websockets.ConnectionClosed(None, None)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine())
+
+
+class TestOutbox:
+    def test_sends_in_order(self):
+        async def inner():
+            socket = Socket()
+            box = Outbox(socket)
+            writer = asyncio.create_task(box.run())
+            for payload in ["a", "b", "c"]:
+                assert box.put("delta", payload) == QUEUED
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            writer.cancel()
+            return socket.sent, box.bytes
+
+        assert run(inner) == (["a", "b", "c"], 0)
+
+    def test_send_on_closed_socket(self):
+        async def inner():
+            box = Outbox(GoneSocket())
+            writer = asyncio.create_task(box.run())
+            box.put("delta", "a")
+            await writer
+            return box.closed, box.put("delta", "b")
+
+        assert run(inner) == (True, CLOSED)
+
+    def test_update_supersedes_waiting_state(self):
+        async def inner():
+            box = Outbox(Socket())
+            box.put("delta", "d1")
+            box.put("echo", "e")
+            box.put("delta", "d2")
+            box.put("update", "full")
+            return list(box.frames), box.bytes
+
+        frames, size = run(inner)
+        assert frames == [("echo", "e"), ("update", "full")]
+        assert size == len("e") + len("full")
+
+    def test_overflow_drops_backlog(self):
+        metrics.REGISTRY.clear()
+
+        async def inner():
+            box = Outbox(Socket(), max_frames=3)
+            results = [box.put("delta", str(i)) for i in range(4)]
+            return results, len(box)
+
+        results, waiting = run(inner)
+        assert results == [QUEUED, QUEUED, QUEUED, RESYNC]
+        assert waiting == 0
+        assert metrics.FRAMES_DROPPED.value("overflow") == 4
+
+    def test_byte_bound(self):
+        async def inner():
+            box = Outbox(Socket(), max_bytes=10)
+            return box.put("update", "x" * 8), box.put("delta", "y" * 8)
+
+        assert run(inner) == (QUEUED, RESYNC)
+
+    def test_slow_consumer_closed(self):
+        async def inner():
+            socket = Socket()
+            socket.gate.clear()
+            box = Outbox(socket, max_frames=2, strikes=2)
+            writer = asyncio.create_task(box.run())
+            results = []
+            for i in range(10):
+                results.append(box.put("delta", str(i)))
+                await asyncio.sleep(0)
+            writer.cancel()
+            await box.closing
+            return results, socket.closed
+
+        results, closed = run(inner)
+        assert results[-1] == CLOSED
+        assert results.count(RESYNC) == 1
+        assert closed == (1008, "too slow")
+
+    def test_catching_up_clears_strikes(self):
+        async def inner():
+            socket = Socket()
+            box = Outbox(socket, max_frames=1, strikes=2)
+            writer = asyncio.create_task(box.run())
+            results = []
+            for _ in range(3):
+                box.put("delta", "a")
+                results.append(box.put("delta", "b"))
+                await asyncio.sleep(0)
+                await asyncio.sleep(0)
+            writer.cancel()
+            return results, socket.closed
+
+        assert run(inner) == ([RESYNC, RESYNC, RESYNC], None)
+
+
+class TestServerQueues:
+    def test_overflow_queues_snapshot(self, join, websocket):
+        w = websocket()
+        run_command(join("Homer"), w)
+        box = server.OUTBOXES[w] = Outbox(Socket(), max_frames=2)
+        try:
+            server._broadcast([({w}, "delta", "1"), ({w}, "delta", "2")])
+            server._broadcast([({w}, "delta", "3")])
+        finally:
+            server.OUTBOXES.pop(w)
+
+        ((command, payload),) = box.frames
+        assert command == "update"
+        assert codec.decode_message(payload).args["state"]["players"][0]["name"] == (
+            "Homer"
+        )
@@ -0,0 +1,225 @@
+import asyncio
+import json
+
+import websockets
+
+from hearts_textual import server
+from hearts_textual.commands import TABLES
+from hearts_textual.data import Game, Player
+from hearts_textual.scheduler import BotScheduler
+from hearts_textual.tables import Table
+
+from tests.fixtures import game_reset
+
+
+def bot_game() -> Game:
+    game = Game().reset()
+    game.bots = True
+
+    return game.new_game().next_round().next_turn()
+
+
+def one_human_game() -> Game:
+    """
+    One human, the rest bots, dealt and waiting on the two of clubs
+    """
+    game = Game().reset()
+    game.bots = True
+    game.players[0].connected = True
+
+    return game.new_game().next_round().next_turn()
+
+
+def human_player(game: Game) -> Player:
+    return next(player for player in game.players if not player.bot)
+
+
+def human_table(table_id: str) -> Table:
+    table = Table(id=table_id, game=bot_game())
+    table.seat(object(), table.game.players[0])
+
+    return table
+
+
+class TestAdvance:
+    def test_plays_whole_bot_game_without_recursing(self):
+        game = bot_game()
+        events = game.advance()
+
+        assert game.ended
+        assert not game.bot_to_play()
+        assert len(events) % 4 == 0
+        assert events[0].turn == 1
+        assert events[0].card.ordinal == 0
+
+    def test_max_steps(self):
+        game = bot_game()
+        events = game.advance(3)
+
+        assert len(events) == 3
+        assert len(game.played_cards) == 3
+        assert [event.player for event in events] == [
+            game.players[i].name for i in game.turn_order[:3]
+        ]
+
+    def test_stops_for_humans(self):
+        game = one_human_game()
+        human = human_player(game)
+        game.advance()
+
+        assert not game.bot_to_play()
+        assert game._current_player() is human
+
+        # A human card never plays the bots after it
+        card = game._get_bot_card(human)
+        assert type(game.play_card(card, human)) is Game
+        assert game.bot_to_play() or game.turn == 2
+
+    def test_no_bots(self):
+        game = Game().reset().new_game().next_round().next_turn()
+
+        assert not game.bot_to_play()
+        assert game.advance() == []
+
+
+class TestBotScheduler:
+    def test_round_robin(self):
+        scheduler = BotScheduler(steps_per_tick=1)
+        first, second = human_table("1"), human_table("2")
+        scheduler.schedule(first)
+        scheduler.schedule(second)
+        scheduler.schedule(first)
+
+        assert len(scheduler) == 2
+
+        played = asyncio.run(scheduler.tick())
+
+        assert [(table.id, len(events)) for table, events in played] == [
+            ("1", 1),
+            ("2", 1),
+        ]
+        assert len(scheduler) == 2
+
+    def test_skips_empty_tables(self):
+        scheduler = BotScheduler()
+        table = Table(id="1", game=bot_game())
+        scheduler.schedule(table)
+
+        assert asyncio.run(scheduler.tick()) == []
+        assert len(scheduler) == 0
+        assert table.game.played_cards == []
+
+    def test_drains_until_human(self):
+        scheduler = BotScheduler(steps_per_tick=2)
+        table = Table(id="1", game=one_human_game())
+        human = human_player(table.game)
+        table.seat(object(), human)
+        scheduler.schedule(table)
+        while len(scheduler):
+            asyncio.run(scheduler.tick())
+
+        assert table.game._current_player() is human
+
+
+class SlowPolicy:
+    """
+    Thinks by sleeping, then plays the lowest legal card
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self, game, player):
+        raise Exception("Should be awaited, not called")
+
+    async def decide(self, game, player):
+        self.calls += 1
+        await asyncio.sleep(0.1)
+        return next(game.legal_moves(player))
+
+
+class TestAsyncPolicy:
+    def test_thinks_off_the_loop(self, monkeypatch):
+        monkeypatch.setattr(Game, "bot_policy", SlowPolicy())
+        scheduler = BotScheduler(steps_per_tick=1)
+        tables = [human_table(str(i)) for i in range(4)]
+        for table in tables:
+            scheduler.schedule(table)
+
+        async def run():
+            beats = 0
+
+            async def heartbeat():
+                nonlocal beats
+                while True:
+                    beats += 1
+                    await asyncio.sleep(0.005)
+
+            beating = asyncio.create_task(heartbeat())
+            played = await scheduler.tick()
+            beating.cancel()
+            return played, beats
+
+        played, beats = asyncio.run(run())
+
+        assert [len(events) for _, events in played] == [1, 1, 1, 1]
+        # All four thought together, and the loop kept running meanwhile
+        assert beats >= 5
+        assert Game.bot_policy.calls == 4
+
+    def test_game_moved_on_while_thinking(self, monkeypatch):
+        monkeypatch.setattr(Game, "bot_policy", SlowPolicy())
+        scheduler = BotScheduler(steps_per_tick=1)
+        table = human_table("1")
+        scheduler.schedule(table)
+
+        async def run():
+            ticking = asyncio.create_task(scheduler.tick())
+            await asyncio.sleep(0.01)
+            # Queued again while a tick plays for it, it mustn't run twice
+            scheduler.schedule(table)
+            assert len(scheduler) == 0
+            table.game.touch()
+            return await ticking
+
+        assert asyncio.run(run()) == []
+        assert table.game.played_cards == []
+        assert len(scheduler) == 1
+
+
+class TestServerBots:
+    def test_bots_play_between_human_turns(self, game_reset):
+        TABLES.bots = True
+        for table in TABLES:
+            table.game.bots = True
+
+        async def run():
+            bots = asyncio.create_task(server.BOTS.run(server.publish_bot_plays))
+            try:
+                async with websockets.serve(server.handler, "localhost", 0) as ws:
+                    port = ws.sockets[0].getsockname()[1]
+                    async with websockets.connect(f"ws://localhost:{port}") as client:
+                        join = {"command": "create_table", "args": {"name": "Human"}}
+                        await client.send(json.dumps(join))
+                        await client.recv()
+                        for command in ["new_game", "next_round", "next_turn"]:
+                            message = {"command": command, "args": {}}
+                            await client.send(json.dumps(message))
+                            await client.recv()
+
+                        table = TABLES.for_socket(next(iter(server.connected)))
+                        game = table.game
+                        # wait for the bots ahead of us to play
+                        while game._current_player().name != "Human":
+                            await asyncio.wait_for(client.recv(), 5)
+
+                        return game
+            finally:
+                bots.cancel()
+                server.BOTS.clear()
+                TABLES.bots = False
+
+        game = asyncio.run(run())
+
+        assert game._current_player().name == "Human"
+        assert not game.bot_to_play()
@@ -0,0 +1,182 @@
+import asyncio
+from typing import Optional
+
+import websockets
+
+from hearts_textual import binary, metrics
+from hearts_textual.commands import (
+    COMMANDS,
+    dispatch,
+    run_command,
+    CLIENT_STATES,
+    TABLES,
+)
+from hearts_textual.data import Card, Message
+from hearts_textual.schema import Schema
+from hearts_textual.server import handler
+
+from tests.fixtures import (
+    join,
+    websocket,
+    game_reset,
+    four_players_and_sockets,
+    new_game_str,
+    next_round_str,
+    next_turn_str,
+    base_template,
+)
+
+
+def example(*, websocket, count: int, names: list[str], card: Card, note=None):
+    pass
+
+
+def flag(*, websocket, on: Optional[bool] = None):
+    pass
+
+
+class TestSchema:
+    def test_good_args_pass(self):
+        schema = Schema(example, {"websocket"})
+        args = {"count": 3, "names": ["a"], "card": "QS", "note": object()}
+
+        assert schema.check(args) is None
+        assert args["card"] is Card.parse("QS")
+
+    def test_unexpected_arg(self):
+        schema = Schema(example, {"websocket"})
+
+        problem = schema.check(
+            {"count": 3, "names": [], "card": "QS", "websocket": "me"}
+        )
+        assert problem == "example doesn't take websocket"
+
+    def test_missing_args(self):
+        schema = Schema(example, {"websocket"})
+
+        assert schema.check({"card": "QS"}) == "example needs count, names"
+
+    def test_wrong_types(self):
+        schema = Schema(example, {"websocket"})
+        good = {"count": 3, "names": ["a"], "card": "QS"}
+
+        for key, value in [
+            ("count", "3"),
+            ("count", True),
+            ("names", "a"),
+            ("names", [1]),
+            ("card", "1Z"),
+            ("card", {"suit": "S"}),
+        ]:
+            assert schema.check({**good, key: value}).startswith(f"example {key}:")
+
+    def test_optional(self):
+        schema = Schema(flag, {"websocket"})
+
+        assert schema.check({}) is None
+        assert schema.check({"on": None}) is None
+        assert schema.check({"on": 1}) is not None
+
+    def test_describe(self):
+        assert Schema(flag, {"websocket"}).describe() == {
+            "on": {"type": "Optional[bool]", "required": False}
+        }
+
+
+class TestDispatch:
+    def test_injected_args_left_out(self):
+        described = COMMANDS["play_card"].schema.describe()
+
+        assert described == {"card": {"type": "Card", "required": True}}
+
+    def test_bad_card_rejected(self, four_players_and_sockets):
+        metrics.REGISTRY.clear()
+        sockets = four_players_and_sockets
+        for command in [new_game_str, next_round_str, next_turn_str]:
+            run_command(command, sockets[0])
+        version = TABLES.for_socket(sockets[0]).game.version
+
+        for card in ['"ZZ"', '{"suit": "S"}', "12", "null"]:
+            args = '{"card": ' + card + "}"
+            message = run_command(
+                base_template.substitute(command="play_card", args=args), sockets[0]
+            )
+            assert message.command == "echo"
+            assert message.args["message"].startswith("Bad command, play_card card:")
+
+        assert TABLES.for_socket(sockets[0]).game.version == version
+        assert metrics.COMMANDS_REJECTED.value("play_card") == 4
+
+    def test_smuggled_table_rejected(self, websocket):
+        message = dispatch(
+            Message(command="new_game", args={"table": "default"}), websocket()
+        )
+
+        assert message.args["message"] == "Bad command, new_game doesn't take table"
+
+    def test_schema_command(self, websocket):
+        message = run_command(
+            base_template.substitute(command="schema", args="{}"), websocket()
+        )
+
+        assert message.command == "schemas"
+        assert message.args["commands"]["join"]["name"] == {
+            "type": "str",
+            "required": True,
+        }
+        assert TABLES.outbound(websocket(), message)[0][1] is message
+
+
+class TestEnvelope:
+    def test_malformed_frames_echo(self, websocket):
+        for frame in [
+            '{"args": {}}',
+            '{"command": ["x"]}',
+            "not json",
+            "[]",
+            '{"command": "help", "args": [1]}',
+            b"\x01\x02",
+        ]:
+            message = run_command(frame, websocket())
+            assert message.command == "echo"
+            assert message.args["message"].startswith("Bad frame, ")
+
+    def test_client_only_commands_refused_from_clients(self, websocket):
+        w = websocket()
+        for command, args in [
+            ("update", {"state": {}, "messages": []}),
+            ("replay", {"deltas": [{}]}),
+            ("echo", {"message": "hi"}),
+        ]:
+            message = dispatch(Message(command=command, args=args), w, from_client=True)
+            assert message.args["message"] == f"Command {command} is for clients!"
+
+        assert w not in CLIENT_STATES
+        assert (
+            "update"
+            not in run_command(
+                base_template.substitute(command="schema", args="{}"), w
+            ).args["commands"]
+        )
+
+    def test_server_keeps_connection(self):
+        async def run():
+            async with websockets.serve(handler, "localhost", 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                async with websockets.connect(f"ws://localhost:{port}") as client:
+                    replies = []
+                    for frame in [
+                        '{"args": {}}',
+                        "nope",
+                        b"\x09",
+                        '{"command": "help"}',
+                    ]:
+                        await client.send(frame)
+                        replies.append(binary.decode_frame(await client.recv()))
+
+            return replies
+
+        replies = asyncio.run(run())
+
+        assert [reply.command for reply in replies] == ["echo"] * 4
+        assert replies[-1].args["message"].startswith("Commands: ")
@@ -0,0 +1,228 @@
+from collections import deque
+import json
+
+from hearts_textual import binary, tables, views
+from hearts_textual.commands import (
+    create,
+    run_command,
+    update,
+    CLIENT_SESSIONS,
+    CLIENT_STATES,
+    DEFAULT_TABLE,
+    TABLES,
+)
+from hearts_textual.data import Message
+
+from tests.fixtures import (
+    join,
+    play_card,
+    websocket,
+    game_reset,
+    new_game_str,
+    next_round_str,
+    next_turn_str,
+    base_template,
+)
+
+
+def resume_str(token, version=None, name=None):
+    args = {"token": token, "version": version}
+    if name is not None:
+        args["name"] = name
+    return base_template.substitute(command="resume", args=json.dumps(args))
+
+
+def view_of(w):
+    game = DEFAULT_TABLE.game
+    seat = game.players.index(DEFAULT_TABLE.sockets_to_players[w])
+
+    return views.redact(game.to_dict(encode_json=True), seat)
+
+
+def deliver(sender, result, clients):
+    """
+    Run every outbound frame through the client side commands
+    """
+    received = {}
+    for recipients, frame in TABLES.outbound(sender, result):
+        for socket in recipients:
+            received[socket] = frame.command
+            if socket in clients:
+                run_command(frame.to_json(), clients[socket])
+
+    return received
+
+
+class TestSessions:
+    def seated(self, join, websocket):
+        """
+        Four players at the default table with a round underway, each
+        socket with a client that has followed along
+        """
+        sockets = [websocket() for _ in range(4)]
+        clients = {w: websocket() for w in sockets}
+        for w, name in zip(sockets, ["Homer", "Goose", "Penguin", "Menace"]):
+            deliver(w, run_command(join(name), w), clients)
+        for command in [new_game_str, next_round_str, next_turn_str]:
+            deliver(sockets[0], run_command(command, sockets[0]), clients)
+
+        return sockets, clients
+
+    def play(self, play_card, clients, cards):
+        game = DEFAULT_TABLE.game
+        for _ in range(cards):
+            player = game._current_player()
+            card = next(game.legal_moves(player))
+            w = DEFAULT_TABLE.players_to_sockets.get(player)
+            if w is None:
+                # Nobody there to send it, published like a bot's card
+                game.play_card(card, player)
+                w = next(iter(clients))
+                deliver(w, create(update, state=game, messages=[]), clients)
+            else:
+                deliver(w, run_command(play_card(card), w), clients)
+
+    def test_join_hands_out_token(self, join, websocket):
+        w1, w2 = websocket(), websocket()
+        clients = {w1: websocket(), w2: websocket()}
+        deliver(w1, run_command(join("Homer"), w1), clients)
+
+        result = run_command(join("Goose"), w2)
+        frames = TABLES.outbound(w2, result)
+
+        sent = {frozenset(r): f for r, f in frames}
+        assert {r: f.command for r, f in sent.items()} == {
+            frozenset([w2]): "update",
+            frozenset([w1]): "delta",
+        }
+        assert sent[frozenset([w2])].args["session"] in TABLES.sessions
+        assert "session" not in sent[frozenset([w1])].args
+        assert CLIENT_SESSIONS[clients[w1]] in TABLES.sessions
+
+    def test_token_survives_binary_frames(self, join, websocket):
+        w = websocket()
+        result = run_command(join("Homer"), w)
+        ((_, frame),) = TABLES.outbound(w, result)
+
+        decoded = binary.decode_frame(binary.encode_message(frame))
+
+        assert decoded.args["session"] == frame.args["session"]
+
+    def test_resume_replays_missed_deltas(self, join, play_card, websocket):
+        sockets, clients = self.seated(join, websocket)
+        dropped = clients.pop(sockets[1])
+        token = CLIENT_SESSIONS[dropped]
+        player = DEFAULT_TABLE.sockets_to_players[sockets[1]]
+        TABLES.leave(sockets[1])
+
+        self.play(play_card, clients, 6)
+
+        w = websocket()
+        version = CLIENT_STATES[dropped]["version"]
+        CLIENT_STATES[w] = CLIENT_STATES.pop(dropped)
+        result = run_command(resume_str(token, version), w)
+        frames = deliver(w, result, {w: w})
+
+        assert frames == {w: "replay"}
+        assert len(result.args["deltas"]) == 6
+        assert CLIENT_STATES[w] == view_of(w)
+        assert DEFAULT_TABLE.sockets_to_players[w] is player
+
+        # Back in sync, so the next play is a delta like everyone else's
+        clients[w] = w
+        game = DEFAULT_TABLE.game
+        mover = DEFAULT_TABLE.players_to_sockets[game._current_player()]
+        card = next(game.legal_moves(game._current_player()))
+        received = deliver(mover, run_command(play_card(card), mover), clients)
+        assert set(received.values()) == {"delta"} and w in received
+        assert CLIENT_STATES[w] == view_of(w)
+
+    def test_gap_past_history_gets_snapshot(
+        self, monkeypatch, join, play_card, websocket
+    ):
+        sockets, clients = self.seated(join, websocket)
+        dropped = clients.pop(sockets[2])
+        token = CLIENT_SESSIONS[dropped]
+        version = CLIENT_STATES[dropped]["version"]
+        TABLES.leave(sockets[2])
+        monkeypatch.setattr(DEFAULT_TABLE, "history", deque(maxlen=4))
+
+        self.play(play_card, clients, 6)
+
+        w = websocket()
+        result = run_command(resume_str(token, version), w)
+        received = deliver(w, result, {w: w})
+
+        assert received[w] == "update"
+        assert CLIENT_STATES[w] == view_of(w)
+
+    def test_resume_bumps_old_connection(self, join, websocket):
+        sockets, clients = self.seated(join, websocket)
+        token = CLIENT_SESSIONS[clients[sockets[3]]]
+        player = DEFAULT_TABLE.sockets_to_players[sockets[3]]
+
+        w = websocket()
+        run_command(resume_str(token), w)
+
+        assert TABLES.for_socket(sockets[3]) is None
+        assert DEFAULT_TABLE.players_to_sockets[player] == w
+        assert len(DEFAULT_TABLE.members()) == 4
+
+    def test_unknown_token(self, websocket):
+        message = run_command(resume_str("nope"), websocket())
+        assert message.command == "echo"
+
+        w = websocket()
+        message = run_command(resume_str("nope", name="Homer"), w)
+        assert message.command == "update"
+        assert TABLES.for_socket(w) is DEFAULT_TABLE
+
+    def test_game_in_progress_waits_for_resume(self, websocket):
+        w = websocket()
+        run_command(
+            base_template.substitute(command="create_table", args='{"name": "Goose"}'),
+            w,
+        )
+        table = TABLES.for_socket(w)
+        table.game.bots = True
+        run_command(new_game_str, w)
+        (session,) = [s for s in TABLES.sessions.values() if s.table is table]
+        TABLES.leave(w)
+
+        TABLES.sweep(session.dropped + tables.RESUME_WINDOW / 2)
+        assert TABLES.get(table.id) is table
+        assert TABLES.resume(session.token, websocket()) is session
+        TABLES.leave(session.websocket)
+
+        TABLES.sweep(session.dropped + tables.RESUME_WINDOW + 1)
+        assert TABLES.get(table.id) is None
+        assert session.token not in TABLES.sessions
+
+    def test_expired_seat_opens_up(self, join, websocket):
+        sockets, clients = self.seated(join, websocket)
+        player = DEFAULT_TABLE.sockets_to_players[sockets[3]]
+        session = TABLES.sockets_to_sessions[sockets[3]]
+        TABLES.leave(sockets[3])
+
+        w = websocket()
+        assert run_command(join("Bart"), w).command == "echo"
+
+        version = DEFAULT_TABLE.game.version
+        freed = TABLES.sweep(session.dropped + tables.RESUME_WINDOW + 1)
+        assert freed == [DEFAULT_TABLE]
+        assert not player.connected
+        assert DEFAULT_TABLE.game.version > version
+
+        deliver(w, run_command(join("Bart"), w), {})
+        assert DEFAULT_TABLE.sockets_to_players[w] is player
+
+    def test_replay_reply_only_to_sender(self, join, websocket):
+        sockets, _ = self.seated(join, websocket)
+
+        frames = TABLES.outbound(
+            sockets[0], Message(command="replay", args={"deltas": []})
+        )
+
+        assert frames == [
+            ({sockets[0]}, Message(command="replay", args={"deltas": []}))
+        ]
@@ -0,0 +1,28 @@
+from hearts_textual.simulate import play_game, simulate
+
+
+class TestSimulate:
+    def test_play_game(self):
+        result = play_game()
+
+        assert max(result.scores) > 100
+        assert result.tricks == result.rounds * 13
+
+    def test_simulate_inline(self):
+        report = simulate(games=5, workers=1, seed=7)
+
+        assert report.games == 5
+        assert len(report.scores) == 20
+        assert sum(report.winners) == 5
+        assert report.to_dict()["games_per_second"] > 0
+
+    def test_simulate_seeded(self):
+        first = simulate(games=3, workers=1, seed=3)
+        second = simulate(games=3, workers=1, seed=3)
+
+        assert first.scores == second.scores
+
+    def test_simulate_process_pool(self):
+        report = simulate(games=4, workers=2, seed=1)
+
+        assert len(report.scores) == 16
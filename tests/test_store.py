@@ -0,0 +1,165 @@
+import random
+import sqlite3
+
+import pytest
+
+from hearts_textual import codec
+from hearts_textual.data import Game
+from hearts_textual.store import MemoryStore, SqliteStore, TableStore
+from hearts_textual.tables import RESUME_WINDOW, Table, TableRegistry
+
+
+def bot_game() -> Game:
+    game = Game().reset()
+    game.bots = True
+
+    return game.new_game().next_round().next_turn()
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    store = SqliteStore(str(tmp_path / "tables.db"), interval=60)
+    yield store
+    store.close()
+
+
+class TestTableStore:
+    def test_must_implement_everything(self):
+        class Forgetful(TableStore):
+            def save(self, table_id, game):
+                pass
+
+            def delete(self, table_id):
+                pass
+
+        with pytest.raises(TypeError):
+            TableStore()  # type: ignore[abstract]
+        with pytest.raises(TypeError):
+            Forgetful()  # type: ignore[abstract]
+        assert list(MemoryStore().load()) == []
+
+
+class TestSqliteStore:
+    def test_roundtrip(self, sqlite_store):
+        game = bot_game()
+        game.advance(9)
+        sqlite_store.save("7", game)
+
+        ((table_id, loaded, saved_at),) = list(sqlite_store.load())
+        assert table_id == "7"
+        assert codec.encode_game(loaded) == codec.encode_game(game)
+
+        # Same RNG state, so the next deal matches too
+        game.next_round()
+        loaded.next_round()
+        assert codec.encode_game(loaded) == codec.encode_game(game)
+
+    def test_wal_and_one_row_per_table(self, sqlite_store):
+        game = bot_game()
+        for _ in range(5):
+            game.advance(4)
+            sqlite_store.save("1", game)
+        sqlite_store.save("2", bot_game())
+        sqlite_store.flush()
+
+        db = sqlite3.connect(sqlite_store.path)
+        assert db.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        rows = db.execute("SELECT id, version FROM tables ORDER BY id").fetchall()
+        db.close()
+        assert rows == [("1", game.version), ("2", rows[1][1])]
+
+    def test_delete(self, sqlite_store):
+        sqlite_store.save("1", bot_game())
+        sqlite_store.flush()
+        sqlite_store.delete("1")
+
+        assert list(sqlite_store.load()) == []
+
+    def test_close_writes_what_is_pending(self, tmp_path):
+        path = str(tmp_path / "tables.db")
+        store = SqliteStore(path, interval=60)
+        store.save("1", bot_game())
+        store.close()
+
+        reopened = SqliteStore(path)
+        try:
+            assert [table_id for table_id, _, _ in reopened.load()] == ["1"]
+        finally:
+            reopened.close()
+
+
+class TestRegistryCheckpoints:
+    def test_only_between_tricks(self):
+        registry = TableRegistry()
+        registry.store = store = MemoryStore()
+        table = registry.create()
+
+        registry.checkpoint(table)
+        assert store.checkpoints == {}
+
+        table.game = bot_game()
+        registry.checkpoint(table)
+        assert table.id in store.checkpoints
+        saved = store.checkpoints[table.id]
+
+        table.game.advance(2)
+        registry.checkpoint(table)
+        assert store.checkpoints[table.id] == saved
+
+        table.game.advance(2)
+        registry.checkpoint(table)
+        assert store.checkpoints[table.id] != saved
+
+    def test_finished_games_are_dropped(self):
+        registry = TableRegistry()
+        registry.store = store = MemoryStore()
+        table = registry.create()
+        table.game = bot_game()
+        registry.checkpoint(table)
+
+        table.game.end_game()
+        registry.checkpoint(table)
+        assert store.checkpoints == {}
+
+    def test_restore_frees_seats_for_their_players(self):
+        store = MemoryStore()
+        game = bot_game()
+        game.players[2].name = "Homer"
+        game.players[2].connected = True
+        game.players[2].bot = False
+        store.save("5", game)
+
+        registry = TableRegistry()
+        (table,) = registry.restore(store)
+
+        assert registry.get("5") is table
+        assert not any(player.connected for player in table.game.players)
+        assert table.game.get_open_seat("Homer") is table.game.players[2]
+        assert registry.create().id != "5"
+
+    def test_restored_tables_wait_for_their_players(self):
+        store = MemoryStore()
+        store.save("5", bot_game())
+
+        registry = TableRegistry(bots=True)
+        (table,) = registry.restore(store)
+        assert table.game.bots
+
+        registry.sweep(table.held_until - 1)
+        assert registry.get("5") is table
+
+        registry.sweep(table.held_until + 1)
+        assert registry.get("5") is None
+        # Still in progress, so it comes back after another restart
+        assert "5" in store.checkpoints
+
+    def test_grace_counts_from_checkpoint(self):
+        store = MemoryStore()
+        store.save("5", bot_game())
+        store.saved_at["5"] -= RESUME_WINDOW * 2
+
+        registry = TableRegistry()
+        registry.restore(store)
+        registry.sweep()
+
+        assert registry.get("5") is None
@@ -0,0 +1,112 @@
+import pytest
+
+from hearts_textual.commands import run_command, TABLES, GAME, DEFAULT_TABLE
+from hearts_textual.tables import DEFAULT_TABLE_ID
+
+from tests.fixtures import (
+    run_helper,
+    join,
+    websocket,
+    game_reset,
+    new_game_str,
+    base_template,
+)
+
+
+def create_table_str(name):
+    return base_template.substitute(
+        command="create_table", args=f'{{"name": "{name}"}}'
+    )
+
+
+def join_table_str(name, table):
+    return base_template.substitute(
+        command="join", args=f'{{"name": "{name}", "table": "{table}"}}'
+    )
+
+
+list_tables_str = base_template.substitute(command="list_tables", args="{}")
+
+
+class TestTables:
+    def test_default_table(self, join, websocket):
+        w = websocket()
+        run_helper(join("Homer"), w)
+
+        assert TABLES.for_socket(w) is DEFAULT_TABLE
+        assert DEFAULT_TABLE.game is GAME
+
+    def test_create_table(self, websocket):
+        w = websocket()
+        game, command = run_helper(create_table_str("Goose"), w)
+        table = TABLES.for_socket(w)
+
+        assert command == "update"
+        assert table.id != DEFAULT_TABLE_ID
+        assert table.game is game
+        assert game is not GAME
+        assert game.player_connected_count() == 1
+
+    def test_join_table(self, websocket):
+        w1 = websocket()
+        w2 = websocket()
+        run_helper(create_table_str("Goose"), w1)
+        table = TABLES.for_socket(w1)
+        game, _ = run_helper(join_table_str("Penguin", table.id), w2)
+
+        assert TABLES.for_socket(w2) is table
+        assert game.player_connected_count() == 2
+        assert TABLES.recipients(w1) == {w1, w2}
+
+    def test_join_missing_table(self, websocket):
+        message, command = run_helper(join_table_str("Penguin", "nope"), websocket())
+
+        assert command == "echo"
+        assert message == "Table nope not found!"
+
+    def test_tables_are_isolated(self, join, websocket):
+        sockets = [websocket() for _ in range(4)]
+        for i, w in enumerate(sockets):
+            run_helper(join(f"Default{i}"), w)
+        other = websocket()
+        run_helper(create_table_str("Loner"), other)
+
+        state, command = run_helper(new_game_str, sockets[0])
+        message, _ = run_helper(new_game_str, other)
+
+        assert state.started
+        assert not TABLES.for_socket(other).game.started
+        assert message == "Must have exactly 4 players!  We have 1"
+        assert other not in TABLES.recipients(sockets[0])
+
+    def test_not_at_table(self, websocket):
+        message, command = run_helper(new_game_str, websocket())
+
+        assert message == "Not at a table!"
+
+    def test_list_tables(self, websocket):
+        w = websocket()
+        run_helper(create_table_str("Goose"), w)
+        message = run_command(list_tables_str, websocket())
+
+        assert message.command == "tables"
+        assert len(message.args["tables"]) == 2
+        assert message.args["tables"][1]["players"] == ["Goose"]
+
+    def test_list_tables_from_seat(self, websocket):
+        w1 = websocket()
+        w2 = websocket()
+        run_helper(create_table_str("Goose"), w1)
+        run_helper(join_table_str("Penguin", TABLES.for_socket(w1).id), w2)
+        message = run_command(list_tables_str, w2)
+
+        assert TABLES.outbound(w2, message) == [({w2}, message)]
+
+    def test_leave_drops_empty_table(self, websocket):
+        w = websocket()
+        run_helper(create_table_str("Goose"), w)
+        table = TABLES.for_socket(w)
+        TABLES.leave(w)
+
+        assert TABLES.get(table.id) is None
+        assert TABLES.get(DEFAULT_TABLE_ID) is DEFAULT_TABLE
@@ -0,0 +1,113 @@
+from hearts_textual import codec, views
+from hearts_textual.commands import (
+    run_command,
+    CLIENT_STATES,
+    DEFAULT_TABLE,
+    TABLES,
+)
+from hearts_textual.data import Game
+
+from tests.fixtures import (
+    join,
+    play_card,
+    websocket,
+    game_reset,
+    four_players_and_sockets,
+    new_game_str,
+    next_round_str,
+    next_turn_str,
+    base_template,
+)
+
+watch_str = base_template.substitute(command="watch", args="{}")
+
+
+def started(sockets):
+    for command in [new_game_str, next_round_str]:
+        run_command(command, sockets[0])
+
+    return run_command(next_turn_str, sockets[0])
+
+
+class TestRedact:
+    def test_only_own_hand(self):
+        game = Game().reset().new_game().next_round()
+        state = codec.encode_game(game)
+
+        view = views.redact(state, 2)
+
+        assert [len(p["hand"]) for p in view["players"]] == [0, 0, 13, 0]
+        assert view["players"][2] is state["players"][2]
+        assert view["deck"] == []
+        assert [len(p["hand"]) for p in state["players"]] == [13] * 4
+
+    def test_spectator_sees_no_hands(self):
+        game = Game().reset().new_game().next_round()
+
+        view = views.redact(codec.encode_game(game), views.SPECTATOR)
+
+        assert all(p["hand"] == [] for p in view["players"])
+
+    def test_encoded_once_per_version(self, mocker):
+        game = Game().reset().new_game().next_round().next_turn()
+        encode = mocker.spy(codec, "encode_game")
+        cache = views.Views()
+
+        for player in game.players + [None, game.players[0]]:
+            cache.state(game, player)
+        assert encode.call_count == 1
+
+        lead = game.get_lead_player()
+        game.play_card(lead.hand[0], lead)
+        cache.state(game, lead)
+        assert encode.call_count == 2
+
+
+class TestOutboundViews:
+    def test_each_seat_sees_own_hand(self, four_players_and_sockets, websocket):
+        sockets = four_players_and_sockets
+        result = started(sockets)
+        game = DEFAULT_TABLE.game
+
+        for to, frame in TABLES.outbound(sockets[0], result):
+            (w,) = to
+            seat = game.players.index(DEFAULT_TABLE.sockets_to_players[w])
+            hands = [p["hand"] for p in frame.args["state"]["players"]]
+            assert [len(hand) for hand in hands] == [
+                13 if i == seat else 0 for i in range(4)
+            ]
+            legal = ["2C"] if game.players[seat] is game.get_lead_player() else []
+            assert frame.args["legal"] == legal
+
+    def test_spectator(self, four_players_and_sockets, play_card, websocket):
+        sockets = four_players_and_sockets
+        started(sockets)
+        w, client = websocket(), websocket()
+
+        for _, frame in TABLES.outbound(w, run_command(watch_str, w)):
+            run_command(frame.to_json(), client)
+        assert all(p["hand"] == [] for p in CLIENT_STATES[client]["players"])
+
+        game = DEFAULT_TABLE.game
+        lead = game.get_lead_player()
+        lead_socket = DEFAULT_TABLE.players_to_sockets[lead]
+        card = next(game.legal_moves(lead))
+        frames = TABLES.outbound(lead_socket, run_command(play_card(card), lead_socket))
+        (frame,) = [f for to, f in frames if w in to]
+        run_command(frame.to_json(), client)
+
+        assert frame.command == "delta"
+        assert CLIENT_STATES[client] == views.redact(
+            game.to_dict(encode_json=True), views.SPECTATOR
+        )
+        message = run_command(play_card(card), w)
+        assert message.args["message"] == "Spectators can't play!"
+
+    def test_errors_only_go_to_sender(self, four_players_and_sockets, play_card):
+        sockets = four_players_and_sockets
+        started(sockets)
+
+        message = run_command(play_card("AH"), sockets[1])
+
+        assert message.command == "echo"
+        assert TABLES.outbound(sockets[1], message) == [({sockets[1]}, message)]
@@ -144,6 +144,9 @@ class HeartsApp(App):
     async def action_new_game(self) -> None:
         self.pop_screen()
 
+    async def action_resync(self) -> None:
+        await self.command_queue.put({"command": "resync", "args": {}})
+
     async def action_update_game(self) -> None:
         if self.game.started:
             self.screen.post_message(UpdateMessage(self.game))
@@ -167,8 +170,10 @@ class HeartsApp(App):
     @on(CommandMessage)
     async def send_command(self, message: CommandMessage) -> None:
         if message.commands:
-            for command in message.commands:
-                await self.command_queue.put(command)
+            # One round trip and one update for the lot
+            await self.command_queue.put(
+                {"command": "batch", "args": {"commands": message.commands}}
+            )
         else:
             await self.command_queue.put(message.command)
 
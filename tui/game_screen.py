@@ -1,5 +1,5 @@
 from collections import deque
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
 
 from textual import on
 from textual.app import App, ComposeResult
@@ -30,41 +30,70 @@ class Footer(Static):
 
 
 class PlayCard(Container, can_focus_children=False):
-    card = reactive(None, recompose=True)
+    card = reactive(None)
 
     def __init__(self, card: data.Card = None, *, id=""):
         super().__init__(id=id)
 
+        # Mounted with the first card played here, then pointed at each next one
+        self.face: Optional[Card] = None
         self.card = card
 
-    def compose(self) -> ComposeResult:
-        if self.card is not None:
-            yield Card(self.card)
+    def watch_card(self, card: Optional[data.Card]) -> None:
+        if self.face is None:
+            if card is not None and self.is_attached:
+                self.face = Card(card, id=f"{self.id}_face")
+                self.mount(self.face)
+        elif card is None:
+            self.face.add_class("hide_card")
+        else:
+            self.face.show(card)
+            self.face.remove_class("hide_card")
+
+    def on_mount(self) -> None:
+        self.watch_card(self.card)
 
 
 class PlayArea(Container):
-    game: Optional[data.Game] = reactive(None, recompose=True)
     show_summary: bool = reactive(False)
-    translation: None
     card_slots = ["p1card", "p2card", "p3card", "p4card"]
     name_slots = ["P1", "P2", "P3", "P4"]
 
-    def __init__(
-        self, game: data.Game, translation: List[int], show_summary: bool
-    ) -> None:
+    def __init__(self) -> None:
         super().__init__()
-        self.translation = translation
-        self.show_summary = show_summary
+        self.game: Optional[data.Game] = None
+        self.translation: Optional[List[int]] = None
+        # What each name slot shows, so unchanged names aren't redrawn
+        self.names: Dict[str, str] = {}
+
+    def show(
+        self, game: data.Game, translation: Optional[List[int]], show_summary: bool
+    ) -> None:
+        """
+        Brings the play area up to date with game, touching only the slots
+        that changed
+        """
         self.game = game
+        self.translation = translation
+        if show_summary != self.show_summary:
+            # The watcher redraws for the new mode
+            self.show_summary = show_summary
+        elif show_summary:
+            self._show_summary_cards()
+        else:
+            self._show_played_cards()
 
     def _show_played_cards(self) -> None:
-        if self.game.turn >= 1:
+        if self.game.turn >= 1 and self.translation is not None:
             # Perform the rotation of players and card slots
             for player, t in zip(self.game.players, self.translation):
-                pcard = self.card_slots[t]
-                pname = self.name_slots[t]
-                self.query_one(f"#{pcard}").card = player.play
-                self.query_one(f"#{pname}").update(player.name)
+                self.query_one(f"#{self.card_slots[t]}").card = player.play
+                self._show_name(self.name_slots[t], player.name)
+
+    def _show_name(self, slot: str, name: str) -> None:
+        if self.names.get(slot) != name:
+            self.names[slot] = name
+            self.query_one(f"#{slot}").update(name)
 
     def _show_summary_cards(self) -> None:
         for card_str, order in zip(
@@ -74,18 +103,18 @@ class PlayArea(Container):
             pcard = self.card_slots[self.translation[order]]
             self.query_one(f"#{pcard}").card = card
 
-        self.query_one("#next_turn_button").remove_class("hide_card")
-        self.post_message(BasicMessage("focus('next_turn_button')"))
-
-    async def watch_game(self, game) -> None:
-        if game is not None:
-            if self.show_summary:
-                self._show_summary_cards()
-            else:
-                self._show_played_cards()
+        button = self.query_one("#next_turn_button")
+        if button.has_class("hide_card"):
+            button.remove_class("hide_card")
+            self.post_message(BasicMessage("focus('next_turn_button')"))
 
     async def watch_show_summary(self, show_summary: bool) -> None:
-        if not show_summary and self.game is not None:
+        if self.game is None:
+            return
+
+        if show_summary:
+            self._show_summary_cards()
+        else:
             self.query_one("#next_turn_button").add_class("hide_card")
             self._show_played_cards()
 
@@ -139,19 +168,40 @@ class Card(Button):
         card: data.Card,
         *,
         in_hand: bool = False,
+        playable: bool = True,
+        id: Optional[str] = None,
     ):
-        card_str = repr(card)
-        super().__init__(id=f"card_{card_str}")
+        super().__init__(id=f"card_{card!r}" if id is None else id)
 
         self.card = card
+        self.playable = playable
 
         if in_hand:
             self.add_class("hand_card")
+            if not playable:
+                self.add_class("unplayable")
 
         self.add_class(self.card.suit.color())
 
         self.label = str(self.card)
 
+    def show(self, card: data.Card) -> None:
+        """
+        Turns this into card, for widgets that get reused
+        """
+        if card is self.card:
+            return
+
+        self.remove_class(self.card.suit.color())
+        self.card = card
+        self.add_class(card.suit.color())
+        self.label = str(card)
+
+    def set_playable(self, playable: bool) -> None:
+        if playable != self.playable:
+            self.playable = playable
+            self.set_class(not playable, "unplayable")
+
     def watch_selected(self, selected: bool) -> None:
         if selected:
             self.add_class("hand_selected")
@@ -167,33 +217,56 @@ class Card(Button):
 
 
 class Hand(HorizontalScroll):
-    cards = reactive([], recompose=True)
     selected = reactive(-1)
-    hand = reactive(None, recompose=True)
 
     class PlayCardMessage(Message):
         def __init__(self, card: data.Card) -> None:
             self.card = card
             super().__init__()
 
-    def __init__(self, hand: List[Card], *, id: str = ""):
+    def __init__(self, *, id: str = ""):
         super().__init__()
 
-        self.hand = hand
+        # A widget for every card in the deck, in order, shown while it's held
+        self.pool: Dict[data.Card, Card] = {
+            card: Card(card, in_hand=True) for card in data.DECK
+        }
+        for widget in self.pool.values():
+            widget.add_class("hide_card")
+        self.cards: List[Card] = []
 
-        if hand is not None:
-            self.cards = [Card(card, in_hand=True) for card in hand]
-            self.cards.sort(key=lambda card: card.card)
+    def show(
+        self, hand: Optional[List[data.Card]], legal: Optional[Set[data.Card]]
+    ) -> None:
+        """
+        Shows the cards in hand and hides the rest, touching only the
+        widgets whose card came or went or became (un)playable
+        """
+        held = set(hand or [])
+        for widget in self.cards:
+            if widget.card not in held:
+                widget.selected = False
+                widget.add_class("hide_card")
+
+        self.cards = []
+        for card, widget in self.pool.items():
+            if card in held:
+                widget.set_playable(legal is None or card in legal)
+                widget.remove_class("hide_card")
+                self.cards.append(widget)
 
     def compose(self) -> ComposeResult:
         yield Footer(id="Footer")
-        for card in self.cards:
-            yield card
+        yield from self.pool.values()
 
     # If this comes after the below handler, it gets triggered. I do not understand
     # why that is: at the time of button press it won't have the hand_selected class
     @on(Card.Pressed, ".hand_selected")
     def play_card(self, event: Button.Pressed) -> None:
+        # The server would only send back an error
+        if not event.button.playable:
+            return
+
         card = event.button.card.to_dict()
 
         self.post_message(CommandMessage(command="play_card", args={"card": card}))
@@ -211,8 +284,9 @@ class Hand(HorizontalScroll):
 
 class GameScreen(Screen):
     # hand = demo_game.players[0].hand
-    game: data.Game = reactive(None, recompose=True)
-    hand: List[Card] = None
+    game: data.Game = None
+    hand: List[data.Card] = None
+    legal: Set[data.Card] = set()
     app: App = None
     translation = None
     show_turn_summary: bool = False
@@ -223,15 +297,16 @@ class GameScreen(Screen):
         self.app = app
 
     def compose(self) -> ComposeResult:
+        # Composed once, updates go to the widgets that changed from there
         with BaseScreen():
             # Without nested container, Hand docks to bottom over footer in BaseScreen
             with Container():
-                yield Hand(self.hand)
-                yield PlayArea(
-                    self.game,
-                    self.translation,
-                    self.show_turn_summary,
-                )
+                yield Hand()
+                yield PlayArea()
+
+    @on(Button.Pressed, "#next_turn_button")
+    def dismiss_turn_summary(self) -> None:
+        self.show_turn_summary = False
 
     @on(FooterMessage)
     async def footer_message(self, message: FooterMessage) -> None:
@@ -246,7 +321,6 @@ class GameScreen(Screen):
             d.rotate(index - 3)
             # TODO: does this need to be a list again?
             self.translation = list(d)
-            names = [player.name for player in game.players]
 
     def _handle_next_turn(self, game: data.Game) -> None:
         if self.game is not None and self.game.turn > 0 and self.game.turn < game.turn:
@@ -274,6 +348,8 @@ class GameScreen(Screen):
         if game is not None:
             player = game.get_player_by_name(self.app.name)
             self.hand = player.hand
+            # Sent along with the update, so this doesn't work it out again
+            self.legal = set(game.legal_moves(player))
 
             self._handle_first_turn(game, player)
 
@@ -281,7 +357,11 @@ class GameScreen(Screen):
 
             self._handle_next_round(game)
 
-        # This has to come after the above prep, because otherwise it was triggering
-        # a watch method out of order lower down.  Need to look again and see if
-        # reactive is even needed lower down, since we recompose at the top
+        # This has to come after the above prep, the handlers compare against
+        # the last game
         self.game = game
+        if game is not None:
+            self.query_one(Hand).show(self.hand, self.legal)
+            self.query_one(PlayArea).show(
+                game, self.translation, self.show_turn_summary
+            )